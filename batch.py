@@ -0,0 +1,301 @@
+"""
+File: batch.py
+Author: Lyuboslav Gigov
+Purpose: Non-interactive entry point that recommends books for many
+customers at once. Customer criteria are read from a JSONL or CSV file,
+the inventory and keyword lexicons are loaded only once, and the top
+books of every customer are streamed to a JSONL output file while the
+throughput is reported in queries per second.
+
+Every record holds age, max_price, gender and info, and may answer the
+follow-up questions of the interactive session in advance with mood,
+needs_encyclopedia and education_level. A question that a record does
+not answer is treated as declined.
+
+Usage: python batch.py QUERIES [--output FILE] [--top K] [--vectorized]
+                        [--cache-size N] [--phrases]
+"""
+
+import argparse
+import contextlib
+import csv
+import json
+import math
+import sys
+import time
+from book import ScoringContext
+from book_criteria import BookCriteria
+from bookstore import Bookstore
+from encyclopedia import validate_level
+from export import positive_int
+from questions import answer_questions
+from result_cache import DEFAULT_MAX_ENTRIES, ResultCache
+from romance import validate_mood
+
+VALID_GENDERS = ("man", "woman", "other")
+
+
+def read_records(file_name, file_format=None):
+    """
+    Lazily reads the query records of a JSONL or CSV file.
+
+    Args:
+        file_name (str): The file to read.
+        file_format (str): "jsonl" or "csv"; guessed from the file
+        extension when omitted.
+
+    Yields:
+        dict or str: One record per query; the lines of a JSONL file
+        are left undecoded, so a malformed line is rejected on its own
+        by decode_record instead of ending the run.
+    """
+    if file_format is None:
+        file_format = "csv" if file_name.lower().endswith(".csv") else "jsonl"
+    with open(file_name, "r", newline="") as infile:
+        if file_format == "csv":
+            yield from csv.DictReader(infile)
+        else:
+            for line in infile:
+                if line.strip():
+                    yield line
+
+
+def decode_record(record):
+    """
+    Returns a query record, decoding it if it is a JSONL line.
+
+    Args:
+        record (dict or str): The record or the JSON text holding it.
+
+    Raises:
+        ValueError: If the text is not JSON or the record not an object.
+
+    Returns:
+        dict: The record.
+    """
+    if isinstance(record, (str, bytes)):
+        try:
+            record = json.loads(record)
+        except ValueError as error:
+            raise ValueError(f"Invalid JSON: {error}.") from None
+    if not isinstance(record, dict):
+        raise ValueError("The record must be a JSON object.")
+    return record
+
+
+def parse_record(record):
+    """
+    Converts a query record into BookCriteria and the record's answers
+    to the follow-up questions.
+
+    Args:
+        record (dict or str): The raw record, with string or typed
+        values, or a JSONL line holding it.
+
+    Raises:
+        ValueError: If the record is malformed or a field is missing or
+        invalid.
+
+    Returns:
+        tuple: The BookCriteria and a dict with the mood,
+        needs_encyclopedia and education_level answers.
+    """
+    record = decode_record(record)
+    try:
+        age = int(record["age"])
+        max_price = float(record["max_price"])
+        gender = str(record["gender"]).strip().lower()
+        info = record.get("info") or ""
+    except KeyError as error:
+        raise ValueError(f"Missing field {error}.") from None
+    except (TypeError, AttributeError, OverflowError) as error:
+        raise ValueError(f"Invalid field: {error}.") from None
+    if not math.isfinite(max_price):
+        raise ValueError("The maximum price must be a finite number.")
+    if age <= 0 or max_price <= 0:
+        raise ValueError("Age and maximum price must be positive.")
+    if gender not in VALID_GENDERS:
+        raise ValueError(f"Invalid gender: {gender}.")
+    if isinstance(info, str):
+        info = info.split()
+    elif isinstance(info, (list, tuple)) and all(
+        isinstance(word, str) for word in info
+    ):
+        info = list(info)
+    else:
+        raise ValueError("info must be a string or a list of strings.")
+
+    mood = record.get("mood") or None
+    if mood is not None and not validate_mood(mood):
+        raise ValueError(f"Invalid mood: {mood}.")
+    education_level = record.get("education_level") or ""
+    if not isinstance(education_level, str):
+        raise ValueError(f"Invalid education level: {education_level}.")
+    education_level = education_level.strip().lower()
+    if education_level and not validate_level(education_level):
+        raise ValueError(f"Invalid education level: {education_level}.")
+    needs_encyclopedia = record.get("needs_encyclopedia")
+    if isinstance(needs_encyclopedia, str):
+        needs_encyclopedia = needs_encyclopedia.strip().lower() in (
+            "yes", "true", "1"
+        )
+    if needs_encyclopedia is None:
+        needs_encyclopedia = bool(education_level)
+    answers = {
+        "mood": mood,
+        "needs_encyclopedia": bool(needs_encyclopedia and education_level),
+        "education_level": education_level,
+    }
+    return BookCriteria(age, max_price, gender, info), answers
+
+
+def book_summary(book, grade):
+    """Returns the output fields of a recommended book and its grade."""
+    return {
+        "isbn": book.isbn,
+        "title": book.title,
+        "author": book.author,
+        "genre": book.get_genre(),
+        "price": book.price,
+        "grade": grade,
+    }
+
+
+def recommend_all(records, outfile, k=5, vectorized=False, cache=None,
+                  phrase_matching=False):
+    """
+    Recommends books for every record and writes one JSON line per
+    record to the output file as soon as it is graded.
+
+    Args:
+        records (iterable): The query records, as dicts or as JSONL
+        lines.
+        outfile (file): The file the JSON lines are written to.
+        k (int): The number of books per customer.
+        vectorized (bool): If True, the NumPy grading engine is used.
+        cache (ResultCache): Optional cache of the rankings, so repeated
+        criteria are not graded again.
+        phrase_matching (bool): If True, multi-word keywords are
+        matched as phrases, see ScoringContext.
+
+    Returns:
+        tuple: The number of queries answered and the number rejected.
+    """
+    if cache is None:
+        cache = ResultCache(0)
+    if vectorized:
+        catalog = Bookstore.load_catalog()
+    else:
+        bookstore = Bookstore()
+
+    answered, rejected = 0, 0
+    for number, record in enumerate(records, 1):
+        query_id = number
+        try:
+            record = decode_record(record)
+            query_id = record.get("id", number)
+            criteria, answers = parse_record(record)
+        except ValueError as error:
+            rejected += 1
+            outfile.write(
+                json.dumps({"id": query_id, "error": str(error)}) + "\n"
+            )
+            continue
+
+        context = ScoringContext(criteria, phrase_matching)
+        answer_questions(context, **answers)
+        if vectorized:
+            ranked = cache.rank_catalog(catalog, context, k)
+        else:
+            ranked = cache.rank_books(bookstore, context, k)
+        summaries = [book_summary(book, grade) for book, grade in ranked]
+        outfile.write(
+            json.dumps({"id": query_id, "books": summaries}) + "\n"
+        )
+        answered += 1
+    return answered, rejected
+
+
+def parse_args(argv=None):
+    """Parse the command-line options of the batch mode.
+
+    Args:
+        argv (list): The arguments to parse, defaults to sys.argv[1:].
+
+    Returns:
+        argparse.Namespace: The parsed options.
+    """
+    parser = argparse.ArgumentParser(
+        description="Recommend books for a file of customer criteria"
+    )
+    parser.add_argument("queries", help="JSONL or CSV file of criteria")
+    parser.add_argument(
+        "--format",
+        choices=("jsonl", "csv"),
+        help="format of the queries file (default: from its extension)",
+    )
+    parser.add_argument(
+        "--output",
+        "-o",
+        help="JSONL file to write the recommendations to (default: stdout)",
+    )
+    parser.add_argument(
+        "--top",
+        type=positive_int,
+        default=5,
+        metavar="K",
+        help="number of books per customer (default: 5)",
+    )
+    parser.add_argument(
+        "--vectorized",
+        action="store_true",
+        help="grade with the NumPy grading engine",
+    )
+    parser.add_argument(
+        "--phrases",
+        action="store_true",
+        help="match multi-word keywords such as \"time travel\" as one "
+        "keyword instead of word by word",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_MAX_ENTRIES,
+        metavar="N",
+        help="number of rankings to cache, 0 to disable "
+        f"(default: {DEFAULT_MAX_ENTRIES})",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Runs the batch recommendation and reports its throughput."""
+    args = parse_args(argv)
+    cache = ResultCache(args.cache_size)
+    outfile = open(args.output, "w") if args.output else sys.stdout
+    start = time.perf_counter()
+    try:
+        # Validation messages must not mix with the output
+        with contextlib.redirect_stdout(sys.stderr):
+            answered, rejected = recommend_all(
+                read_records(args.queries, args.format),
+                outfile,
+                args.top,
+                args.vectorized,
+                cache,
+                args.phrases,
+            )
+    finally:
+        if outfile is not sys.stdout:
+            outfile.close()
+    elapsed = time.perf_counter() - start
+    print(
+        f"{answered} queries answered, {rejected} rejected in "
+        f"{elapsed:.2f} s ({answered / elapsed if elapsed else 0:.1f} "
+        f"queries/s, {cache.stats()['hit_rate']:.0%} from the cache)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+File: bench_catalog.py
+Author: Lyuboslav Gigov
+Purpose: Compares a list of Book objects with the columnar Catalog:
+memory per book (measured with tracemalloc) and the time to scan the
+collection for the books within a budget or a range of years.
+Run from the project root with: python -m benchmarks.bench_catalog
+"""
+
+import gc
+import itertools
+import timeit
+import tracemalloc
+from bookstore import Bookstore
+from catalog import Catalog
+
+
+def make_books(book_count):
+    """Returns book_count books cycled from the shipped inventory."""
+    lines = [
+        line for line in open("Bookstore_Inventory.txt").read().splitlines()
+        if line.strip()
+    ]
+    return [
+        Bookstore.parse_book(line)
+        for line in itertools.islice(itertools.cycle(lines), book_count)
+    ]
+
+
+def allocated_bytes(build):
+    """Returns the bytes still allocated by the object build() returns."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def run(book_count=100_000, repeat=5):
+    """Measures memory and scan times and prints them."""
+    books = make_books(book_count)
+    list_bytes = allocated_bytes(lambda: make_books(book_count))
+    catalog_bytes = allocated_bytes(lambda: Catalog.from_books(books))
+    catalog = Catalog.from_books(books)
+    print(f"{book_count} books")
+    print(f"{'':>24} {'list of Book':>14} {'Catalog':>10}")
+    print(
+        f"{'bytes per book':>24} {list_bytes / book_count:>14.1f}"
+        f" {catalog_bytes / book_count:>10.1f}"
+    )
+
+    def best(statement):
+        return min(timeit.repeat(statement, number=1, repeat=repeat)) * 1000
+
+    list_time = best(lambda: [b for b in books if b.price <= 15])
+    catalog_time = best(lambda: catalog.indexes_within_budget(15))
+    print(
+        f"{'price <= 15 (ms)':>24} {list_time:>14.2f} {catalog_time:>10.2f}"
+    )
+    list_time = best(lambda: [b for b in books if 1980 <= b.year <= 2010])
+    catalog_time = best(
+        lambda: catalog.indexes_published_between(1980, 2010)
+    )
+    print(
+        f"{'1980 <= year <= 2010 (ms)':>24}"
+        f" {list_time:>14.2f} {catalog_time:>10.2f}"
+    )
+    try:
+        import numpy as np
+    except ImportError:
+        return
+    prices = catalog.column("prices")
+    print(
+        f"{'price <= 15, NumPy (ms)':>24} {'':>14}"
+        f" {best(lambda: np.flatnonzero(prices <= 15)):>10.2f}"
+    )
+
+
+if __name__ == "__main__":
+    run()
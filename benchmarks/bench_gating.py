@@ -0,0 +1,79 @@
+"""
+File: bench_gating.py
+Author: Lyuboslav Gigov
+Purpose: Compares ranking an inventory by grading every book with
+Bookstore.rank_books, which matches the keywords of every genre in one
+pass and only grades the books that can reach the top k.
+Run from the project root with: python -m benchmarks.bench_gating
+"""
+
+import heapq
+import timeit
+from operator import itemgetter
+from benchmarks.bench_catalog import make_books
+from book import ScoringContext
+from book_criteria import BookCriteria
+from bookstore import Bookstore
+
+QUERIES = {
+    "sci-fi keywords": BookCriteria(
+        25, 20, "man", "a book about robots and aliens".split()
+    ),
+    "sports keywords": BookCriteria(
+        19, 20, "woman", "I love tennis and history".split()
+    ),
+    "no signal": BookCriteria(45, 40, "other", "a gift".split()),
+}
+
+
+def make_unique_books(book_count):
+    """Returns book_count books of the shipped inventory, with unique ISBNs."""
+    books = make_books(book_count)
+    for number, book in enumerate(books):
+        prefix = "".join(
+            chr(ord("A") + number // 10_000 // 26 ** i % 26) for i in range(4)
+        )
+        book.isbn = f"{prefix}-{number % 10_000:04d}"
+    return books
+
+
+def exhaustive(books, criteria):
+    """Grades every book and selects the five best."""
+    context = ScoringContext(criteria)
+    return heapq.nlargest(
+        5,
+        ((book, book.score(criteria, context)) for book in books),
+        key=itemgetter(1),
+    )
+
+
+def run(book_counts=(10_000, 100_000), repeat=3):
+    """Times both ranking paths and prints the best of several runs."""
+    print(f"{'books':>8} {'query':>16} {'all (ms)':>10} {'gated (ms)':>11}")
+    for book_count in book_counts:
+        bookstore = Bookstore(make_unique_books(book_count))
+        for name, criteria in QUERIES.items():
+            everything = min(
+                timeit.repeat(
+                    lambda: exhaustive(bookstore.books, criteria),
+                    number=1,
+                    repeat=repeat,
+                )
+            )
+            gated = min(
+                timeit.repeat(
+                    lambda: bookstore.rank_books(
+                        criteria, ScoringContext(criteria)
+                    ),
+                    number=1,
+                    repeat=repeat,
+                )
+            )
+            print(
+                f"{book_count:>8} {name:>16} {everything * 1000:>10.2f}"
+                f" {gated * 1000:>11.2f}"
+            )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,52 @@
+"""
+File: bench_grading.py
+Author: Lyuboslav Gigov
+Purpose: Compares grading a catalog book by book through calculate_grade
+with the NumPy grading engine, for catalogs of growing size.
+Run from the project root with: python -m benchmarks.bench_grading
+"""
+
+import timeit
+from benchmarks.bench_catalog import make_books
+from book import ScoringContext
+from book_criteria import BookCriteria
+from catalog import Catalog
+from grading_engine import grade_catalog
+
+CRITERIA = BookCriteria(
+    age=25,
+    max_price=20,
+    gender="woman",
+    info="a book about space robots and football history".split(),
+)
+
+
+def run(book_counts=(1_000, 10_000, 100_000), repeat=3):
+    """Times both grading paths and prints the best of several runs."""
+    print(f"{'books':>8} {'objects (ms)':>14} {'engine (ms)':>12}")
+    for book_count in book_counts:
+        books = make_books(book_count)
+        catalog = Catalog.from_books(books)
+        context = ScoringContext(CRITERIA)
+        objects = min(
+            timeit.repeat(
+                lambda: [b.calculate_grade(CRITERIA, context)
+                         for b in books],
+                number=1,
+                repeat=repeat,
+            )
+        )
+        engine = min(
+            timeit.repeat(
+                lambda: grade_catalog(catalog, CRITERIA, context),
+                number=1,
+                repeat=repeat,
+            )
+        )
+        print(
+            f"{book_count:>8} {objects * 1000:>14.2f} {engine * 1000:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    run()
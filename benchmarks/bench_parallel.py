@@ -0,0 +1,47 @@
+"""
+File: bench_parallel.py
+Author: Lyuboslav Gigov
+Purpose: Measures the speedup of process-pool grading over a
+shared-memory catalog for 1, 2, 4 and 8 workers. The pool is started
+before timing, so only the grading of a query is measured.
+Run from the project root with: python -m benchmarks.bench_parallel
+"""
+
+import os
+import timeit
+from benchmarks.bench_catalog import make_books
+from book_criteria import BookCriteria
+from catalog import Catalog
+from parallel_grading import ParallelGrader
+
+CRITERIA = BookCriteria(
+    age=25,
+    max_price=20,
+    gender="woman",
+    info="a book about space robots and football history".split(),
+)
+
+
+def run(book_count=200_000, worker_counts=(1, 2, 4, 8), repeat=3):
+    """Times one query per worker count and prints the speedups."""
+    catalog = Catalog.from_books(make_books(book_count))
+    print(f"{book_count} books, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'time (ms)':>10} {'speedup':>8}")
+    baseline = None
+    for workers in worker_counts:
+        with ParallelGrader(catalog, workers) as grader:
+            grader.grade(CRITERIA)  # Starts the workers
+            elapsed = min(
+                timeit.repeat(
+                    lambda: grader.grade(CRITERIA), number=1, repeat=repeat
+                )
+            )
+        baseline = baseline or elapsed
+        print(
+            f"{workers:>8} {elapsed * 1000:>10.1f}"
+            f" {baseline / elapsed:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    run()
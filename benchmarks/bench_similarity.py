@@ -0,0 +1,58 @@
+"""
+File: bench_similarity.py
+Author: Lyuboslav Gigov
+Purpose: Benchmarks the per-genre match_keywords loop against the
+NumPy-backed match_keywords_batch on paragraph-sized user input.
+Run from the project root with: python -m benchmarks.bench_similarity
+"""
+
+import random
+import timeit
+from book import match_keywords, match_keywords_batch
+
+KEYWORD_FILES = [
+    "Romance_Keywords.txt",
+    "Science_Fiction_Keywords.txt",
+    "Biography_Keywords.txt",
+    "Encyclopedia_Keywords.txt",
+]
+WORDS = (
+    "i am looking for an interesting book to read at home about love "
+    "space travel history sports school science future robots heroes "
+    "journey relationship passion knowledge research memoir"
+).split()
+
+
+def make_paragraph(token_count, seed=0):
+    """Returns a reproducible paragraph of the given number of tokens."""
+    rng = random.Random(seed)
+    return [rng.choice(WORDS) for _ in range(token_count)]
+
+
+def run(token_counts=(10, 50, 200), repeat=5):
+    """Times both matchers and prints the best of several runs."""
+    print(f"{'tokens':>8} {'per-genre (ms)':>16} {'batch (ms)':>12}")
+    for token_count in token_counts:
+        user_keywords = make_paragraph(token_count)
+        per_genre = min(
+            timeit.repeat(
+                lambda: [match_keywords(f, user_keywords)
+                         for f in KEYWORD_FILES],
+                number=1,
+                repeat=repeat,
+            )
+        )
+        batch = min(
+            timeit.repeat(
+                lambda: match_keywords_batch(KEYWORD_FILES, user_keywords),
+                number=1,
+                repeat=repeat,
+            )
+        )
+        print(
+            f"{token_count:>8} {per_genre * 1000:>16.2f} {batch * 1000:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,338 @@
+"""
+File: bench_suite.py
+Author: Lyuboslav Gigov
+Purpose: Measures how the recommendation pipeline scales on synthetic
+data from generators.py: the time and peak memory of
+Bookstore.load_books, the grading throughput of calculate_grade for
+every genre, the time of main.sort_books and Bookstore.rank_books, and
+the time of match_keywords against keyword files of growing size. The
+results are written as JSON, and two result files can be compared to
+spot regressions between versions.
+Run from the project root with:
+    python -m benchmarks.bench_suite --output results.json
+    python -m benchmarks.bench_suite --compare old.json new.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from benchmarks.generators import user_keywords, write_inventory
+from benchmarks.generators import write_keywords
+from book import ScoringContext, match_keywords
+from book_criteria import BookCriteria
+from bookstore import Bookstore
+from main import sort_books
+
+BOOK_COUNTS = (1_000, 10_000, 100_000, 1_000_000)
+TERM_COUNTS = (20, 500, 5_000, 50_000)
+
+# The query every inventory is graded and ranked for
+CRITERIA = BookCriteria(
+    25, 30, "woman", "a love story in space with robots and tennis".split()
+)
+
+# The suffixes of the measured values; the other fields give sizes
+MEASURE_SUFFIXES = ("_s", "_bytes")
+
+# The metrics where a larger value is better; for the others, smaller is
+RATE_METRICS = ("books_per_s",)
+
+
+def best_time(function, repeat):
+    """Returns the best wall time of several calls, in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def peak_bytes(function):
+    """Returns the peak of the memory allocated while function runs."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def bench_inventory(file_name, book_count, repeat):
+    """
+    Measures loading, grading and ranking one synthetic inventory.
+
+    Args:
+        file_name (str): The inventory file.
+        book_count (int): The number of books in it.
+        repeat (int): The number of runs each time is the best of.
+
+    Returns:
+        dict: The measurements.
+    """
+    load_s = best_time(lambda: Bookstore.load_books(file_name), repeat)
+    load_peak = peak_bytes(lambda: Bookstore.load_books(file_name))
+    books = Bookstore.load_books(file_name)
+
+    context = ScoringContext(CRITERIA)
+    grading = {}
+    for genre in sorted({book.get_genre() for book in books}):
+        shelf = [book for book in books if book.get_genre() == genre]
+        seconds = best_time(
+            lambda: [book.calculate_grade(CRITERIA, context)
+                     for book in shelf],
+            repeat,
+        )
+        grading[genre] = {
+            "books": len(shelf),
+            "books_per_s": round(len(shelf) / seconds) if seconds else None,
+        }
+    for book in books:
+        book.calculate_grade(CRITERIA, context)
+    sort_s = best_time(lambda: sort_books(list(books)), repeat)
+
+    bookstore = Bookstore(books)
+    bookstore.rank_books(CRITERIA)  # Builds the keyword index
+    rank_s = best_time(
+        lambda: bookstore.rank_books(CRITERIA, ScoringContext(CRITERIA)),
+        repeat,
+    )
+    return {
+        "books": book_count,
+        "load_s": round(load_s, 6),
+        "load_peak_bytes": load_peak,
+        "grading": grading,
+        "sort_s": round(sort_s, 6),
+        "rank_s": round(rank_s, 6),
+    }
+
+
+def bench_keywords(file_name, term_count, tokens, repeat):
+    """
+    Measures match_keywords against one synthetic keyword file: the
+    first call reads the file and builds its deletion index, the later
+    ones are served from the lexicon registry.
+
+    Args:
+        file_name (str): The keyword file.
+        term_count (int): The number of terms in it.
+        tokens (list): The user's input.
+        repeat (int): The number of runs the warm time is the best of.
+
+    Returns:
+        dict: The measurements.
+    """
+    start = time.perf_counter()
+    match_keywords(file_name, tokens)
+    cold_s = time.perf_counter() - start
+    warm_s = best_time(lambda: match_keywords(file_name, tokens), repeat)
+    return {
+        "terms": term_count,
+        "tokens": len(tokens),
+        "cold_s": round(cold_s, 6),
+        "warm_s": round(warm_s, 6),
+    }
+
+
+def git_revision():
+    """Returns the current commit of the project, or None."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(book_counts=BOOK_COUNTS, term_counts=TERM_COUNTS, seed=0,
+        repeat=3, data_dir=None):
+    """
+    Generates the data and runs every benchmark.
+
+    Args:
+        book_counts (tuple): The sizes of the generated inventories.
+        term_counts (tuple): The sizes of the generated keyword files.
+        seed (int): The seed of the generators.
+        repeat (int): The number of runs each time is the best of.
+        data_dir (str): Where the generated files are written; a
+        temporary directory by default.
+
+    Returns:
+        dict: The results, ready to be written as JSON.
+    """
+    results = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "seed": seed,
+        "repeat": repeat,
+        "inventory": [],
+        "keywords": [],
+    }
+    with tempfile.TemporaryDirectory() as temporary_dir:
+        data_dir = data_dir or temporary_dir
+        for book_count in book_counts:
+            file_name = os.path.join(data_dir, f"inventory_{book_count}.txt")
+            write_inventory(file_name, book_count, seed)
+            result = bench_inventory(file_name, book_count, repeat)
+            results["inventory"].append(result)
+            print(
+                f"{book_count:>8} books: load {result['load_s'] * 1000:.1f}"
+                f" ms, sort {result['sort_s'] * 1000:.1f} ms,"
+                f" rank {result['rank_s'] * 1000:.1f} ms",
+                file=sys.stderr,
+            )
+        tokens = user_keywords(20, seed)
+        for term_count in term_counts:
+            file_name = os.path.join(data_dir, f"keywords_{term_count}.txt")
+            write_keywords(file_name, term_count, seed)
+            result = bench_keywords(file_name, term_count, tokens, repeat)
+            results["keywords"].append(result)
+            print(
+                f"{term_count:>8} terms: cold {result['cold_s'] * 1000:.1f}"
+                f" ms, warm {result['warm_s'] * 1000:.2f} ms",
+                file=sys.stderr,
+            )
+    return results
+
+
+def flatten(results):
+    """
+    Returns the measurements of a result file by name, e.g.
+    "inventory[1000].load_s" or "keywords[500].warm_s".
+    """
+    metrics = {}
+    for section, size_key in (("inventory", "books"), ("keywords", "terms")):
+        for result in results.get(section, []):
+            prefix = f"{section}[{result[size_key]}]"
+            for name, value in result.items():
+                if isinstance(value, dict):
+                    for genre, values in value.items():
+                        for metric, number in values.items():
+                            metrics[f"{prefix}.{name}.{genre}.{metric}"] = (
+                                number
+                            )
+                else:
+                    metrics[f"{prefix}.{name}"] = value
+    return {
+        name: value
+        for name, value in metrics.items()
+        if name.endswith(MEASURE_SUFFIXES)
+    }
+
+
+def compare(old_results, new_results, threshold=0.1):
+    """
+    Compares the measurements two runs have in common.
+
+    Args:
+        old_results (dict): The results of the baseline.
+        new_results (dict): The results of the version being checked.
+        threshold (float): The relative change reported as a regression.
+
+    Returns:
+        list: (name, old value, new value, change, regressed) tuples;
+        the change is new / old - 1.
+    """
+    old_metrics, new_metrics = flatten(old_results), flatten(new_results)
+    rows = []
+    for name, old in old_metrics.items():
+        new = new_metrics.get(name)
+        if not old or new is None:
+            continue
+        change = new / old - 1
+        if name.endswith(RATE_METRICS):
+            regressed = change < -threshold
+        else:
+            regressed = change > threshold
+        rows.append((name, old, new, change, regressed))
+    return rows
+
+
+def parse_args(argv=None):
+    """Parse the command-line options of the suite.
+
+    Args:
+        argv (list): The arguments to parse, defaults to sys.argv[1:].
+
+    Returns:
+        argparse.Namespace: The parsed options.
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark the pipeline on synthetic data"
+    )
+    parser.add_argument(
+        "--books",
+        type=int,
+        nargs="+",
+        default=BOOK_COUNTS,
+        metavar="N",
+        help="inventory sizes (default: 1k to 1M)",
+    )
+    parser.add_argument(
+        "--terms",
+        type=int,
+        nargs="+",
+        default=TERM_COUNTS,
+        metavar="N",
+        help="keyword file sizes (default: 20 to 50k)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="runs each time is the best of (default: 3)",
+    )
+    parser.add_argument(
+        "--data-dir", help="keep the generated files in this directory"
+    )
+    parser.add_argument(
+        "--output", help="write the results to this JSON file"
+    )
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("OLD", "NEW"),
+        help="compare two result files instead of running the suite",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Runs the suite, or compares two result files."""
+    args = parse_args(argv)
+    if args.compare:
+        old_file, new_file = args.compare
+        with open(old_file) as old, open(new_file) as new:
+            rows = compare(json.load(old), json.load(new))
+        for name, old, new, change, regressed in rows:
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{name:<48} {old:>14} {new:>14} {change:>+8.1%}{flag}")
+        return 1 if any(row[4] for row in rows) else 0
+    results = run(
+        args.books, args.terms, args.seed, args.repeat, args.data_dir
+    )
+    if args.output:
+        with open(args.output, "w") as outfile:
+            json.dump(results, outfile, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
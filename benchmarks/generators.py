@@ -0,0 +1,175 @@
+"""
+File: generators.py
+Author: Lyuboslav Gigov
+Purpose: Seeded generators of synthetic benchmark data: inventory files
+in the format of Bookstore_Inventory.txt and keyword files in the format
+of the genre keyword files. The same seed always gives the same files,
+so the results of different versions can be compared.
+"""
+
+import random
+
+# The genres of the inventory file, with the share of the books in each
+GENRE_SHARES = (
+    ("Science Fiction", 0.3),
+    ("Romance", 0.3),
+    ("Biography", 0.25),
+    ("Encyclopedia", 0.15),
+)
+
+# The genres whose lines carry the two genre characteristics
+CHARACTERISTIC_GENRES = ("Science Fiction", "Romance")
+
+# Syllables the synthetic words are made of
+SYLLABLES = (
+    "ba be bi bo bu ca ce ci co cu da de di do du fa fe fi fo fu ga ge gi "
+    "go gu la le li lo lu ma me mi mo mu na ne ni no nu ra re ri ro ru sa "
+    "se si so su ta te ti to tu va ve vi vo vu za ze zi zo zu"
+).split()
+
+# The share of the generated books that reuse a title of the shipped
+# inventory, so the title rules fire on generated inventories as well
+SHIPPED_TITLE_SHARE = 0.01
+
+
+def make_word(rng, syllable_count):
+    """Returns a random word of the given number of syllables."""
+    return "".join(rng.choice(SYLLABLES) for _ in range(syllable_count))
+
+
+def make_isbn(number):
+    """Returns the distinct ISBN of the number-th generated book."""
+    prefix = "".join(
+        chr(ord("A") + number // 10_000 // 26 ** i % 26) for i in range(4)
+    )
+    return f"{prefix}-{number % 10_000:04d}"
+
+
+def shipped_titles(file_name="Bookstore_Inventory.txt"):
+    """Returns the (title, genre) pairs of an inventory file."""
+    titles = []
+    with open(file_name, "r") as readfile:
+        for line in readfile:
+            if line.strip():
+                parts = [part.strip() for part in line.split(";")]
+                titles.append((parts[0], parts[2]))
+    return titles
+
+
+def inventory_lines(book_count, seed=0):
+    """
+    Generates the lines of a synthetic inventory file.
+
+    Args:
+        book_count (int): The number of books.
+        seed (int): The seed of the random generator.
+
+    Yields:
+        str: One inventory line per book, without its line break.
+    """
+    rng = random.Random(seed)
+    genres = [genre for genre, _ in GENRE_SHARES]
+    weights = [share for _, share in GENRE_SHARES]
+    reused = shipped_titles()
+    authors = [
+        f"{make_word(rng, 2).title()} {make_word(rng, 3).title()}"
+        for _ in range(max(1, book_count // 20))
+    ]
+    for number in range(book_count):
+        if rng.random() < SHIPPED_TITLE_SHARE:
+            title, genre = rng.choice(reused)
+        else:
+            genre = rng.choices(genres, weights)[0]
+            title = " ".join(
+                make_word(rng, rng.randint(1, 3)).title()
+                for _ in range(rng.randint(1, 4))
+            )
+        fields = [
+            title,
+            rng.choice(authors),
+            genre,
+            f"{rng.randint(299, 5999) / 100:.2f}",
+            str(rng.randint(1900, 2024)),
+            make_isbn(number),
+        ]
+        if genre in CHARACTERISTIC_GENRES:
+            fields += [str(rng.randint(0, 100)), str(rng.randint(0, 100))]
+        yield "; ".join(fields)
+
+
+def write_inventory(file_name, book_count, seed=0):
+    """
+    Writes a synthetic inventory file.
+
+    Args:
+        file_name (str): The file to write.
+        book_count (int): The number of books.
+        seed (int): The seed of the random generator.
+    """
+    with open(file_name, "w") as outfile:
+        for line in inventory_lines(book_count, seed):
+            outfile.write(line + "\n")
+
+
+def keyword_terms(term_count, seed=0,
+                  base_file="Science_Fiction_Keywords.txt"):
+    """
+    Generates the distinct terms of a synthetic keyword file. The terms
+    of a shipped keyword file come first, so real input still matches.
+
+    Args:
+        term_count (int): The number of terms.
+        seed (int): The seed of the random generator.
+        base_file (str): The shipped keyword file whose terms lead.
+
+    Returns:
+        list: The terms.
+    """
+    rng = random.Random(seed)
+    with open(base_file, "r") as readfile:
+        terms = [line.strip() for line in readfile if line.strip()]
+    terms = terms[:term_count]
+    seen = {term.lower() for term in terms}
+    while len(terms) < term_count:
+        term = make_word(rng, rng.randint(2, 4))
+        if term not in seen:
+            seen.add(term)
+            terms.append(term)
+    return terms
+
+
+def write_keywords(file_name, term_count, seed=0):
+    """
+    Writes a synthetic keyword file, one term per line.
+
+    Args:
+        file_name (str): The file to write.
+        term_count (int): The number of terms.
+        seed (int): The seed of the random generator.
+    """
+    with open(file_name, "w") as outfile:
+        for term in keyword_terms(term_count, seed):
+            outfile.write(term + "\n")
+
+
+def user_keywords(token_count, seed=0):
+    """
+    Generates the input of a user: a mix of real English words and
+    misspelt synthetic words.
+
+    Args:
+        token_count (int): The number of tokens.
+        seed (int): The seed of the random generator.
+
+    Returns:
+        list: The tokens.
+    """
+    rng = random.Random(seed)
+    words = (
+        "i want a book about space robots love history tennis school "
+        "future science adventure"
+    ).split()
+    return [
+        rng.choice(words) if rng.random() < 0.6 else make_word(rng, 3)
+        for _ in range(token_count)
+    ]
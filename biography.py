@@ -6,11 +6,25 @@ This class includes specialized grading calculations based on
 user keywords that match the biographical content.
 """
 
-from book import NonFiction, match_keywords
+from book import NonFiction, ScoringContext, clamp_grade
 
 KEYWORD_FILE_NAME = "Biography_Keywords.txt"
 
 
+def age_increment(age):
+    """
+    Returns the grade increment of biographies for readers of an age.
+
+    Args:
+        age (int): The user's age.
+
+    Returns:
+        int: The grade increment.
+    """
+    # Young people are inspired by biographies
+    return 25 if 10 <= age <= 30 else 0
+
+
 class Biography(NonFiction):
     """
     Represents a biography genre of books within a bookstore system,
@@ -24,6 +38,8 @@ class Biography(NonFiction):
         isbn (str): The ISBN of the biography.
     """
 
+    __slots__ = ()
+
     def __init__(self, title, author, price, year, isbn):
         """
         Constructs all the necessary attributes for the Biography object.
@@ -46,61 +62,37 @@ class Biography(NonFiction):
         """
         return "Biography"
 
-    def calculate_grade(self, book_criteria):
+    def score(self, book_criteria, context=None):
         """
-        Calculates and updates the grade of the biography based on
+        Computes the grade of the biography based on
         specific keywords and age criteria.
 
-        This method specifically checks for keywords related to sports
-        (like football, soccer, tennis)
-        and adjusts the biography's grade to 100 if a match is found
-        with the book's title. Otherwise, it
-        increases the grade based on the age and increments
-        the grade based on keywords found.
+        The grade is increased based on the age and incremented based
+        on the keywords found. The title rules then adjust the grade to
+        100 when keywords related to sports (like football, soccer,
+        tennis) match the book's title.
 
         Args: book_criteria (BookCriteria): An object of class BookCriteria
         containing criteria such as age, gender,
         maximum price the user is willing to pay and information
         for the specific requirements and preferences of the
         user.
+        context (ScoringContext): Optional per-query state holding the
+        keyword matches shared by every book of the query.
 
         Returns:
-            None: This method directly modifies the object's grade attribute.
+            float: The grade of the biography, from 0 to 100.
         """
-        if super().calculate_grade(book_criteria):
-            grade_increment = 0
-            user_keywords = [word.lower() for word in book_criteria.info]
-
-            # These books require very specific keywords and characteristics
-            if (
-                any(k in user_keywords for k in ["football", "soccer"])
-                and self.title == "Rafa: My Story"
-            ):
-                self.grade = 100
-                return  # No need to go through the rest of the method
-            elif (
-                any(
-                    kwrd in user_keywords
-                    for kwrd in ["sports", "mentality", "relentless"]
-                )
-                and self.title
-                == "Relentless: From Good to Great to Unstoppable"
-            ):
-                self.grade = 100
-                return
-            elif (
-                "tennis" in user_keywords
-                and self.title == "Open: An Autobiography"
-            ):
-                self.grade = 100
-                return
-
-            # Young people are inspired by biographies
-            if 10 <= book_criteria.age <= 30:
-                grade_increment += 25
-
-            keyword_increment, _ = match_keywords(
-                KEYWORD_FILE_NAME, user_keywords
-            )
-            grade_increment += keyword_increment
-            self.grade += grade_increment
+        grade = super().score(book_criteria, context)
+        if not grade:
+            return grade  # Over budget
+        if context is None:
+            context = ScoringContext(book_criteria)
+        grade_increment = age_increment(book_criteria.age)
+
+        keyword_increment, _ = context.match_keywords(KEYWORD_FILE_NAME)
+        grade_increment += keyword_increment
+        grade = clamp_grade(grade + grade_increment)
+
+        # These books require very specific keywords, see the rules file
+        return self.apply_title_rules(grade, context)
@@ -11,14 +11,37 @@ book criteria and comparison methods for sorting.
 """
 
 import sys
-from fuzzywuzzy import fuzz
 import re
+from instrumentation import metrics
+from lexicon import MATCH_THRESHOLD, get_lexicon, tokenize
+
+# Longest lexicon term handled by the 64-bit similarity kernel
+_MAX_KERNEL_TERM_LENGTH = 64
+
+# ISBN format: four letters, a hyphen, then four digits; compiled once
+# instead of on every assignment
+ISBN_PATTERN = re.compile(r"^[A-Za-z]{4}-\d{4}$")
+
+
+def clamp_grade(grade):
+    """
+    Limits a grade to the 0-100 range.
+
+    Args:
+        grade (float): The grade to limit.
+
+    Returns:
+        float: The grade, or 0 or 100 if it lies outside the range.
+    """
+    return grade if 0 <= grade <= 100 else 100 if grade > 100 else 0
 
 
 def match_keywords(file_name, user_keywords):
     """
     Matches user-specified keywords against genre-specific keywords
-    loaded beforehand from a file.
+    loaded beforehand from a file. The file is served from the shared
+    lexicon registry, so it is only read again after it changes, and its
+    deletion index is used to find candidates for fuzzy matching.
 
     Args:
         file_name (str): The file name where keywords are stored.
@@ -33,19 +56,47 @@ def match_keywords(file_name, user_keywords):
         (spelling mistake / wrong constant)
     """
     try:
-        with open(file_name, "r") as infile:
-            file_keywords = infile.read().lower().split()
-            grade_increment, keyword_count = 0, 0
-            for user_keyword in user_keywords:
-                for file_keyword in file_keywords:
-                    if fuzz.ratio(user_keyword, file_keyword) >= 65:
-                        # Uses fuzzy string matching to detect (close)
-                        # keywords
-                        grade_increment += 15
-                        # Add points to the grade for each keyword found
-                        keyword_count += 1
-                        break
-            return grade_increment, keyword_count
+        # The registry reads each file once and reloads it only on change
+        index = get_lexicon(file_name).deletion_index
+        grade_increment, keyword_count = 0, 0
+        for user_keyword in user_keywords:
+            # Uses fuzzy string matching to detect (close) keywords; the
+            # deletion index limits fuzz.ratio to the few candidate terms
+            if index.matches(user_keyword):
+                grade_increment += 15
+                # Add points to the grade for each keyword found
+                keyword_count += 1
+        return grade_increment, keyword_count
+    except FileNotFoundError:
+        print(
+            f"No file with keywords found at {file_name}!"
+            f"Please ensure such a file"
+            f"exists before running the program "
+            f"again!"
+        )
+        return 0, 0
+
+
+def match_phrases(file_name, text, fuzzy=True):
+    """
+    Matches the user's text against the entries of a keyword file,
+    multi-word entries included, in one pass of the lexicon's automaton.
+
+    Each recognized entry counts as one keyword, so "time travel" scores
+    once as a phrase. Words not covered by any entry can still match a
+    single lexicon word through the fuzzy deletion index.
+
+    Args:
+        file_name (str): The file name where keywords are stored.
+        text (str or list): The user's text or its words.
+        fuzzy (bool): If True, unmatched words fall back to fuzzy matching.
+
+    Returns:
+        tuple: A tuple containing the grade
+        increment and the count of matched keywords.
+    """
+    try:
+        lexicon = get_lexicon(file_name)
     except FileNotFoundError:
         print(
             f"No file with keywords found at {file_name}!"
@@ -53,7 +104,288 @@ def match_keywords(file_name, user_keywords):
             f"exists before running the program "
             f"again!"
         )
-        return 0
+        return 0, 0
+
+    tokens = tokenize(text)
+    occurrences = lexicon.automaton.find(tokens)
+    keyword_count = len(occurrences)
+    if fuzzy:
+        covered = set()
+        for start, end in occurrences:
+            covered.update(range(start, end))
+        index = lexicon.deletion_index
+        keyword_count += sum(
+            1
+            for position, token in enumerate(tokens)
+            if position not in covered and index.matches(token)
+        )
+    return 15 * keyword_count, keyword_count
+
+
+def _lcs_length(word_1, word_2):
+    """Returns the length of the longest common subsequence of two words."""
+    previous = [0] * (len(word_2) + 1)
+    for char_1 in word_1:
+        current = [0]
+        for j, char_2 in enumerate(word_2):
+            current.append(
+                previous[j] + 1
+                if char_1 == char_2
+                else max(previous[j + 1], current[j])
+            )
+        previous = current
+    return previous[-1]
+
+
+def _popcount(values):
+    """Counts the set bits of every element of an uint64 NumPy array."""
+    import numpy as np
+
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values).astype(np.int64)
+    bits = np.unpackbits(np.ascontiguousarray(values).view(np.uint8))
+    return bits.reshape(values.shape + (64,)).sum(axis=-1, dtype=np.int64)
+
+
+def similarity_matrix(tokens, terms):
+    """
+    Computes the similarity score of every token against every term
+    in a single NumPy pass.
+
+    The score is the one fuzz.ratio uses with its Levenshtein backend,
+    round(100 * 2 * LCS / (len(token) + len(term))). It is never lower
+    than fuzz.ratio's pure-Python score, so it can be used to rule pairs
+    out. The longest common subsequences are computed with a bit-parallel
+    kernel: every term is a 64-bit mask per character and all
+    token x term pairs advance together, one token character at a time.
+
+    Args:
+        tokens (list): The user keywords (rows of the matrix).
+        terms (list): The lexicon terms (columns of the matrix).
+
+    Returns:
+        numpy.ndarray: An integer matrix of shape (len(tokens), len(terms))
+        with scores from 0 to 100.
+    """
+    import numpy as np
+
+    tokens, terms = list(tokens), list(terms)
+    scores = np.zeros((len(tokens), len(terms)), dtype=np.int64)
+    if not tokens or not terms:
+        return scores
+
+    lcs = np.zeros_like(scores)
+    kernel_columns = [
+        j for j, term in enumerate(terms)
+        if len(term) <= _MAX_KERNEL_TERM_LENGTH
+    ]
+    for j, term in enumerate(terms):
+        if len(term) > _MAX_KERNEL_TERM_LENGTH:
+            lcs[:, j] = [_lcs_length(token, term) for token in tokens]
+
+    if kernel_columns:
+        # The last alphabet slot stands for characters no term contains
+        alphabet = {}
+        for j in kernel_columns:
+            for char in terms[j]:
+                alphabet.setdefault(char, len(alphabet))
+        masks = np.zeros(
+            (len(kernel_columns), len(alphabet) + 1), dtype=np.uint64
+        )
+        for row, j in enumerate(kernel_columns):
+            for position, char in enumerate(terms[j]):
+                masks[row, alphabet[char]] |= np.uint64(1 << position)
+
+        # Tokens are padded with the unknown slot, which leaves them as-is
+        width = max(len(token) for token in tokens)
+        codes = np.full((len(tokens), width), len(alphabet), dtype=np.intp)
+        for i, token in enumerate(tokens):
+            codes[i, : len(token)] = [
+                alphabet.get(char, len(alphabet)) for char in token
+            ]
+
+        state = np.full(
+            (len(tokens), len(kernel_columns)),
+            np.iinfo(np.uint64).max,
+            dtype=np.uint64,
+        )
+        for position in range(width):
+            matched = state & masks[:, codes[:, position]].T
+            state = (state + matched) | (state - matched)
+
+        term_lengths = np.array(
+            [len(terms[j]) for j in kernel_columns], dtype=np.int64
+        )
+        low_bits = np.array(
+            [(1 << length) - 1 for length in term_lengths], dtype=np.uint64
+        )
+        lcs[:, kernel_columns] = term_lengths - _popcount(state & low_bits)
+
+    totals = np.add.outer(
+        np.array([len(token) for token in tokens], dtype=np.int64),
+        np.array([len(term) for term in terms], dtype=np.int64),
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratios = np.rint(100 * (2.0 * lcs / totals))
+    # fuzz.ratio scores a comparison with an empty string as 0
+    scores[:] = np.where(totals == 0, 0, ratios)
+    return scores
+
+
+def match_keywords_batch(file_names, user_keywords, exact=True):
+    """
+    Matches user-specified keywords against several keyword files at once,
+    scoring all of them through one similarity matrix.
+
+    Args:
+        file_names (list): The keyword files to match against.
+        user_keywords (list): A list of keywords specified by the user.
+        exact (bool): If True, pairs passing the matrix are confirmed with
+        fuzz.ratio, which makes every result identical to match_keywords.
+
+    Returns:
+        dict: The (grade increment, keyword count) tuple of every file.
+    """
+    import numpy as np
+    from fuzzywuzzy import fuzz
+
+    lexicons = {}
+    for file_name in file_names:
+        try:
+            lexicons[file_name] = get_lexicon(file_name).terms
+        except FileNotFoundError:
+            print(
+                f"No file with keywords found at {file_name}!"
+                f"Please ensure such a file"
+                f"exists before running the program "
+                f"again!"
+            )
+            lexicons[file_name] = ()
+
+    tokens = list(dict.fromkeys(user_keywords))
+    terms = list(dict.fromkeys(t for ts in lexicons.values() for t in ts))
+    column_of = {term: j for j, term in enumerate(terms)}
+    passing = similarity_matrix(tokens, terms) >= MATCH_THRESHOLD
+
+    results = {}
+    for file_name, file_terms in lexicons.items():
+        columns = sorted({column_of[term] for term in file_terms})
+        matched = set()
+        for row, token in enumerate(tokens):
+            hits = [columns[c] for c in np.flatnonzero(passing[row, columns])]
+            if hits and (
+                not exact
+                or any(
+                    fuzz.ratio(token, terms[j]) >= MATCH_THRESHOLD
+                    for j in hits
+                )
+            ):
+                matched.add(token)
+        keyword_count = sum(1 for kw in user_keywords if kw in matched)
+        results[file_name] = (15 * keyword_count, keyword_count)
+    return results
+
+
+class ScoringContext:
+    """
+    Holds the per-query state shared by the grading of every book: the
+    session of one query.
+
+    The keyword match of a genre depends only on the user's keywords and
+    the genre's keyword file, so each file is matched once per query and
+    the result is reused by every book of that genre.
+
+    The answers to the follow-up questions are stored here as well, not
+    on the genre classes, so every query has its own and grading only
+    reads them. The questions are asked before grading starts, see
+    questions.py. The title rules fired by the keywords and the answers
+    are looked up once per query, see rules.py.
+
+    Attributes:
+        book_criteria (BookCriteria): The criteria of the query.
+        user_keywords (list): The lower-cased keywords entered by the user.
+        phrase_matching (bool): Whether keyword files are matched with
+        the phrase-aware automaton instead of word by word.
+        mood (str): The user's mood, or None if the user was not asked
+        for a romance.
+        needs_encyclopedia (bool): Whether the user needs an encyclopedia.
+        education_level (str): The level of education the encyclopedia
+        is needed for.
+    """
+
+    def __init__(self, book_criteria, phrase_matching=False):
+        """
+        Initializes the context of a query.
+
+        Args:
+            book_criteria (BookCriteria): The criteria of the query.
+            phrase_matching (bool): If True, multi-word lexicon entries
+            are recognized through match_phrases.
+        """
+        self.book_criteria = book_criteria
+        self.user_keywords = [word.lower() for word in book_criteria.info]
+        self.phrase_matching = phrase_matching
+        self.mood = None
+        self.needs_encyclopedia = False
+        self.education_level = ""
+        self._keyword_matches = {}
+        self._fired_rules = None
+        self._fired_answers = None
+
+    def match_keywords(self, file_name):
+        """
+        Returns the keyword match of a keyword file, computing it only
+        the first time the file is requested in this query.
+
+        Args:
+            file_name (str): The file name where keywords are stored.
+
+        Returns:
+            tuple: A tuple containing the grade
+            increment and the count of matched keywords.
+        """
+        if file_name not in self._keyword_matches:
+            with metrics.span("match_keywords", file=file_name):
+                if self.phrase_matching:
+                    result = match_phrases(file_name, self.user_keywords)
+                else:
+                    result = match_keywords(file_name, self.user_keywords)
+            self._keyword_matches[file_name] = result
+        return self._keyword_matches[file_name]
+
+    def title_rules(self):
+        """
+        Returns the title rules fired by the query, finding them again
+        only when an answer to a follow-up question has changed.
+
+        Returns:
+            FiredRules: The fired rules by targeted book.
+        """
+        from rules import get_rule_table
+
+        answers = (self.mood, self.needs_encyclopedia, self.education_level)
+        if self._fired_rules is None or self._fired_answers != answers:
+            self._fired_rules = get_rule_table().fired(self)
+            self._fired_answers = answers
+        return self._fired_rules
+
+    def match_keyword_index(self, index):
+        """
+        Matches the user's keywords against every file of a keyword index
+        in one pass and keeps the results, so match_keywords does not
+        match those files one by one. Phrase matching is left to
+        match_keywords.
+
+        Args:
+            index (KeywordIndex): The index of the genres' keyword files.
+        """
+        if self.phrase_matching or all(
+            lexicon.file_name in self._keyword_matches
+            for lexicon in index.lexicons
+        ):
+            return
+        for file_name, result in index.match(self.user_keywords).items():
+            self._keyword_matches.setdefault(file_name, result)
 
 
 class Book:
@@ -68,6 +400,10 @@ class Book:
         isbn (str): The International Standard Book Number (ISBN).
     """
 
+    # Slots instead of a per-instance __dict__ keep large catalogs compact;
+    # every subclass declares its own (possibly empty) slots as well
+    __slots__ = ("_title", "_author", "_price", "_year", "_isbn", "_grade")
+
     def __init__(self, title, author, price, year, isbn):
         """
         Initializes a new instance of the Book class.
@@ -153,10 +489,7 @@ class Book:
         Raises:
             ValueError: If the new ISBN does not match the expected format.
         """
-        # Define the regex pattern for ISBN: four letters, a hyphen, then four
-        # digits.
-        pattern = r"^[A-Za-z]{4}-\d{4}$"
-        if re.match(pattern, new_isbn):
+        if ISBN_PATTERN.match(new_isbn):
             self._isbn = new_isbn
         else:
             raise ValueError(
@@ -175,11 +508,7 @@ class Book:
         Sets the grade of the book.
         Ensures the grade is between 0 and 100.
         """
-        self._grade = (
-            new_grade
-            if 0 <= new_grade <= 100
-            else 100 if new_grade > 100 else 0
-        )
+        self._grade = clamp_grade(new_grade)
 
     def get_genre(self):
         """
@@ -191,27 +520,72 @@ class Book:
         """
         pass
 
-    def calculate_grade(self, book_criteria):
+    def score(self, book_criteria, context=None):
         """
-        Calculates the initial grade of the book based on
-        the price and external criteria.
+        Computes the grade of the book for a query without changing the
+        book, so one book can be scored for many queries at once. The
+        genre subclasses extend the initial grade given here.
 
         Args:
             book_criteria (BookCriteria): Criteria containing
             the maximum price acceptable and other factors.
+            context (ScoringContext): Optional per-query state shared
+            between books; used by the genre subclasses.
 
-        Returns: bool: True if it is safe to proceed
-        with further grade modifications
-        (i.e. if the price of the book
-        is less than the maximum price specified by the user),
+        Returns:
+            float: 0 if the book costs more than the maximum price
+            specified by the user, otherwise the initial grade 10.
+        """
+        if metrics.enabled:
+            metrics.increment("books_graded", genre=self.get_genre())
+        return 0 if self.price > book_criteria.max_price else 10
+
+    @staticmethod
+    def follow_up_question(context):
+        """
+        Names the follow-up question books of this genre need answered
+        before a query is graded. Only some genres ask one.
+
+        Args:
+            context (ScoringContext): The per-query state of the query.
+
+        Returns:
+            str: The name of the question, or None.
+        """
+        return None
+
+    def apply_title_rules(self, grade, context):
+        """
+        Applies the title rules the query fired for this book, e.g. the
+        bonus of the romance recommended for the user's mood.
+
+        Args:
+            grade (float): The grade given by the genre's formula.
+            context (ScoringContext): The per-query state of the query.
+
+        Returns:
+            float: The grade after the rules, from 0 to 100.
+        """
+        for rule in context.title_rules().rules_for(self):
+            grade = rule.apply(grade)
+        return grade
+
+    def calculate_grade(self, book_criteria, context=None):
+        """
+        Calculates the grade of the book for a query and stores it.
+
+        Args:
+            book_criteria (BookCriteria): Criteria containing
+            the maximum price acceptable and other factors.
+            context (ScoringContext): Optional per-query state shared
+            between books, holding the answers to the follow-up questions.
+
+        Returns: bool: True if the price of the book
+        is less than the maximum price specified by the user,
         otherwise False.
         """
-        if self.price > book_criteria.max_price:
-            self.grade = 0
-            return False
-        else:
-            self.grade = 10
-            return True
+        self.grade = self.score(book_criteria, context)
+        return self.price <= book_criteria.max_price
 
     def __lt__(self, other):
         """Compare this book instance with another
@@ -247,10 +621,10 @@ class Book:
 class Fiction(Book):
     """Represents a fiction genre book, inheriting from Book."""
 
-    pass
+    __slots__ = ()
 
 
 class NonFiction(Book):
     """Represents a non-fiction genre book, inheriting from Book."""
 
-    pass
+    __slots__ = ()
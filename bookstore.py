@@ -3,17 +3,59 @@ File: bookstore.py
 Author: Lyuboslav Gigov
 Purpose: Defines the Bookstore class that manages a collection of books.
 It includes functionality to load books from a file, sort them,
-and manage inventory based on book genre and attributes.
+and manage inventory based on book genre and attributes, as well as
+a streaming mode that grades the inventory while parsing it.
+
+A loaded inventory can be changed book by book through add_book,
+update_book and remove_book, or by applying a delta file. Every line
+of a delta file is one change:
+
+    add; <inventory line>       adds a new book
+    update; <inventory line>    replaces the book with the same ISBN
+    remove; <ISBN>              removes a book
 """
 
+import bisect
+import heapq
+import math
 import sys
+from operator import attrgetter, itemgetter
+import biography
+import encyclopedia
+import romance
+import science_fiction
+from book import ScoringContext
 from science_fiction import ScienceFiction
 from romance import Romance
 from biography import Biography
 from encyclopedia import Encyclopedia
+from export import DEFAULT_PAGE_SIZE, select_page
+from genre_index import GenreIndex
+from instrumentation import metrics
+from lexicon import get_keyword_index
+from questions import needed_questions
+from snapshot import SNAPSHOT_FILE_NAME, read_snapshot, write_snapshot
 
 FILE_NAME = "Bookstore_Inventory.txt"
 
+# Genres whose inventory lines carry two genre characteristics
+FICTION_GENRES = {"Science Fiction": ScienceFiction, "Romance": Romance}
+NON_FICTION_GENRES = {"Biography": Biography, "Encyclopedia": Encyclopedia}
+
+# The keyword file of every genre
+KEYWORD_FILE_NAMES = (
+    science_fiction.KEYWORD_FILE_NAME,
+    romance.KEYWORD_FILE_NAME,
+    biography.KEYWORD_FILE_NAME,
+    encyclopedia.KEYWORD_FILE_NAME,
+)
+
+# Ranking key of a graded book
+GRADE = attrgetter("grade")
+
+# The operations of a delta file line
+CHANGE_OPERATIONS = ("add", "update", "remove")
+
 
 class Bookstore:
     """
@@ -23,114 +65,596 @@ class Bookstore:
 
     Attributes:
         __books (list): A private list of books loaded from the inventory file.
+        __price_index (list): (price, sequence, book) entries sorted by
+        price; the sequence numbers follow the inventory order.
+        __entries (dict): The price index entry of every book by ISBN,
+        so a book is found by its ISBN in O(1).
+        __genre_index (GenreIndex): The books grouped by genre, used to
+        grade only the books that can reach the top k.
+        __next_sequence (int): The sequence number of the next book added.
+        __version (int): The number of changes made since loading.
     """
 
-    def __init__(self):
+    def __init__(self, books=None):
         """Initializes the Bookstore and loads books
-        from the specified inventory file."""
-        self.__books = self.load_books()
+        from the specified inventory file.
+
+        Args:
+            books (list): Books to use instead of loading the inventory
+            file, e.g. the books of a snapshot.
+
+        Raises:
+            ValueError: If several of the given books share an ISBN.
+        """
+        self.__books = self.load_books() if books is None else list(books)
+        self.__price_index = sorted(
+            (book.price, sequence, book)
+            for sequence, book in enumerate(self.__books)
+        )
+        self.__entries = {entry[2].isbn: entry for entry in self.__price_index}
+        if len(self.__entries) != len(self.__books):
+            Bookstore.check_isbns(book.isbn for book in self.__books)
+        self.__genre_index = GenreIndex(self.__price_index)
+        self.__next_sequence = len(self.__books)
+        self.__version = 0
+
+    @property
+    def books(self):
+        """Returns the books of the bookstore in inventory order."""
+        return self.__books
+
+    @property
+    def version(self):
+        """
+        Returns the number of changes made to the inventory since it was
+        loaded, so results computed for an older version can be dropped.
+        """
+        return self.__version
+
+    def get_by_isbn(self, isbn):
+        """
+        Finds a book by its ISBN through the ISBN index.
+
+        Args:
+            isbn (str): The ISBN of the book.
+
+        Returns:
+            Book: The book, or None if no book has the ISBN.
+        """
+        entry = self.__entries.get(isbn)
+        return None if entry is None else entry[2]
+
+    def contains(self, isbn):
+        """
+        Checks whether a book with an ISBN is in the inventory.
+
+        Args:
+            isbn (str): The ISBN to look for.
+
+        Returns:
+            bool: True if a book has the ISBN, otherwise False.
+        """
+        return isbn in self.__entries
+
+    def __position(self, sequence):
+        """Returns the position in __books of the book with a sequence."""
+        return bisect.bisect_left(
+            self.__books,
+            sequence,
+            key=lambda book: self.__entries[book.isbn][1],
+        )
+
+    def __entry(self, isbn):
+        """
+        Returns the price index entry of the book with an ISBN.
+
+        Raises:
+            ValueError: If no book has the ISBN.
+        """
+        entry = self.__entries.get(isbn)
+        if entry is None:
+            raise ValueError(f"No book with ISBN {isbn} in the inventory.")
+        return entry
+
+    def add_book(self, book):
+        """
+        Adds a book at the end of the inventory. The price index is
+        updated in place instead of being sorted again.
+
+        Args:
+            book (Book): The book to add.
+
+        Raises:
+            ValueError: If a book with the same ISBN is already stocked.
+        """
+        if book.isbn in self.__entries:
+            raise ValueError(
+                f"A book with ISBN {book.isbn} is already in the inventory."
+            )
+        entry = (book.price, self.__next_sequence, book)
+        self.__next_sequence += 1
+        self.__entries[book.isbn] = entry
+        # Sequences are unique, so the books themselves are never compared
+        bisect.insort(self.__price_index, entry)
+        self.__genre_index.add(entry)
+        self.__books.append(book)
+        self.__version += 1
+
+    def update_book(self, book):
+        """
+        Replaces the stocked book that has the ISBN of the given book,
+        e.g. to change its price. The new book keeps the old one's place
+        in the inventory order.
+
+        Args:
+            book (Book): The new version of the book.
+
+        Raises:
+            ValueError: If no book has the ISBN.
+        """
+        old_entry = self.__entry(book.isbn)
+        price, sequence, _ = old_entry
+        self.__books[self.__position(sequence)] = book
+        del self.__price_index[
+            bisect.bisect_left(self.__price_index, (price, sequence))
+        ]
+        self.__genre_index.remove(old_entry)
+        entry = self.__entries[book.isbn] = (book.price, sequence, book)
+        bisect.insort(self.__price_index, entry)
+        self.__genre_index.add(entry)
+        self.__version += 1
+
+    def remove_book(self, isbn):
+        """
+        Removes a book from the inventory.
+
+        Args:
+            isbn (str): The ISBN of the book to remove.
+
+        Raises:
+            ValueError: If no book has the ISBN.
+
+        Returns:
+            Book: The removed book.
+        """
+        entry = self.__entry(isbn)
+        price, sequence, book = entry
+        del self.__books[self.__position(sequence)]
+        del self.__price_index[
+            bisect.bisect_left(self.__price_index, (price, sequence))
+        ]
+        self.__genre_index.remove(entry)
+        del self.__entries[isbn]
+        self.__version += 1
+        return book
+
+    def __check_changes(self, changes):
+        """
+        Checks that every change of a delta fits the inventory as the
+        changes before it leave it.
+
+        Raises:
+            ValueError: If a change adds a stocked ISBN, or updates or
+            removes an ISBN that is not stocked.
+        """
+        stocked = {}  # ISBN -> whether it is stocked after the changes
+        for number, (operation, change) in enumerate(changes, 1):
+            isbn = change if operation == "remove" else change.isbn
+            present = stocked.get(isbn, isbn in self.__entries)
+            if operation == "add" and present:
+                raise ValueError(
+                    f"Change {number}: a book with ISBN {isbn} is already "
+                    f"in the inventory."
+                )
+            if operation != "add" and not present:
+                raise ValueError(
+                    f"Change {number}: no book with ISBN {isbn} in the "
+                    f"inventory."
+                )
+            stocked[isbn] = operation != "remove"
+
+    def apply_delta(self, file_name):
+        """
+        Applies the changes of a delta file to the inventory in file
+        order. The whole file is parsed and checked against the stocked
+        ISBNs first, so a malformed line or a change that does not fit
+        the inventory leaves the inventory unchanged.
+
+        Args:
+            file_name (str): The delta file to read.
+
+        Raises:
+            FileNotFoundError: If the specified file cannot be found.
+            ValueError: If a line cannot be parsed, or if a change does
+            not fit the inventory (e.g. removing an unknown ISBN).
+
+        Returns:
+            int: The number of changes applied.
+        """
+        changes = list(Bookstore.iter_changes(file_name))
+        self.__check_changes(changes)
+        for operation, change in changes:
+            if operation == "add":
+                self.add_book(change)
+            elif operation == "update":
+                self.update_book(change)
+            else:
+                self.remove_book(change)
+        return len(changes)
+
+    def count_within_budget(self, max_price):
+        """
+        Counts the books a customer can afford through the price index.
+
+        Args:
+            max_price (float): The maximum price the customer pays.
+
+        Returns:
+            int: The number of books priced at most max_price.
+        """
+        return bisect.bisect_right(self.__price_index, (max_price, math.inf))
+
+    def books_within_budget(self, max_price):
+        """
+        Finds the books a customer can afford through the price index,
+        without visiting the books over budget.
+
+        Args:
+            max_price (float): The maximum price the customer pays.
+
+        Returns:
+            list: The books priced at most max_price, in inventory order.
+        """
+        cut = bisect.bisect_right(self.__price_index, (max_price, math.inf))
+        return [
+            book
+            for _, _, book in sorted(
+                self.__price_index[:cut], key=itemgetter(1)
+            )
+        ]
+
+    def grade_books(self, book_criteria, context=None):
+        """
+        Grades the books for a query and stores the grades on them.
+        Only the books within budget go through their genre's
+        calculate_grade; every book over budget gets the grade 0 that
+        Book.calculate_grade would give it.
+
+        Args:
+            book_criteria (BookCriteria): The criteria to grade against.
+            context (ScoringContext): Optional per-query state shared
+            by the grading of every book, holding the answers to the
+            follow-up questions.
+
+        Returns:
+            list: The books of the bookstore in inventory order.
+        """
+        if context is None:
+            context = ScoringContext(book_criteria)
+        cut = bisect.bisect_right(
+            self.__price_index, (book_criteria.max_price, math.inf)
+        )
+        for _, _, book in self.__price_index[cut:]:
+            book.grade = 0
+        for book in self.books_within_budget(book_criteria.max_price):
+            book.calculate_grade(book_criteria, context)
+        return self.__books
+
+    def follow_up_questions(self, context):
+        """
+        Finds the follow-up questions a query needs; only the books
+        within budget are visited.
+
+        Args:
+            context (ScoringContext): The per-query state of the query.
+
+        Returns:
+            list: The names of the questions to ask, in inventory order.
+        """
+        return needed_questions(
+            self.books_within_budget(context.book_criteria.max_price),
+            context,
+        )
+
+    @staticmethod
+    def __match_keywords(context):
+        """Matches the user's keywords against every genre at once."""
+        with metrics.span("match_keywords"):
+            try:
+                context.match_keyword_index(
+                    get_keyword_index(KEYWORD_FILE_NAMES)
+                )
+            except FileNotFoundError:
+                pass  # match_keywords reports the missing file
+
+    def rank_books(self, book_criteria, context=None, k=5):
+        """
+        Grades the books for a query without storing the grades on the
+        books, so several queries can be ranked at the same time.
+
+        The user's keywords are matched against every genre at once
+        through the keyword index, and only the books that can reach
+        the top k are graded (see GenreIndex); when books graded 0 can
+        reach it, every book is graded.
+
+        Args:
+            book_criteria (BookCriteria): The criteria to grade against.
+            context (ScoringContext): Optional per-query state holding
+            the answers to the follow-up questions.
+            k (int): The number of books to select.
+
+        Returns:
+            list: (book, grade) pairs of the k best books, highest grade
+            first; books with equal grades keep their inventory order.
+        """
+        if context is None:
+            context = ScoringContext(book_criteria)
+        self.__match_keywords(context)
+        ranked = self.__genre_index.rank(book_criteria, context, k)
+        if ranked is not None:
+            return ranked
+        with metrics.span("grade", genre="all"):
+            return heapq.nlargest(
+                k,
+                (
+                    (book, book.score(book_criteria, context))
+                    for book in self.__books
+                ),
+                key=itemgetter(1),
+            )
+
+    def rank_page(self, book_criteria, context=None, cursor=None,
+                  limit=DEFAULT_PAGE_SIZE):
+        """
+        Grades every book for a query and selects one page of the
+        ranking, without storing the grades on the books. Books with
+        equal grades keep their inventory order, and a book keeps its
+        place when other books are added, updated or removed, so paging
+        with the returned cursors neither repeats nor skips a book.
+
+        Args:
+            book_criteria (BookCriteria): The criteria to grade against.
+            context (ScoringContext): Optional per-query state holding
+            the answers to the follow-up questions.
+            cursor (str): The next_cursor of the previous page, or None
+            for the first page.
+            limit (int): The number of books in the page.
+
+        Raises:
+            ValueError: If the cursor or the limit is invalid.
+
+        Returns:
+            tuple: The (book, grade) pairs of the page, the cursor of
+            the next page (None after the last page) and the rank of the
+            first book of the page.
+        """
+        if context is None:
+            context = ScoringContext(book_criteria)
+        self.__match_keywords(context)
+        with metrics.span("grade", genre="all"):
+            return select_page(
+                (
+                    (book.score(book_criteria, context), sequence, book)
+                    for _, sequence, book in self.__price_index
+                ),
+                cursor,
+                limit,
+            )
 
     @staticmethod
-    def load_books():
+    def parse_book(line):
+        """
+        Creates a book object from one line of the inventory file.
+
+        Science fiction and romance lines carry detailed characteristics
+        (8 fields per line), biographies and encyclopedias only general
+        information (6 fields per line).
+
+        Args:
+            line (str): A semicolon-separated inventory line.
+
+        Raises:
+            ValueError: If the line does not contain the expected
+            number of fields, or if an invalid book genre is found.
+
+        Returns:
+            Book: The book described by the line.
+        """
+        if metrics.enabled:
+            metrics.increment("books_parsed")
+        parts = [part.strip() for part in line.strip().split(";")]
+        genre = parts[2] if len(parts) > 2 else ""
+        expected = 8 if genre in FICTION_GENRES else 6
+        if len(parts) != expected:
+            raise ValueError(
+                f"Incorrect number of fields."
+                f"Expected {expected}, got {len(parts)}. Line: {line}"
+            )
+
+        # Authors repeat across the inventory, so one copy is shared
+        title, author = parts[0], sys.intern(parts[1])
+        price = float(parts[3])
+        year = int(parts[4])
+        isbn = parts[5]
+
+        if genre in FICTION_GENRES:
+            genre_characteristic_1, genre_characteristic_2 = int(
+                parts[6]
+            ), int(parts[7])
+            return FICTION_GENRES[genre](
+                title,
+                author,
+                price,
+                year,
+                isbn,
+                genre_characteristic_1,
+                genre_characteristic_2,
+            )
+        if genre in NON_FICTION_GENRES:
+            return NON_FICTION_GENRES[genre](title, author, price, year, isbn)
+        raise ValueError(
+            f"Invalid genre: {genre}, please check"
+            f"the spelling"
+            f"in the input file and try again."
+        )
+
+    @staticmethod
+    def check_isbns(isbns):
+        """
+        Checks that no two books share an ISBN. Every duplicated ISBN is
+        reported at once, with the positions of its books in the
+        inventory (counted from 1).
+
+        Args:
+            isbns (iterable): The ISBNs of the books in inventory order.
+
+        Raises:
+            ValueError: If several books share an ISBN.
+        """
+        positions = {}
+        for position, isbn in enumerate(isbns, 1):
+            positions.setdefault(isbn, []).append(position)
+        duplicates = [
+            f"{isbn} (books {', '.join(map(str, shared))})"
+            for isbn, shared in positions.items()
+            if len(shared) > 1
+        ]
+        if duplicates:
+            raise ValueError(
+                f"Duplicate ISBNs in the inventory: {'; '.join(duplicates)}."
+            )
+
+    @staticmethod
+    def parse_change(line):
+        """
+        Parses one line of a delta file.
+
+        Args:
+            line (str): An operation, a semicolon and either an inventory
+            line (add, update) or an ISBN (remove).
+
+        Raises:
+            ValueError: If the operation is unknown or its book or ISBN
+            cannot be parsed.
+
+        Returns:
+            tuple: The operation and the book, or the ISBN to remove.
+        """
+        operation, _, change = line.strip().partition(";")
+        operation = operation.strip().lower()
+        if operation not in CHANGE_OPERATIONS:
+            raise ValueError(
+                f"Invalid change: {operation}. Expected one of "
+                f"{', '.join(CHANGE_OPERATIONS)}. Line: {line}"
+            )
+        if operation == "remove":
+            isbn = change.strip()
+            if not isbn or ";" in isbn:
+                raise ValueError(f"Expected a single ISBN. Line: {line}")
+            return operation, isbn
+        return operation, Bookstore.parse_book(change)
+
+    @staticmethod
+    def iter_changes(file_name):
+        """
+        Lazily parses a delta file one line at a time. Blank lines are
+        skipped.
+
+        Args:
+            file_name (str): The delta file to read.
+
+        Raises:
+            FileNotFoundError: If the specified file cannot be found.
+            ValueError: If a line cannot be parsed into a change.
+
+        Yields:
+            tuple: The operation and the book, or the ISBN to remove.
+        """
+        with open(file_name, "r") as readfile:
+            for line in readfile:
+                if line.strip():
+                    yield Bookstore.parse_change(line)
+
+    @staticmethod
+    def iter_books(file_name=FILE_NAME):
+        """
+        Lazily parses the inventory file one line at a time, so only the
+        current line and book are held in memory. Blank lines are skipped.
+
+        Args:
+            file_name (str): The inventory file to read.
+
+        Raises:
+            FileNotFoundError: If the specified file cannot be found.
+            ValueError: If a line cannot be parsed into a book.
+
+        Yields:
+            Book: The books of the inventory in file order.
+        """
+        with open(file_name, "r") as readfile:
+            for line in readfile:
+                if line.strip():
+                    yield Bookstore.parse_book(line)
+
+    @staticmethod
+    def load_books(file_name=FILE_NAME):
         """
         Processes books from a predefined text file
         into a list.
 
         The method reads a formatted text file where each line
-        corresponds to a book with its details.
-        It processes two sections of the file: the first with
-        detailed characteristics (8 fields per line)
-        and the second with general information (6 fields per line).
+        corresponds to a book with its details: science fiction and
+        romance books with detailed characteristics (8 fields per line)
+        and biographies and encyclopedias with general information
+        (6 fields per line).
+
+        Args:
+            file_name (str): The inventory file to read.
 
         Raises:
             FileNotFoundError: If the specified file cannot be found.
             ValueError: If any line in the file does
             not contain the expected number of fields,
-            or if an invalid book genre is found.
+            or if an invalid book genre is found,
+            or if several books share an ISBN.
 
         Returns:
             list: A list of book objects created from the file data.
         """
-        books = []
         try:
-            with open(FILE_NAME, "r") as readfile:
-                lines = readfile.readlines()
-                lines = [
-                    line.strip() for line in lines
-                ]  # Strip newline characters from all lines
-                # Process the first part of the file (the first 7 lines)
-                for line in lines[:7]:
-                    line = line.strip()
-                    parts = [part.strip() for part in line.split(";")]
-                    if len(parts) != 8:
-                        raise ValueError(
-                            f"Incorrect number of fields."
-                            f"Expected 8, got {len(parts)}. Line: {line}"
-                        )
-
-                    title, author, genre = parts[0], parts[1], parts[2]
-                    price = float(parts[3])
-                    year = int(parts[4])
-                    isbn = parts[5]
-                    genre_characteristic_1, genre_characteristic_2 = int(
-                        parts[6]
-                    ), int(parts[7])
-
-                    if genre == "Science Fiction":
-                        book = ScienceFiction(
-                            title,
-                            author,
-                            price,
-                            year,
-                            isbn,
-                            genre_characteristic_1,
-                            genre_characteristic_2,
-                        )
-                    elif genre == "Romance":
-                        book = Romance(
-                            title,
-                            author,
-                            price,
-                            year,
-                            isbn,
-                            genre_characteristic_1,
-                            genre_characteristic_2,
-                        )
-                    else:
-                        raise ValueError(
-                            f"Invalid genre: {genre}, please check"
-                            f"the spelling"
-                            f"in the input file and try again."
-                        )
-                    books.append(book)
-
-                # Process the remaining lines
-                for line in lines[7:]:
-                    line = line.strip()
-                    parts = [part.strip() for part in line.split(";")]
-                    if len(parts) != 6:
-                        raise ValueError(
-                            f"Incorrect number of fields."
-                            f"Expected 6, got {len(parts)}. Line: {line}"
-                        )
-
-                    title, author, genre = parts[0], parts[1], parts[2]
-                    price = float(parts[3])
-                    year = int(parts[4])
-                    isbn = parts[5]
-
-                    if genre == "Biography":
-                        book = Biography(title, author, price, year, isbn)
-                    elif genre == "Encyclopedia":
-                        book = Encyclopedia(title, author, price, year, isbn)
-                    else:
-                        raise ValueError(
-                            f"Invalid genre: {genre},"
-                            f"please check the spelling"
-                            f"in the input file and try again."
-                        )
-                    books.append(book)
+            with metrics.span("parse_inventory"):
+                books = list(Bookstore.iter_books(file_name))
+            Bookstore.check_isbns(book.isbn for book in books)
+            return books
+        except FileNotFoundError:
+            print(
+                "File containing bookstore inventory not found."
+                "Please check that it has the right name!"
+            )
+            sys.exit()
+        except ValueError as ve:
+            print(ve)
+            sys.exit()
+
+    @staticmethod
+    def load_catalog(file_name=FILE_NAME):
+        """
+        Loads the inventory file into a columnar Catalog, parsing it one
+        line at a time so no list of book objects is ever built.
 
+        Args:
+            file_name (str): The inventory file to read.
+
+        Returns:
+            Catalog: The books of the inventory in column form.
+        """
+        from catalog import Catalog
+
+        try:
+            with metrics.span("parse_inventory"):
+                catalog = Catalog.from_books(Bookstore.iter_books(file_name))
+            Bookstore.check_isbns(catalog.isbns)
+            return catalog
         except FileNotFoundError:
             print(
                 "File containing bookstore inventory not found."
@@ -141,4 +665,129 @@ class Bookstore:
             print(ve)
             sys.exit()
 
+    @staticmethod
+    def write_snapshot(file_name=FILE_NAME,
+                       snapshot_name=SNAPSHOT_FILE_NAME):
+        """
+        Parses the inventory file and writes its compiled snapshot.
+
+        Args:
+            file_name (str): The inventory file to read.
+            snapshot_name (str): The snapshot file to write.
+
+        Returns:
+            list: The books parsed from the inventory file.
+        """
+        books = Bookstore.load_books(file_name)
+        write_snapshot(books, file_name, snapshot_name)
+        return books
+
+    @staticmethod
+    def load_snapshot(file_name=FILE_NAME, snapshot_name=SNAPSHOT_FILE_NAME):
+        """
+        Loads the books from the compiled snapshot of the inventory file,
+        falling back to the text parser (and rebuilding the snapshot)
+        when the snapshot is missing or older than the inventory.
+
+        Args:
+            file_name (str): The inventory file the snapshot belongs to.
+            snapshot_name (str): The snapshot file to read.
+
+        Returns:
+            list: A list of book objects of the inventory.
+        """
+        with metrics.span("read_snapshot"):
+            books = read_snapshot(file_name, snapshot_name)
+        if books is None:
+            books = Bookstore.load_books(file_name)
+            try:
+                write_snapshot(books, file_name, snapshot_name)
+            except OSError:
+                pass  # A read-only location only costs the speed-up
         return books
+
+    @staticmethod
+    def top_books(books, k=5):
+        """
+        Selects the k best graded books with a bounded heap, in
+        O(n log k) instead of sorting the whole collection.
+
+        The books are compared by their grade attribute, not through
+        Book.__lt__, and books with equal grades keep their order in
+        the collection, exactly as in books.sort(reverse=True)[:k].
+
+        Args:
+            books (iterable): The graded books, e.g. a list or generator.
+            k (int): The number of books to select.
+
+        Returns:
+            list: The k best books, highest grade first.
+        """
+        return heapq.nlargest(k, books, key=GRADE)
+
+    @staticmethod
+    def stream_top_books(book_criteria, k=5, context=None,
+                         file_name=FILE_NAME, ask=None):
+        """
+        Grades the inventory while it is being parsed and keeps only the
+        k best books, so peak memory does not grow with the catalog.
+
+        Books with equal grades keep their inventory order, as they do
+        when the whole collection is sorted.
+
+        The follow-up questions are found during the same pass: a
+        question is asked when the first book within budget that needs
+        it is reached, before that book is graded. Only the books of
+        the genre asking a question read its answer, so the questions
+        and their order are those of needed_questions, without parsing
+        the inventory twice.
+
+        Args:
+            book_criteria (BookCriteria): The criteria to grade against.
+            k (int): The number of books to keep.
+            context (ScoringContext): Optional per-query state shared
+            by the grading of every book, holding the answers to the
+            follow-up questions.
+            file_name (str): The inventory file to read.
+            ask (function): Asks questions and stores the answers in the
+            context, e.g. questions.ask_questions; None grades with the
+            answers the context already holds.
+
+        Returns:
+            list: The k best books, highest grade first.
+        """
+        if context is None:
+            context = ScoringContext(book_criteria)
+        max_price = book_criteria.max_price
+
+        def graded_books():
+            # A genre's question depends only on the query, so every
+            # genre is checked once
+            unchecked = set()
+            if ask is not None:
+                unchecked = {
+                    *FICTION_GENRES.values(), *NON_FICTION_GENRES.values()
+                }
+            asked = set()
+            for book in Bookstore.iter_books(file_name):
+                genre = type(book)
+                if genre in unchecked and book.price <= max_price:
+                    unchecked.discard(genre)
+                    question = genre.follow_up_question(context)
+                    if question is not None and question not in asked:
+                        asked.add(question)
+                        ask([question], context)
+                book.calculate_grade(book_criteria, context)
+                yield book
+
+        try:
+            return Bookstore.top_books(graded_books(), k)
+        except FileNotFoundError:
+            print(
+                "File containing bookstore inventory not found."
+                "Please check that it has the right name!"
+            )
+            sys.exit()
+        except ValueError as ve:
+            print(ve)
+            sys.exit()
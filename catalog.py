@@ -0,0 +1,262 @@
+"""
+File: catalog.py
+Author: Lyuboslav Gigov
+Purpose: This module defines the Catalog class, a columnar backing store
+for large bookstore inventories. Numeric fields (price, year, genre code,
+the two genre characteristics and the grade) live in contiguous typed
+arrays and strings in interned pools, so a book costs a few dozen bytes
+instead of a full Python object. Book objects are only created on
+demand, when a caller asks for a specific row.
+"""
+
+from array import array
+from book import ScoringContext
+from snapshot import CHARACTERISTIC_ATTRIBUTES, GENRES, restore_book
+
+# Index of every genre class in the genre code column
+GENRE_CODES = {genre: code for code, genre in enumerate(GENRES)}
+
+
+class StringPool:
+    """
+    Stores every distinct string once and refers to it by index.
+
+    Attributes:
+        strings (list): The distinct strings in insertion order.
+    """
+
+    def __init__(self):
+        """Initializes an empty pool."""
+        self.strings = []
+        self._index = {}
+
+    @classmethod
+    def from_strings(cls, strings):
+        """
+        Builds a pool holding the given distinct strings in order.
+
+        Args:
+            strings (iterable): The distinct strings.
+
+        Returns:
+            StringPool: The pool.
+        """
+        pool = cls()
+        for text in strings:
+            pool.add(text)
+        return pool
+
+    def add(self, text):
+        """
+        Returns the index of a string, adding it to the pool if needed.
+
+        Args:
+            text (str): The string to store.
+
+        Returns:
+            int: The index of the string in the pool.
+        """
+        index = self._index.get(text)
+        if index is None:
+            index = self._index[text] = len(self.strings)
+            self.strings.append(text)
+        return index
+
+    def __getitem__(self, index):
+        """Returns the string stored at an index."""
+        return self.strings[index]
+
+    def __len__(self):
+        """Returns the number of distinct strings."""
+        return len(self.strings)
+
+
+class Catalog:
+    """
+    A column-oriented collection of books.
+
+    Attributes:
+        prices (array): The price of every book ('d').
+        years (array): The publication year of every book ('i').
+        genres (array): The genre code of every book, an index in GENRES ('B').
+        first_characteristics (array): The first genre characteristic,
+        0 for genres without characteristics ('i').
+        second_characteristics (array): The second genre characteristic ('i').
+        grades (array): The last computed grade of every book ('d').
+        titles (array): Indexes of the titles in the title pool ('I').
+        authors (array): Indexes of the authors in the author pool ('I').
+        isbns (list): The ISBN of every book.
+    """
+
+    # Typed columns, with their array type codes
+    NUMERIC_COLUMNS = (
+        ("prices", "d"),
+        ("years", "i"),
+        ("genres", "B"),
+        ("first_characteristics", "i"),
+        ("second_characteristics", "i"),
+        ("grades", "d"),
+        ("titles", "I"),
+        ("authors", "I"),
+    )
+
+    def __init__(self):
+        """Initializes an empty catalog."""
+        self.prices = array("d")
+        self.years = array("i")
+        self.genres = array("B")
+        self.first_characteristics = array("i")
+        self.second_characteristics = array("i")
+        self.grades = array("d")
+        self.titles = array("I")
+        self.authors = array("I")
+        self.isbns = []
+        self.title_pool = StringPool()
+        self.author_pool = StringPool()
+
+    @classmethod
+    def from_books(cls, books):
+        """
+        Builds a catalog from book objects (or any iterable of them,
+        such as Bookstore.iter_books, without holding the objects).
+
+        Args:
+            books (iterable): The books to store.
+
+        Returns:
+            Catalog: The catalog holding the books.
+        """
+        catalog = cls()
+        for book in books:
+            catalog.append(book)
+        return catalog
+
+    def append(self, book):
+        """
+        Adds a book at the end of the catalog.
+
+        Args:
+            book (Book): The book to store; its values are copied.
+        """
+        genre = type(book)
+        characteristics = [
+            getattr(book, attribute)
+            for attribute in CHARACTERISTIC_ATTRIBUTES.get(genre, ())
+        ] or [0, 0]
+        self.prices.append(book.price)
+        self.years.append(book.year)
+        self.genres.append(GENRE_CODES[genre])
+        self.first_characteristics.append(characteristics[0])
+        self.second_characteristics.append(characteristics[1])
+        self.grades.append(getattr(book, "_grade", 0))
+        self.titles.append(self.title_pool.add(book.title))
+        self.authors.append(self.author_pool.add(book.author))
+        self.isbns.append(book.isbn)
+
+    def __len__(self):
+        """Returns the number of books in the catalog."""
+        return len(self.prices)
+
+    def book(self, index):
+        """
+        Creates the book object of one row. The object is a copy: grading
+        it does not change the catalog until its grade is stored back
+        with set_grade.
+
+        Args:
+            index (int): The row of the book.
+
+        Returns:
+            Book: The book of the row, carrying the row's grade.
+        """
+        book = restore_book(
+            GENRES[self.genres[index]],
+            self.title_pool[self.titles[index]],
+            self.author_pool[self.authors[index]],
+            self.prices[index],
+            self.years[index],
+            self.isbns[index],
+            self.first_characteristics[index],
+            self.second_characteristics[index],
+        )
+        grade = self.grades[index]
+        book.grade = int(grade) if grade.is_integer() else grade
+        return book
+
+    def __iter__(self):
+        """Yields the book object of every row, one at a time."""
+        for index in range(len(self)):
+            yield self.book(index)
+
+    def set_grade(self, index, grade):
+        """
+        Stores the grade of a row.
+
+        Args:
+            index (int): The row of the book.
+            grade (float): The new grade.
+        """
+        self.grades[index] = grade
+
+    def column(self, name):
+        """
+        Returns a NumPy view of a numeric column, sharing its memory.
+
+        Args:
+            name (str): The attribute name of the column, e.g. "prices".
+
+        Returns:
+            numpy.ndarray: The column without a copy.
+        """
+        import numpy as np
+
+        return np.asarray(memoryview(getattr(self, name)))
+
+    def indexes_within_budget(self, max_price):
+        """
+        Scans the price column for the books a customer can afford.
+
+        Args:
+            max_price (float): The maximum price the customer pays.
+
+        Returns:
+            list: The rows whose price does not exceed max_price.
+        """
+        return [
+            index for index, price in enumerate(self.prices)
+            if price <= max_price
+        ]
+
+    def indexes_published_between(self, first_year, last_year):
+        """
+        Scans the year column for the books published in a range of years.
+
+        Args:
+            first_year (int): The first year of the range.
+            last_year (int): The last year of the range, inclusive.
+
+        Returns:
+            list: The rows whose year falls in the range.
+        """
+        return [
+            index for index, year in enumerate(self.years)
+            if first_year <= year <= last_year
+        ]
+
+    def grade_books(self, book_criteria, context=None):
+        """
+        Grades every row with the genre's calculate_grade and stores the
+        grades in the grade column.
+
+        Args:
+            book_criteria (BookCriteria): The criteria to grade against.
+            context (ScoringContext): Optional per-query state shared
+            by the grading of every book, holding the answers to the
+            follow-up questions.
+        """
+        if context is None:
+            context = ScoringContext(book_criteria)
+        for index in range(len(self)):
+            self.grades[index] = self.book(index).score(
+                book_criteria, context
+            )
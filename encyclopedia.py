@@ -7,10 +7,14 @@ with educational levels and to dynamically interact with the user
 for specifying details about the needed encyclopedia.
 """
 
-from book import NonFiction, match_keywords
+from book import NonFiction
+from rules import EDUCATION_TRIGGER, get_rule_table
 
 KEYWORD_FILE_NAME = "Encyclopedia_Keywords.txt"
 
+# The follow-up question asked when encyclopedia keywords are found
+EDUCATION_QUESTION = "education_level"
+
 
 def validate_answer(answer):
     """
@@ -61,19 +65,9 @@ class Encyclopedia(NonFiction):
 
     This class is used to manage encyclopedic books and includes methods
     to match the book to an educational level.
-
-    Attributes:
-        prompted (bool): Class variable to check if
-        the user has been prompted yet.
-        user_needs_encyclopedia (bool): Class variable to check
-        if the user needs an encyclopedia.
-        education_level (str): Class variable to store
-        the user's educational level preference.
     """
 
-    prompted = False
-    user_needs_encyclopedia = False
-    education_level = ""
+    __slots__ = ()
 
     def __init__(self, title, author, price, year, isbn):
         """
@@ -99,89 +93,108 @@ class Encyclopedia(NonFiction):
 
     def matches_education_level(self, level):
         """
-        Determines if the book matches the specified educational level.
+        Determines if the book matches the specified educational level
+        through the education level rules of the rules file.
 
         Args:
             level (str): The education level to match.
 
         Returns:
-            bool: True if the book's title matches the expected
-            title for the given level, False otherwise.
+            bool: True if a rule for the given level names the book,
+            False otherwise.
         """
-        level_map = {
-            "middle school": "The New Children's Encyclopedia",
-            "high school": "World Encyclopedia for High School Students",
-            "undergraduate": "Undergraduate Encyclopedia of Physics",
-            "graduate": "Graduate Encyclopedia of Cosmology and Astrophysics",
-        }
-        return self.title == level_map.get(level, "")
-
-    def calculate_grade(self, book_criteria):
+        return any(
+            rule.targets(self)
+            for rule in get_rule_table().triggered(EDUCATION_TRIGGER, level)
+        )
+
+    @staticmethod
+    def follow_up_question(context):
+        """
+        Encyclopedias need the user's level of education when
+        encyclopedia keywords are found in the input of a user old
+        enough for an encyclopedia.
+
+        Args:
+            context (ScoringContext): The per-query state of the query.
+
+        Returns:
+            str: EDUCATION_QUESTION, or None.
         """
-        Calculates the grade of the book based on user criteria
-        and dynamic educational level matching.
+        if context.book_criteria.age < 10:
+            return None
+        _, keyword_count = context.match_keywords(KEYWORD_FILE_NAME)
+        return EDUCATION_QUESTION if keyword_count else None
 
-        This method adjusts the grade of the book based on its match
-        to an educational level if the user
-        has expressed a need for an encyclopedia after dynamic interaction.
+    @staticmethod
+    def ask_education_level(context):
+        """
+        Asks the user whether they need an encyclopedia, and for which
+        level of education, and stores the answers in the query's context.
 
         Args:
-            book_criteria (BookCriteria):The criteria
-            against which to evaluate the book.
+            context (ScoringContext): The per-query state of the query.
         """
-        if super().calculate_grade(book_criteria):
-            user_keywords = [word.lower() for word in book_criteria.info]
-
-            if book_criteria.age < 10:
-                self.grade = 0
-                return
-
-            _, keyword_count = match_keywords(KEYWORD_FILE_NAME, user_keywords)
-            # Implement special dynamic interaction with the user
-            # because they might need a very specific encyclopedia
-            if keyword_count and not Encyclopedia.prompted:
-                print(
-                    "The search algorithm has detected that an"
-                    " encyclopedic book might match your needs."
-                )
-                Encyclopedia.prompted = True
-                while True:
-                    answer = (
-                        input("Is this correct (Yes/yes, No/no)? ")
-                        .strip()
-                        .lower()
-                    )
-                    if validate_answer(answer):
-                        if answer == "yes":
-                            Encyclopedia.user_needs_encyclopedia = True
-                            while True:
-                                Encyclopedia.education_level = (
-                                    input(
-                                        "For what level of education"
-                                        " do you need it"
-                                        " (middle school, high school,"
-                                        "undergraduate, graduate)? "
-                                    )
-                                    .strip()
-                                    .lower()
-                                )
-                                if validate_level(
-                                    Encyclopedia.education_level
-                                ):
-                                    break
-                            break
-                        else:
-                            print(
-                                "Thank you for the feedback! Moving on "
-                                "with the search ...\n"
+        # Implement special dynamic interaction with the user
+        # because they might need a very specific encyclopedia
+        print(
+            "The search algorithm has detected that an"
+            " encyclopedic book might match your needs."
+        )
+        while True:
+            answer = (
+                input("Is this correct (Yes/yes, No/no)? ").strip().lower()
+            )
+            if validate_answer(answer):
+                if answer == "yes":
+                    context.needs_encyclopedia = True
+                    while True:
+                        context.education_level = (
+                            input(
+                                "For what level of education"
+                                " do you need it"
+                                " (middle school, high school,"
+                                "undergraduate, graduate)? "
                             )
+                            .strip()
+                            .lower()
+                        )
+                        if validate_level(context.education_level):
                             break
-
-            if Encyclopedia.user_needs_encyclopedia:
-                # Check if this encyclopedia matches
-                # the specified educational level
-                if self.matches_education_level(Encyclopedia.education_level):
-                    self.grade = 100
+                    break
                 else:
-                    self.grade = 0  # Set to 0 if no match
-                return  # Exit after handling
+                    print(
+                        "Thank you for the feedback! Moving on "
+                        "with the search ...\n"
+                    )
+                    break
+
+    def score(self, book_criteria, context=None):
+        """
+        Computes the grade of the book based on user criteria
+        and the educational level stored in the query's context.
+
+        If the user has expressed a need for an encyclopedia, only the
+        encyclopedia the rules file names for their educational level
+        is recommended.
+
+        Args:
+            book_criteria (BookCriteria):The criteria
+            against which to evaluate the book.
+            context (ScoringContext): Optional per-query state holding
+            the answers to the encyclopedia question.
+
+        Returns:
+            float: The grade of the book, from 0 to 100.
+        """
+        grade = super().score(book_criteria, context)
+        if not grade:
+            return grade  # Over budget
+        if book_criteria.age < 10:
+            return 0
+
+        if context is None:
+            return grade
+        if context.needs_encyclopedia:
+            grade = 0  # Only the encyclopedia of the level is recommended
+        return self.apply_title_rules(grade, context)
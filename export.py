@@ -0,0 +1,374 @@
+"""
+File: export.py
+Author: Lyuboslav Gigov
+Purpose: Output layer for ranked results. A ranking is an iterable of
+(book, grade) pairs, highest grade first; the renderers write it row by
+row as JSON lines or CSV, so a whole graded catalog is streamed without
+building a list of rows, and the grid table of the interactive session
+is one more renderer.
+
+Rankings are paged with cursors: a cursor holds the grade and the
+inventory sequence of the last book of a page, and the next page starts
+after that position in the (grade descending, sequence ascending)
+order. Adding, updating or removing other books therefore never makes a
+page repeat or skip a book that kept its grade.
+
+Usage: python export.py QUERY [--format jsonl|csv|grid] [--output FILE]
+                        [--limit N] [--cursor CURSOR] [--vectorized]
+                        [--phrases]
+"""
+
+import argparse
+import base64
+import binascii
+import contextlib
+import csv
+import heapq
+import json
+import sys
+
+# The output formats of a ranking
+FORMATS = ("grid", "jsonl", "csv")
+
+# The fields of an exported row, in CSV column order
+FIELDS = ("rank", "isbn", "title", "author", "year", "genre", "price",
+          "grade")
+
+# The default and the largest number of books in a page
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+
+def book_row(rank, book, grade):
+    """Returns the exported fields of a ranked book, in FIELDS order."""
+    return (rank, book.isbn, book.title, book.author, book.year,
+            book.get_genre(), book.price, grade)
+
+
+def write_jsonl(ranked, outfile, start=1):
+    """
+    Writes a ranking as one JSON object per line.
+
+    Args:
+        ranked (iterable): (book, grade) pairs, highest grade first.
+        outfile (file): The text file to write to.
+        start (int): The rank of the first book.
+
+    Returns:
+        int: The number of books written.
+    """
+    count = 0
+    for count, (book, grade) in enumerate(ranked, 1):
+        row = book_row(start + count - 1, book, grade)
+        outfile.write(json.dumps(dict(zip(FIELDS, row))) + "\n")
+    return count
+
+
+def write_csv(ranked, outfile, start=1):
+    """
+    Writes a ranking as CSV with a header row.
+
+    Args:
+        ranked (iterable): (book, grade) pairs, highest grade first.
+        outfile (file): The text file to write to, opened with
+        newline="".
+        start (int): The rank of the first book.
+
+    Returns:
+        int: The number of books written.
+    """
+    writer = csv.writer(outfile)
+    writer.writerow(FIELDS)
+    count = 0
+    for count, (book, grade) in enumerate(ranked, 1):
+        writer.writerow(book_row(start + count - 1, book, grade))
+    return count
+
+
+def render_grid(ranked, start=1):
+    """
+    Renders a ranking as the grid table of the interactive session.
+
+    Args:
+        ranked (iterable): (book, grade) pairs, highest grade first.
+        start (int): The rank of the first book.
+
+    Returns:
+        str: The table.
+    """
+    # Imported here: tabulate is the slowest import of the program
+    # and is only needed once the books are graded
+    from tabulate import tabulate
+
+    rows = [
+        (index, book.title, book.author, book.year, book.get_genre(),
+         f"${book.price:.2f}", book.isbn, f"{grade}/100")
+        for index, (book, grade) in enumerate(ranked, start)
+    ]
+    headers = ("No.", "Title", "Author", "Year", "Genre", "Price", "ISBN",
+               "Grade")
+    return tabulate(rows, headers=headers, tablefmt="grid")
+
+
+def write_ranking(ranked, outfile, output_format="grid", start=1):
+    """
+    Writes a ranking in one of FORMATS.
+
+    Args:
+        ranked (iterable): (book, grade) pairs, highest grade first.
+        outfile (file): The text file to write to.
+        output_format (str): "grid", "jsonl" or "csv".
+        start (int): The rank of the first book.
+
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    if output_format == "jsonl":
+        write_jsonl(ranked, outfile, start)
+    elif output_format == "csv":
+        write_csv(ranked, outfile, start)
+    elif output_format == "grid":
+        outfile.write(render_grid(ranked, start) + "\n")
+    else:
+        raise ValueError(f"Unknown output format: {output_format}.")
+
+
+def encode_cursor(grade, sequence):
+    """
+    Returns the cursor of a position in a ranking.
+
+    Args:
+        grade (float): The grade of the last book of a page.
+        sequence (int): The inventory sequence of that book.
+
+    Returns:
+        str: An opaque, URL-safe token.
+    """
+    token = json.dumps([grade, sequence], separators=(",", ":"))
+    return base64.urlsafe_b64encode(token.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Returns the position a cursor points to.
+
+    Args:
+        cursor (str): A token made by encode_cursor.
+
+    Raises:
+        ValueError: If the token is not a cursor.
+
+    Returns:
+        tuple: The grade and the inventory sequence.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        grade, sequence = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(sequence, int) or isinstance(grade, bool):
+            raise TypeError
+        return float(grade), sequence
+    except (binascii.Error, TypeError, ValueError):
+        raise ValueError("Invalid cursor.") from None
+
+
+def positive_int(value):
+    """
+    Parses a count given on the command line, such as --top K.
+
+    Raises:
+        argparse.ArgumentTypeError: If the count is not positive.
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"{value!r} is not a positive number")
+    return number
+
+
+def check_limit(limit):
+    """Returns a page size, raising ValueError if it is not positive."""
+    limit = int(limit)
+    if limit <= 0:
+        raise ValueError("limit must be positive.")
+    return limit
+
+
+def select_page(graded, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Selects one page of a ranking without sorting the whole of it.
+
+    Args:
+        graded (iterable): (grade, sequence, book) triples in any order.
+        cursor (str): The next_cursor of the previous page, or None for
+        the first page.
+        limit (int): The number of books in the page.
+
+    Raises:
+        ValueError: If the cursor or the limit is invalid.
+
+    Returns:
+        tuple: The (book, grade) pairs of the page, the cursor of the
+        next page (None after the last page) and the rank of the first
+        book of the page.
+    """
+    limit = check_limit(limit)
+    skipped = 0
+    if cursor is not None:
+        last = decode_cursor(cursor)
+        remaining = []
+        for item in graded:
+            # Ranked by grade descending, then by sequence
+            if item[0] < last[0] or (
+                item[0] == last[0] and item[1] > last[1]
+            ):
+                remaining.append(item)
+            else:
+                skipped += 1
+        graded = remaining
+    # One book more than the page tells whether a next page exists
+    page = heapq.nsmallest(
+        limit + 1, graded, key=lambda item: (-item[0], item[1])
+    )
+    next_cursor = None
+    if len(page) > limit:
+        del page[limit:]
+        next_cursor = encode_cursor(page[-1][0], page[-1][1])
+    ranked = [(book, grade) for grade, _, book in page]
+    return ranked, next_cursor, skipped + 1
+
+
+def page_catalog(catalog, context, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Selects one page of the ranking of a catalog, graded with the NumPy
+    grading engine; the sequence of a book is its row. The catalog's
+    grade column is left untouched.
+
+    Args:
+        catalog (Catalog): The books to rank.
+        context (ScoringContext): The per-query state of the query.
+        cursor (str): The next_cursor of the previous page, or None.
+        limit (int): The number of books in the page.
+
+    Raises:
+        ValueError: If the cursor or the limit is invalid.
+
+    Returns:
+        tuple: See select_page.
+    """
+    from grading_engine import grade_catalog, page_rows
+
+    limit = check_limit(limit)
+    after = None if cursor is None else decode_cursor(cursor)
+    grades = grade_catalog(
+        catalog, context.book_criteria, context, store=False
+    )
+    rows, skipped = page_rows(grades, after, limit + 1)
+    page = [(catalog.book(row), float(grades[row])) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(page[-1][1], int(rows[limit - 1]))
+    return page, next_cursor, skipped + 1
+
+
+def parse_args(argv=None):
+    """Parse the command-line options of the export.
+
+    Args:
+        argv (list): The arguments to parse, defaults to sys.argv[1:].
+
+    Returns:
+        argparse.Namespace: The parsed options.
+    """
+    parser = argparse.ArgumentParser(
+        description="Export the ranking of the inventory for one query"
+    )
+    parser.add_argument(
+        "query",
+        help="the criteria record as a JSON object, as in batch.py",
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default="jsonl",
+        help="output format (default: jsonl)",
+    )
+    parser.add_argument(
+        "--output", help="write to this file instead of standard output"
+    )
+    parser.add_argument(
+        "--limit",
+        type=positive_int,
+        metavar="N",
+        help="export one page of N books instead of the whole ranking; "
+        "the cursor of the next page is printed to standard error",
+    )
+    parser.add_argument(
+        "--cursor", help="start after the page this cursor ends"
+    )
+    parser.add_argument(
+        "--phrases",
+        action="store_true",
+        help="match multi-word keywords such as \"time travel\" as one "
+        "keyword instead of word by word",
+    )
+    parser.add_argument(
+        "--vectorized",
+        action="store_true",
+        help="grade with the NumPy grading engine",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Exports the ranking of one query."""
+    from batch import parse_record
+    from book import ScoringContext
+    from bookstore import Bookstore
+    from questions import answer_questions
+
+    args = parse_args(argv)
+    try:
+        criteria, answers = parse_record(json.loads(args.query))
+    except (ValueError, TypeError, AttributeError) as error:
+        print(f"Invalid query: {error}", file=sys.stderr)
+        return 2
+    context = ScoringContext(criteria, args.phrases)
+    answer_questions(context, **answers)
+    if args.vectorized:
+        catalog = Bookstore.load_catalog()
+        size = len(catalog)
+    else:
+        bookstore = Bookstore()
+        size = len(bookstore.books)
+    try:
+        if args.vectorized:
+            ranked, next_cursor, start = page_catalog(
+                catalog, context, args.cursor, args.limit or size
+            )
+        elif args.limit is None and args.cursor is None:
+            ranked, next_cursor, start = (
+                bookstore.rank_books(criteria, context, size), None, 1
+            )
+        else:
+            ranked, next_cursor, start = bookstore.rank_page(
+                criteria, context, args.cursor, args.limit or size
+            )
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 2
+    with contextlib.ExitStack() as stack:
+        outfile = sys.stdout
+        if args.output:
+            outfile = stack.enter_context(
+                open(args.output, "w", newline="")
+            )
+        write_ranking(ranked, outfile, args.format, start)
+    if next_cursor is not None:
+        print(f"next cursor: {next_cursor}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""
+File: genre_index.py
+Author: Lyuboslav Gigov
+Purpose: This module defines the GenreIndex, which lets a query grade
+only the books that can still reach its top k. The books are grouped by
+genre; every genre keeps its own price index, its books by title and
+the largest values of its two genre characteristics.
+
+A genre's formula never lowers a grade when a characteristic grows, so
+a probe book of the genre carrying its largest characteristics grades
+at least as high as any of its books that no title rule singles out.
+A query first grades the books its title rules single out (a theme,
+a mood, a sport, an education level; see rules.py), then the genres
+in decreasing order of their probe grades, and skips every genre whose
+probe grades below the k-th best grade found so far. The genres with a
+keyword signal get the keyword increment, so they come first and the
+genres without one are usually skipped. The result is identical to grading
+every book.
+"""
+
+import bisect
+import heapq
+import math
+from operator import itemgetter
+from instrumentation import metrics
+from snapshot import CHARACTERISTIC_ATTRIBUTES, restore_book
+
+# The title and ISBN of the probe books, which are never stocked; no title
+# rule singles the title out, so a probe gets the formula grade
+PROBE_TITLE = "(probe)"
+PROBE_ISBN = "PROB-0000"
+
+
+class GenreShelf:
+    """
+    The books of one genre.
+
+    Attributes:
+        price_index (list): (price, sequence, book) entries sorted by
+        price, the entries of the bookstore's price index.
+        name (str): The genre's name, as the title rules give it.
+        titles (dict): The entries of the books by title.
+        isbns (dict): The entry of every book by ISBN.
+        first_max (int): The largest first genre characteristic.
+        second_max (int): The largest second genre characteristic.
+    """
+
+    def __init__(self, genre):
+        """
+        Initializes an empty shelf.
+
+        Args:
+            genre (type): The class of the shelf's books.
+        """
+        self.genre = genre
+        self.name = None
+        self.price_index = []
+        self.titles = {}
+        self.isbns = {}
+        self.first_max = 0
+        self.second_max = 0
+
+    def add(self, entry):
+        """
+        Adds the price index entry of a book.
+
+        Args:
+            entry (tuple): The (price, sequence, book) entry.
+        """
+        bisect.insort(self.price_index, entry)
+        book = entry[2]
+        self.name = book.get_genre()
+        self.titles.setdefault(book.title, []).append(entry)
+        self.isbns[book.isbn] = entry
+        attributes = CHARACTERISTIC_ATTRIBUTES.get(self.genre)
+        if attributes:
+            self.first_max = max(self.first_max, getattr(book, attributes[0]))
+            self.second_max = max(
+                self.second_max, getattr(book, attributes[1])
+            )
+
+    def remove(self, entry):
+        """
+        Removes the price index entry of a book. The largest
+        characteristics are kept; they remain an upper bound.
+
+        Args:
+            entry (tuple): The (price, sequence, book) entry.
+        """
+        price, sequence, book = entry
+        del self.price_index[
+            bisect.bisect_left(self.price_index, (price, sequence))
+        ]
+        entries = self.titles[book.title]
+        entries.remove(entry)
+        if not entries:
+            del self.titles[book.title]
+        del self.isbns[book.isbn]
+
+    def named(self, target_kind, target):
+        """
+        Returns the entries of the books a title rule names.
+
+        Args:
+            target_kind (str): "title" or "isbn".
+            target (str): The title or ISBN.
+
+        Returns:
+            list: The (price, sequence, book) entries.
+        """
+        if target_kind == "title":
+            return self.titles.get(target, [])
+        entry = self.isbns.get(target)
+        return [entry] if entry is not None else []
+
+    def within_budget(self, max_price):
+        """Returns the entries of the books priced at most max_price."""
+        cut = bisect.bisect_right(self.price_index, (max_price, math.inf))
+        return self.price_index[:cut]
+
+    def bound(self, book_criteria, context):
+        """
+        Grades the genre's probe book: the highest grade any affordable
+        book of the shelf can get without a title rule.
+
+        Args:
+            book_criteria (BookCriteria): The criteria of the query.
+            context (ScoringContext): The per-query state of the query.
+
+        Returns:
+            float: The bound, or None if no book is affordable.
+        """
+        if (
+            not self.price_index
+            or self.price_index[0][0] > book_criteria.max_price
+        ):
+            return None
+        probe = restore_book(
+            self.genre,
+            PROBE_TITLE,
+            "",
+            self.price_index[0][0],
+            2000,
+            PROBE_ISBN,
+            self.first_max,
+            self.second_max,
+        )
+        return probe.score(book_criteria, context)
+
+
+class GenreIndex:
+    """
+    The books of an inventory grouped by genre.
+
+    Attributes:
+        shelves (dict): The GenreShelf of every genre.
+    """
+
+    def __init__(self, entries=()):
+        """
+        Builds the index from price index entries.
+
+        Args:
+            entries (iterable): (price, sequence, book) entries; sorted
+            by price, they are appended to the shelves in order.
+        """
+        self.shelves = {}
+        for entry in entries:
+            self.add(entry)
+
+    def add(self, entry):
+        """Adds the (price, sequence, book) entry of a book."""
+        genre = type(entry[2])
+        shelf = self.shelves.get(genre)
+        if shelf is None:
+            shelf = self.shelves[genre] = GenreShelf(genre)
+        shelf.add(entry)
+
+    def remove(self, entry):
+        """Removes the (price, sequence, book) entry of a book."""
+        self.shelves[type(entry[2])].remove(entry)
+
+    def rank(self, book_criteria, context, k=5):
+        """
+        Ranks the books for a query, grading only the books that can
+        reach the top k.
+
+        Args:
+            book_criteria (BookCriteria): The criteria to grade against.
+            context (ScoringContext): The per-query state of the query.
+            k (int): The number of books to select.
+
+        Returns:
+            list: (book, grade) pairs of the k best books, highest grade
+            first, ties in inventory order; or None if books graded 0
+            can reach the top k, which only exhaustive grading ranks.
+        """
+        if k <= 0:
+            return []
+        max_price = book_criteria.max_price
+        graded = {}  # sequence -> (book, grade)
+        best = []  # Min-heap of the k best grades so far
+
+        def grade(sequence, book):
+            value = book.score(book_criteria, context)
+            graded[sequence] = (book, value)
+            if len(best) < k:
+                heapq.heappush(best, value)
+            elif value > best[0]:
+                heapq.heapreplace(best, value)
+
+        # The books singled out by a title rule escape the shelf bounds
+        shelves = {shelf.name: shelf for shelf in self.shelves.values()}
+        for genre, target_kind, target in context.title_rules().targets:
+            shelf = shelves.get(genre)
+            if shelf is None:
+                continue
+            for price, sequence, book in shelf.named(target_kind, target):
+                if price <= max_price and sequence not in graded:
+                    grade(sequence, book)
+
+        bounds = []
+        for shelf in self.shelves.values():
+            bound = shelf.bound(book_criteria, context)
+            if bound is not None:
+                bounds.append((bound, shelf))
+        bounds.sort(key=itemgetter(0), reverse=True)
+        for bound, shelf in bounds:
+            if len(best) == k and bound < best[0]:
+                break  # No remaining book can reach the top k
+            with metrics.span("grade", genre=shelf.name):
+                for _, sequence, book in shelf.within_budget(max_price):
+                    if sequence not in graded:
+                        grade(sequence, book)
+
+        if len(best) < k or best[0] <= 0:
+            return None
+        ranked = heapq.nlargest(
+            k, graded.items(), key=lambda item: (item[1][1], -item[0])
+        )
+        return [pair for _, pair in ranked]
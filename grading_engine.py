@@ -0,0 +1,269 @@
+"""
+File: grading_engine.py
+Author: Lyuboslav Gigov
+Purpose: This module grades a whole columnar Catalog with NumPy array
+operations instead of calling calculate_grade book by book. It applies
+the price gate of Book.calculate_grade, the weighted formulas of every
+genre, the keyword increments, the title rules fired by the query and
+the 0-100 clamp of the grade setter, and produces exactly the grades of
+the object path.
+The follow-up questions a query needs are found with needed_questions
+and answered before grading; grading reads the answers from the query's
+ScoringContext.
+"""
+
+import biography
+import romance
+import science_fiction
+from biography import Biography
+from book import ScoringContext
+from catalog import GENRE_CODES
+from instrumentation import metrics
+from encyclopedia import Encyclopedia
+from romance import Romance
+from science_fiction import ScienceFiction
+
+
+def _clamp(grades):
+    """Applies the 0-100 clamp of the Book.grade setter."""
+    import numpy as np
+
+    return np.clip(grades, 0, 100)
+
+
+def _isbn_flags(catalog, isbns):
+    """Returns, for every row, whether the book's ISBN is one of isbns."""
+    import numpy as np
+
+    return np.fromiter(
+        (isbn in isbns for isbn in catalog.isbns),
+        dtype=bool,
+        count=len(catalog),
+    )
+
+
+def _title_flags(catalog, titles):
+    """
+    Returns, for every row, whether the book's title is one of titles.
+    The titles are compared once per pooled string, not once per row.
+    """
+    import numpy as np
+
+    flags = np.fromiter(
+        (title in titles for title in catalog.title_pool.strings),
+        dtype=bool,
+        count=len(catalog.title_pool),
+    )
+    if not len(flags):
+        return np.zeros(len(catalog), dtype=bool)
+    return flags[catalog.column("titles")]
+
+
+def _first_row(mask):
+    """Returns the first row set in a mask, or None if there is none."""
+    import numpy as np
+
+    rows = np.flatnonzero(mask)
+    return rows[0] if len(rows) else None
+
+
+def needed_questions(catalog, context):
+    """
+    Finds the follow-up questions a query needs, in the order the rows
+    needing them appear, as questions.needed_questions does for books.
+
+    Args:
+        catalog (Catalog): The books that will be graded.
+        context (ScoringContext): The per-query state of the query.
+
+    Returns:
+        list: The names of the questions to ask.
+    """
+    affordable = catalog.column("prices") <= context.book_criteria.max_price
+    genres = catalog.column("genres")
+    questions = []
+    for genre, code in GENRE_CODES.items():
+        question = genre.follow_up_question(context)
+        if question is None:
+            continue
+        first_row = _first_row(affordable & (genres == code))
+        if first_row is not None:
+            questions.append((first_row, question))
+    return [question for _, question in sorted(questions)]
+
+
+@metrics.timed("grade", genre="catalog")
+def grade_catalog(catalog, book_criteria, context=None, store=True):
+    """
+    Grades every book of a catalog in array operations and stores the
+    grades in the catalog's grade column.
+
+    Args:
+        catalog (Catalog): The books to grade.
+        book_criteria (BookCriteria): The criteria to grade against.
+        context (ScoringContext): Optional per-query state holding the
+        keyword matches of the query and the answers to its follow-up
+        questions.
+        store (bool): If False, the catalog is left untouched, so
+        several queries can be graded concurrently.
+
+    Returns:
+        numpy.ndarray: The grade of every row.
+    """
+    import numpy as np
+
+    if context is None:
+        context = ScoringContext(book_criteria)
+    age, gender = book_criteria.age, book_criteria.gender
+
+    prices = catalog.column("prices")
+    genres = catalog.column("genres")
+    first = catalog.column("first_characteristics")
+    second = catalog.column("second_characteristics")
+
+    # Book.calculate_grade: books over budget get 0, the others start at 10
+    affordable = prices <= book_criteria.max_price
+    grades = np.where(affordable, 10.0, 0.0)
+    science_fiction_rows = affordable & (
+        genres == GENRE_CODES[ScienceFiction]
+    )
+    romance_rows = affordable & (genres == GENRE_CODES[Romance])
+    biography_rows = affordable & (genres == GENRE_CODES[Biography])
+    encyclopedia_rows = affordable & (genres == GENRE_CODES[Encyclopedia])
+
+    # Science fiction
+    if science_fiction_rows.any():
+        keyword_increment, _ = context.match_keywords(
+            science_fiction.KEYWORD_FILE_NAME
+        )
+        formula = (
+            science_fiction.AGE_WEIGHT
+            * science_fiction.age_relevance(age)
+            + science_fiction.GENDER_WEIGHT
+            * science_fiction.gender_relevance(gender)
+            + science_fiction.SCIENTIFIC_ACCURACY_WEIGHT * first
+            + science_fiction.ACTION_LEVEL_WEIGHT * second
+            + keyword_increment
+        )
+        grades = np.where(science_fiction_rows, _clamp(10 + formula), grades)
+
+    # Romance
+    if romance_rows.any():
+        base_grade = (
+            romance.AGE_WEIGHT * romance.age_relevance(age)
+            + romance.EMOTIONAL_DEPTH_WEIGHT * first
+            + romance.REALISM_WEIGHT * second
+            + romance.GENDER_WEIGHT * romance.gender_relevance(gender)
+        )
+        grades = np.where(romance_rows, _clamp(10 + base_grade), grades)
+
+    # Biography
+    if biography_rows.any():
+        keyword_increment, _ = context.match_keywords(
+            biography.KEYWORD_FILE_NAME
+        )
+        regular = _clamp(
+            10 + (biography.age_increment(age) + keyword_increment)
+        )
+        grades = np.where(biography_rows, regular, grades)
+
+    # Encyclopedia
+    if encyclopedia_rows.any():
+        # Only the encyclopedia of the user's level is recommended
+        encyclopedia_grades = 0.0 if context.needs_encyclopedia else 10.0
+        if age < 10:
+            encyclopedia_grades = 0.0
+        grades = np.where(encyclopedia_rows, encyclopedia_grades, grades)
+        if age < 10:
+            # No title rule recommends an encyclopedia to a child
+            encyclopedia_rows = np.zeros(len(catalog), dtype=bool)
+
+    # Title rules, applied in file order to the rows of the books they
+    # name
+    genre_rows = {
+        "Science Fiction": science_fiction_rows,
+        "Romance": romance_rows,
+        "Biography": biography_rows,
+        "Encyclopedia": encyclopedia_rows,
+    }
+    named_rows = []
+    for (genre, target_kind, target), rules in (
+        context.title_rules().targets.items()
+    ):
+        if not genre_rows[genre].any():
+            continue
+        if target_kind == "title":
+            named = _title_flags(catalog, (target,))
+        else:
+            named = _isbn_flags(catalog, (target,))
+        named &= genre_rows[genre]
+        named_rows += [(rule.order, rule, named) for rule in rules]
+    for _, rule, named in sorted(named_rows, key=lambda item: item[0]):
+        if rule.operator == "=":
+            grades = np.where(named, float(rule.amount), grades)
+        else:
+            grades = np.where(named, _clamp(grades + rule.amount), grades)
+
+    if metrics.enabled:
+        counts = np.bincount(genres, minlength=len(GENRE_CODES))
+        for name, genre in (
+            ("Science Fiction", ScienceFiction),
+            ("Romance", Romance),
+            ("Biography", Biography),
+            ("Encyclopedia", Encyclopedia),
+        ):
+            metrics.increment(
+                "books_graded", int(counts[GENRE_CODES[genre]]), genre=name
+            )
+    if store:
+        catalog.column("grades")[:] = grades
+    return grades
+
+
+def top_rows(grades, k=5):
+    """
+    Returns the rows of the k highest grades, ties in catalog order,
+    the same order a stable descending sort of the books gives.
+
+    Args:
+        grades (numpy.ndarray): The grade of every row.
+        k (int): The number of rows to return.
+
+    Returns:
+        numpy.ndarray: The selected rows, highest grade first.
+    """
+    import numpy as np
+
+    return np.argsort(-grades, kind="stable")[:k]
+
+
+def page_rows(grades, after=None, k=5):
+    """
+    Returns the rows of the k highest grades ranked after a position,
+    in the order of top_rows.
+
+    Args:
+        grades (numpy.ndarray): The grade of every row.
+        after (tuple): The (grade, row) of the last row of the previous
+        page, or None to start at the top.
+        k (int): The number of rows to return.
+
+    Returns:
+        tuple: The selected rows, highest grade first, and the number of
+        rows ranked before them.
+    """
+    import numpy as np
+
+    rows = np.arange(len(grades))
+    skipped = 0
+    if after is not None:
+        grade, row = after
+        kept = (grades < grade) | ((grades == grade) & (rows > row))
+        skipped = len(grades) - int(kept.sum())
+        rows = rows[kept]
+    if k < len(rows):
+        # Only the rows that can reach the page are sorted
+        threshold = np.partition(-grades[rows], k - 1)[k - 1]
+        rows = rows[-grades[rows] <= threshold]
+    order = np.argsort(-grades[rows], kind="stable")[:k]
+    return rows[order], skipped
@@ -0,0 +1,320 @@
+"""
+File: instrumentation.py
+Author: Lyuboslav Gigov
+Purpose: Opt-in instrumentation of the recommendation pipeline. Named
+spans time the stages of a query (parsing the inventory, reading the
+keyword files, matching the keywords, grading each genre, rendering the
+table) and counters count the work done (books parsed, books graded per
+genre, fuzz.ratio calls, keyword file reads). The measurements can be
+exported as JSON or in the Prometheus text format.
+
+Instrumentation is disabled by default. A disabled span is a shared
+no-op object and the hot call sites check metrics.enabled before
+counting, so the cost is one attribute lookup. It is enabled with
+metrics.enable(), by setting BOOKSTORE_METRICS=1, or by the --metrics
+option of main.py and service.py.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+
+# The prefix of the exported Prometheus metric names
+METRIC_PREFIX = "bookstore"
+
+# The environment variable enabling instrumentation at startup
+ENVIRONMENT_VARIABLE = "BOOKSTORE_METRICS"
+
+# The help text of the exported counters
+COUNTER_HELP = {
+    "books_parsed": "Books parsed from inventory lines.",
+    "books_graded": "Books graded, by genre.",
+    "fuzz_ratio_calls": "Calls to fuzz.ratio while matching keywords.",
+    "keyword_file_reads": "Keyword files read from disk.",
+}
+
+
+class _NoSpan:
+    """The span handed out while instrumentation is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NO_SPAN = _NoSpan()
+
+
+class Span:
+    """Times one run of a stage and records it when the stage ends."""
+
+    __slots__ = ("_instrumentation", "_key", "_start")
+
+    def __init__(self, instrumentation, key):
+        """
+        Args:
+            instrumentation (Instrumentation): Where the span is recorded.
+            key (tuple): The stage name and its sorted labels.
+        """
+        self._instrumentation = instrumentation
+        self._key = key
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._instrumentation.record_span(
+            self._key, time.perf_counter() - self._start
+        )
+        return False
+
+
+def _label_key(name, labels):
+    """Returns the hashable key of a name and its labels."""
+    return name, tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    """Escapes a label value for the Prometheus text format."""
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+    )
+
+
+def _format_labels(labels):
+    """Formats labels as {name="value",...}, or nothing if empty."""
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in labels)
+    return "{" + pairs + "}"
+
+
+class Instrumentation:
+    """
+    The spans and counters of the process.
+
+    Attributes:
+        enabled (bool): Whether spans and counters are recorded.
+    """
+
+    def __init__(self, enabled=False):
+        """
+        Args:
+            enabled (bool): Whether to record from the start.
+        """
+        self.enabled = enabled
+        self._spans = {}  # (name, labels) -> [count, total, max]
+        self._counters = {}  # (name, labels) -> value
+        self._lock = threading.Lock()
+
+    def enable(self):
+        """Starts recording."""
+        self.enabled = True
+
+    def disable(self):
+        """Stops recording; the measurements so far are kept."""
+        self.enabled = False
+
+    def reset(self):
+        """Drops every measurement."""
+        with self._lock:
+            self._spans.clear()
+            self._counters.clear()
+
+    def span(self, name, **labels):
+        """
+        Returns a context manager timing a stage.
+
+        Args:
+            name (str): The name of the stage.
+            **labels: Labels telling runs of the stage apart, e.g. genre.
+
+        Returns:
+            Span: The span, or a no-op if instrumentation is disabled.
+        """
+        if not self.enabled:
+            return NO_SPAN
+        return Span(self, _label_key(name, labels))
+
+    def timed(self, name, **labels):
+        """
+        Returns a decorator timing every call of a function as a stage.
+
+        Args:
+            name (str): The name of the stage.
+            **labels: Labels telling runs of the stage apart.
+
+        Returns:
+            function: The decorator.
+        """
+
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with self.span(name, **labels):
+                    return function(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def record_span(self, key, seconds):
+        """Records one run of a stage; used by Span."""
+        with self._lock:
+            totals = self._spans.get(key)
+            if totals is None:
+                self._spans[key] = [1, seconds, seconds]
+            else:
+                totals[0] += 1
+                totals[1] += seconds
+                totals[2] = max(totals[2], seconds)
+
+    def increment(self, name, amount=1, **labels):
+        """
+        Adds to a counter. Nothing is recorded while disabled.
+
+        Args:
+            name (str): The name of the counter.
+            amount (int): The amount to add.
+            **labels: Labels telling counts apart, e.g. genre.
+        """
+        if not self.enabled:
+            return
+        key = _label_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def snapshot(self):
+        """
+        Returns a copy of the raw measurements, e.g. to send them from a
+        worker process to the parent, see merge.
+
+        Returns:
+            tuple: The spans and the counters by (name, labels).
+        """
+        with self._lock:
+            spans = {key: list(totals) for key, totals in self._spans.items()}
+            return spans, dict(self._counters)
+
+    def merge(self, snapshot):
+        """
+        Adds the measurements of a snapshot, e.g. those of a worker
+        process, to these.
+
+        Args:
+            snapshot (tuple): A value returned by snapshot().
+        """
+        spans, counters = snapshot
+        with self._lock:
+            for key, (count, total, maximum) in spans.items():
+                totals = self._spans.get(key)
+                if totals is None:
+                    self._spans[key] = [count, total, maximum]
+                else:
+                    totals[0] += count
+                    totals[1] += total
+                    totals[2] = max(totals[2], maximum)
+            for key, value in counters.items():
+                self._counters[key] = self._counters.get(key, 0) + value
+
+    def to_dict(self):
+        """
+        Returns the measurements.
+
+        Returns:
+            dict: The spans, with their run count and total and maximum
+            time in seconds, and the counters.
+        """
+        with self._lock:
+            spans = sorted(self._spans.items())
+            counters = sorted(self._counters.items())
+        return {
+            "spans": [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": count,
+                    "total_s": total,
+                    "max_s": maximum,
+                }
+                for (name, labels), (count, total, maximum) in spans
+            ],
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in counters
+            ],
+        }
+
+    def to_json(self):
+        """Returns the measurements as a JSON document."""
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self):
+        """
+        Returns the measurements in the Prometheus text format. Every
+        span gives a stage_seconds_total and a stage_runs_total sample
+        labelled with its stage; every counter becomes a _total metric.
+
+        Returns:
+            str: The exposition text.
+        """
+        with self._lock:
+            spans = sorted(self._spans.items())
+            counters = sorted(self._counters.items())
+        lines = []
+        if spans:
+            for metric, help_text, column in (
+                ("stage_seconds_total", "Time spent in each stage.", 1),
+                ("stage_runs_total", "Number of runs of each stage.", 0),
+            ):
+                lines.append(f"# HELP {METRIC_PREFIX}_{metric} {help_text}")
+                lines.append(f"# TYPE {METRIC_PREFIX}_{metric} counter")
+                for (name, labels), totals in spans:
+                    labels = (("stage", name),) + labels
+                    lines.append(
+                        f"{METRIC_PREFIX}_{metric}{_format_labels(labels)}"
+                        f" {totals[column]}"
+                    )
+        written = set()
+        for (name, labels), value in counters:
+            metric = f"{METRIC_PREFIX}_{name}_total"
+            if name not in written:
+                written.add(name)
+                help_text = COUNTER_HELP.get(name, name.replace("_", " "))
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def write(self, file_name):
+        """
+        Writes the measurements to a file, in the Prometheus text format
+        if its name ends with .prom and as JSON otherwise.
+
+        Args:
+            file_name (str): The file to write.
+        """
+        with open(file_name, "w") as outfile:
+            if file_name.endswith(".prom"):
+                outfile.write(self.to_prometheus())
+            else:
+                outfile.write(self.to_json() + "\n")
+
+
+# Shared by every module of the process
+metrics = Instrumentation(
+    os.environ.get(ENVIRONMENT_VARIABLE, "") not in ("", "0")
+)
@@ -0,0 +1,556 @@
+"""
+File: lexicon.py
+Author: Lyuboslav Gigov
+Purpose: This module defines the process-wide registry of genre keyword
+lexicons. Every keyword file is read and lower-cased only once and kept
+in memory as an immutable Lexicon; the cached copy is reloaded
+automatically when the file's modification time or size changes.
+Each lexicon can also build a SymSpell-style deletion index that narrows
+fuzzy keyword matching down to a handful of candidate terms, and an
+Aho-Corasick automaton that recognizes its single-word and multi-word
+entries in one pass over the user's text. A KeywordIndex inverts several
+lexicons at once, so a user keyword is matched against every genre in
+one lookup.
+"""
+
+import os
+import string
+from collections import deque
+from instrumentation import metrics
+
+# Minimum fuzz.ratio score for a user keyword to count as a match
+MATCH_THRESHOLD = 65
+# Deletions stored per lexicon term in the deletion index
+MAX_DELETE_DISTANCE = 2
+
+
+def generate_deletes(word, max_distance):
+    """
+    Generates every string obtainable by deleting up to max_distance
+    characters from a word, including the word itself.
+
+    Args:
+        word (str): The word to generate deletions for.
+        max_distance (int): The maximum number of deleted characters.
+
+    Returns:
+        set: The deletion neighbourhood of the word.
+    """
+    deletes = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {
+            candidate[:i] + candidate[i + 1:]
+            for candidate in frontier
+            for i in range(len(candidate))
+        }
+        deletes |= frontier
+    return deletes
+
+
+def min_common_length(length_1, length_2, threshold=MATCH_THRESHOLD):
+    """
+    Returns the shortest common subsequence two words of the given
+    lengths must share for fuzz.ratio to reach the threshold.
+
+    fuzz.ratio rounds 100 * 2 * M / (length_1 + length_2), where M never
+    exceeds the length of the longest common subsequence, so any pair
+    scoring at least the threshold shares a subsequence of this length.
+
+    Args:
+        length_1 (int): Length of the first word.
+        length_2 (int): Length of the second word.
+        threshold (int): The minimum fuzz.ratio score.
+
+    Returns:
+        int: The minimum common subsequence length.
+    """
+    return -(-(2 * threshold - 1) * (length_1 + length_2) // 400)
+
+
+class DeletionIndex:
+    """
+    A SymSpell-style index mapping deletion variants to lexicon terms.
+
+    Two words sharing a common subsequence of length L can both be reduced
+    to it by deleting characters, so a term that may reach the fuzz.ratio
+    threshold is found through a hash lookup of the user keyword's own
+    deletions. Length pairs that would need more deletions than the index
+    stores are compared directly, which keeps the result identical to
+    comparing the keyword against every term.
+
+    Attributes:
+        max_distance (int): The number of deletions stored per term.
+    """
+
+    def __init__(self, terms, max_distance=MAX_DELETE_DISTANCE):
+        """
+        Builds the index from the terms of a lexicon.
+
+        Args:
+            terms (iterable): The lower-cased lexicon terms.
+            max_distance (int): The number of deletions stored per term.
+        """
+        self.max_distance = max_distance
+        self._deletes = {}
+        by_length = {}
+        for term in dict.fromkeys(terms):  # Drop duplicates, keep order
+            by_length.setdefault(len(term), []).append(term)
+            for variant in generate_deletes(term, max_distance):
+                self._deletes.setdefault(variant, []).append(term)
+        self._by_length = {
+            length: tuple(group) for length, group in by_length.items()
+        }
+
+    def candidates(self, word, threshold=MATCH_THRESHOLD):
+        """
+        Returns the lexicon terms that may score at least the threshold
+        against a word; every other term is guaranteed to score below it.
+
+        Args:
+            word (str): The user keyword.
+            threshold (int): The minimum fuzz.ratio score.
+
+        Returns:
+            set: The candidate terms.
+        """
+        indexed_lengths = set()
+        candidates = set()
+        for length, group in self._by_length.items():
+            common = min_common_length(len(word), length, threshold)
+            if common > min(len(word), length):
+                continue  # The lengths alone rule out a match
+            if (
+                len(word) - common <= self.max_distance
+                and length - common <= self.max_distance
+            ):
+                indexed_lengths.add(length)
+            else:
+                candidates.update(group)
+
+        if indexed_lengths:
+            deletes = generate_deletes(word, self.max_distance)
+            for variant in deletes:
+                for term in self._deletes.get(variant, ()):
+                    if len(term) in indexed_lengths:
+                        candidates.add(term)
+        return candidates
+
+    def matches(self, word, threshold=MATCH_THRESHOLD):
+        """
+        Checks whether any lexicon term scores at least the threshold
+        against a word.
+
+        Args:
+            word (str): The user keyword.
+            threshold (int): The minimum fuzz.ratio score.
+
+        Returns:
+            bool: True if a close enough term exists, False otherwise.
+        """
+        # Imported on first use; fuzzywuzzy is slow to import and the
+        # first prompts do not need it
+        from fuzzywuzzy import fuzz
+
+        for term in self.candidates(word, threshold):
+            if metrics.enabled:
+                metrics.increment("fuzz_ratio_calls")
+            if fuzz.ratio(word, term) >= threshold:
+                return True
+        return False
+
+
+def tokenize(text):
+    """
+    Splits user text into lower-cased words without surrounding
+    punctuation, so that "Travel," and "travel" are the same symbol.
+
+    Args:
+        text (str or list): The text, or the words already split from it.
+
+    Returns:
+        list: The non-empty words in order.
+    """
+    words = text.split() if isinstance(text, str) else text
+    tokens = []
+    for word in words:
+        token = word.lower().strip(string.punctuation)
+        if token:
+            tokens.append(token)
+    return tokens
+
+
+class KeywordAutomaton:
+    """
+    An Aho-Corasick automaton over words that recognizes every lexicon
+    entry, single words and phrases alike, in one pass over a token list.
+
+    The symbols of the automaton are whole words, so a phrase only matches
+    on word boundaries and the scan costs one transition per user token
+    whatever the size of the lexicon.
+
+    Attributes:
+        phrases (tuple): The recognized entries as tuples of words.
+    """
+
+    def __init__(self, phrases):
+        """
+        Builds the trie of the entries and links every state to the
+        longest proper suffix that is also a trie prefix.
+
+        Args:
+            phrases (iterable): The lower-cased entries of a lexicon.
+        """
+        self.phrases = tuple(
+            dict.fromkeys(
+                tuple(phrase.split()) for phrase in phrases if phrase.split()
+            )
+        )
+        self._goto = [{}]
+        self._fail = [0]
+        # Lengths (in words) of the entries ending in each state
+        self._output = [()]
+        for phrase in self.phrases:
+            state = 0
+            for word in phrase:
+                next_state = self._goto[state].get(word)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][word] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                state = next_state
+            self._output[state] += (len(phrase),)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(word, 0)
+                self._output[next_state] += self._output[
+                    self._fail[next_state]
+                ]
+
+    def find_all(self, tokens):
+        """
+        Scans the tokens once and reports every entry occurrence,
+        overlapping ones included.
+
+        Args:
+            tokens (list): The lower-cased user words.
+
+        Returns:
+            list: (start, end) token positions of every occurrence,
+            with end exclusive.
+        """
+        occurrences = []
+        state = 0
+        for position, token in enumerate(tokens):
+            while state and token not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(token, 0)
+            for length in self._output[state]:
+                occurrences.append((position + 1 - length, position + 1))
+        return occurrences
+
+    def find(self, tokens):
+        """
+        Returns the leftmost-longest, non-overlapping entry occurrences,
+        so "time travel" is reported once rather than as "time" and
+        "travel" as well.
+
+        Args:
+            tokens (list): The lower-cased user words.
+
+        Returns:
+            list: (start, end) token positions in order, end exclusive.
+        """
+        selected = []
+        covered_until = 0
+        for start, end in sorted(
+            self.find_all(tokens), key=lambda match: (match[0], -match[1])
+        ):
+            if start >= covered_until:
+                selected.append((start, end))
+                covered_until = end
+        return selected
+
+
+class Lexicon:
+    """
+    Represents the pre-normalized contents of a single keyword file.
+
+    Attributes:
+        file_name (str): The file the lexicon was loaded from.
+        terms (tuple): The lower-cased keywords in file order.
+        phrases (tuple): The lower-cased entries of the file, one per
+        line, so multi-word entries such as "time travel" stay whole.
+        term_set (frozenset): The same keywords for O(1) membership tests.
+        signature (tuple): The (modification time, size) of the file
+        at the moment it was loaded.
+    """
+
+    __slots__ = (
+        "file_name",
+        "terms",
+        "phrases",
+        "term_set",
+        "signature",
+        "_deletion_index",
+        "_automaton",
+    )
+
+    def __init__(self, file_name, terms, signature, phrases=None):
+        """
+        Initializes a new instance of the Lexicon class.
+
+        Args:
+            file_name (str): The file the lexicon was loaded from.
+            terms (iterable): The lower-cased keywords.
+            signature (tuple): The (modification time, size) of the file.
+            phrases (iterable): The lower-cased entries of the file;
+            defaults to one entry per term.
+        """
+        self.file_name = file_name
+        self.terms = tuple(terms)
+        self.phrases = self.terms if phrases is None else tuple(phrases)
+        self.term_set = frozenset(self.terms)
+        self.signature = signature
+        self._deletion_index = None
+        self._automaton = None
+
+    @property
+    def deletion_index(self):
+        """Returns the deletion index of the lexicon, building it once."""
+        if self._deletion_index is None:
+            self._deletion_index = DeletionIndex(self.terms)
+        return self._deletion_index
+
+    @property
+    def automaton(self):
+        """Returns the phrase automaton of the lexicon, building it once."""
+        if self._automaton is None:
+            self._automaton = KeywordAutomaton(self.phrases)
+        return self._automaton
+
+    def __len__(self):
+        """Returns the number of keywords in the lexicon."""
+        return len(self.terms)
+
+    def __iter__(self):
+        """Iterates over the keywords in file order."""
+        return iter(self.terms)
+
+
+class KeywordIndex:
+    """
+    An inverted index from the terms of several lexicons, and their
+    deletion variants, to the keyword files containing them. The fuzzy
+    candidates of a user keyword are looked up once for all the files and
+    every candidate term is compared once, however many files share it;
+    the result of every file is the one match_keywords gives.
+
+    Attributes:
+        lexicons (tuple): The indexed lexicons.
+    """
+
+    def __init__(self, lexicons):
+        """
+        Builds the index from the terms of the lexicons.
+
+        Args:
+            lexicons (iterable): The lexicons to index.
+        """
+        self.lexicons = tuple(lexicons)
+        self._files = {}
+        for lexicon in self.lexicons:
+            for term in lexicon.terms:
+                self._files.setdefault(term, set()).add(lexicon.file_name)
+        self._deletion_index = DeletionIndex(self._files)
+
+    def matching_files(self, word, threshold=MATCH_THRESHOLD):
+        """
+        Finds the keyword files holding a term close enough to a word.
+
+        Args:
+            word (str): The user keyword.
+            threshold (int): The minimum fuzz.ratio score.
+
+        Returns:
+            set: The names of the matching files.
+        """
+        from fuzzywuzzy import fuzz
+
+        files = set()
+        for term in self._deletion_index.candidates(word, threshold):
+            term_files = self._files[term]
+            if term_files <= files:
+                continue
+            if metrics.enabled:
+                metrics.increment("fuzz_ratio_calls")
+            if fuzz.ratio(word, term) >= threshold:
+                files |= term_files
+        return files
+
+    def match(self, user_keywords):
+        """
+        Matches the user's keywords against every indexed file.
+
+        Args:
+            user_keywords (list): A list of keywords specified by the user.
+
+        Returns:
+            dict: The (grade increment, keyword count) tuple of every file.
+        """
+        counts = dict.fromkeys(
+            (lexicon.file_name for lexicon in self.lexicons), 0
+        )
+        matches = {}
+        for word in user_keywords:
+            if word not in matches:
+                matches[word] = self.matching_files(word)
+            for file_name in matches[word]:
+                counts[file_name] += 1
+        return {
+            file_name: (15 * count, count)
+            for file_name, count in counts.items()
+        }
+
+
+class LexiconRegistry:
+    """
+    Caches one Lexicon per keyword file for the lifetime of the process.
+
+    Attributes:
+        hits (int): Number of lookups answered from the cache.
+        reloads (int): Number of times a keyword file was (re)read.
+    """
+
+    def __init__(self):
+        """Initializes an empty registry with zeroed counters."""
+        self._lexicons = {}
+        self._keyword_indexes = {}
+        self.hits = 0
+        self.reloads = 0
+
+    @staticmethod
+    def _signature(file_name):
+        """
+        Returns the (modification time, size) pair used to detect edits.
+
+        Raises:
+            FileNotFoundError: If the keyword file does not exist.
+        """
+        stat = os.stat(file_name)
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self, file_name):
+        """
+        Returns the lexicon for the given keyword file, reading the file
+        only if it has not been loaded yet or has changed on disk.
+
+        Args:
+            file_name (str): The file name where keywords are stored.
+
+        Returns:
+            Lexicon: The cached, lower-cased keywords of the file.
+
+        Raises:
+            FileNotFoundError: If the keyword file does not exist.
+        """
+        signature = self._signature(file_name)
+        lexicon = self._lexicons.get(file_name)
+        if lexicon is not None and lexicon.signature == signature:
+            self.hits += 1
+            return lexicon
+
+        with metrics.span("read_keywords", file=file_name):
+            with open(file_name, "r") as infile:
+                text = infile.read().lower()
+            phrases = [" ".join(line.split()) for line in text.splitlines()]
+            lexicon = Lexicon(
+                file_name, text.split(), signature, filter(None, phrases)
+            )
+        metrics.increment("keyword_file_reads", file=file_name)
+        self._lexicons[file_name] = lexicon
+        self.reloads += 1
+        return lexicon
+
+    def keyword_index(self, file_names):
+        """
+        Returns the keyword index of several keyword files, building it
+        again only when one of their lexicons has been reloaded.
+
+        Args:
+            file_names (tuple): The file names where keywords are stored.
+
+        Returns:
+            KeywordIndex: The index of the files' lexicons.
+
+        Raises:
+            FileNotFoundError: If a keyword file does not exist.
+        """
+        file_names = tuple(file_names)
+        lexicons = tuple(self.get(file_name) for file_name in file_names)
+        index = self._keyword_indexes.get(file_names)
+        if index is None or index.lexicons != lexicons:
+            index = self._keyword_indexes[file_names] = KeywordIndex(
+                lexicons
+            )
+        return index
+
+    def clear(self):
+        """Drops every cached lexicon and resets the counters."""
+        self._lexicons.clear()
+        self._keyword_indexes.clear()
+        self.hits = 0
+        self.reloads = 0
+
+    def stats(self):
+        """
+        Returns the registry counters.
+
+        Returns:
+            dict: The number of cache hits, reloads and cached files.
+        """
+        return {
+            "hits": self.hits,
+            "reloads": self.reloads,
+            "cached_files": len(self._lexicons),
+        }
+
+
+# Shared by every genre module in the process
+registry = LexiconRegistry()
+
+
+def get_lexicon(file_name):
+    """
+    Returns the cached lexicon of a keyword file from the shared registry.
+
+    Args:
+        file_name (str): The file name where keywords are stored.
+
+    Returns:
+        Lexicon: The cached, lower-cased keywords of the file.
+    """
+    return registry.get(file_name)
+
+
+def get_keyword_index(file_names):
+    """
+    Returns the cached keyword index of several keyword files from the
+    shared registry.
+
+    Args:
+        file_names (tuple): The file names where keywords are stored.
+
+    Returns:
+        KeywordIndex: The index of the files' lexicons.
+    """
+    return registry.keyword_index(file_names)
@@ -4,12 +4,21 @@ Author: Lyuboslav Gigov
 Purpose: Entry point of the application that integrates all modules to
 provide book recommendations
 based on user preferences captured through an interactive session.
-Final output is shown in tabulated form for clarity and readability.
+Final output is shown in tabulated form for clarity and readability, or
+written as JSON lines or CSV (see export.py).
 """
 
+import argparse
+import contextlib
+import sys
+from book import ScoringContext
 from book_criteria import BookCriteria
-from bookstore import Bookstore
-from tabulate import tabulate
+from bookstore import GRADE, Bookstore
+from export import FORMATS, positive_int, write_ranking
+from instrumentation import metrics
+from questions import ask_questions
+from romance import Romance
+from snapshot import SNAPSHOT_FILE_NAME
 
 
 def validate_gender(gender):
@@ -83,35 +92,238 @@ def sort_books(books):
     Args:
         books (list): A list of Book instances to be sorted.
     """
-    books.sort(reverse=True)  # Uses the overloaded __lt__ method
+    # Sorting by key avoids a Book.__lt__ call per comparison
+    books.sort(key=GRADE, reverse=True)
 
 
-def main():
+def print_mood_recommendations(books, context):
+    """Point out the recommended books chosen for the user's mood.
+
+    Args:
+        books (list): The recommended books.
+        context (ScoringContext): The per-query state holding the mood.
+    """
+    for book in books:
+        if (
+            isinstance(book, Romance)
+            and book.price <= context.book_criteria.max_price
+            and book.matches_mood_to_book(context.mood)
+        ):
+            print(
+                f"\nBased on your mood, we recommend "
+                f"{book.title} by {book.author}.\n"
+            )
+
+
+def load_bookstore(args):
+    """Load the inventory, from its snapshot if requested, and apply the
+    delta files given on the command line.
+
+    Args:
+        args (argparse.Namespace): The parsed command-line options.
+
+    Returns:
+        Bookstore: The bookstore holding the current inventory.
+    """
+    if args.snapshot:
+        bookstore = Bookstore(
+            Bookstore.load_snapshot(snapshot_name=args.snapshot)
+        )
+    else:
+        bookstore = Bookstore()
+    for file_name in args.delta:
+        try:
+            bookstore.apply_delta(file_name)
+        except FileNotFoundError:
+            print(f"Delta file {file_name} not found.")
+            sys.exit()
+        except ValueError as ve:
+            print(ve)
+            sys.exit()
+    return bookstore
+
+
+def parse_args(argv=None):
+    """Parse the command-line options of the application.
+
+    Args:
+        argv (list): The arguments to parse, defaults to sys.argv[1:].
+
+    Returns:
+        argparse.Namespace: The parsed options.
+    """
+    parser = argparse.ArgumentParser(description="Book recommendation system")
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="grade the inventory while reading it, keeping only the "
+        "best books in memory (for very large inventories)",
+    )
+    parser.add_argument(
+        "--snapshot",
+        nargs="?",
+        const=SNAPSHOT_FILE_NAME,
+        metavar="FILE",
+        help="load the inventory from a compiled snapshot, rebuilding it "
+        f"when the inventory has changed (default: {SNAPSHOT_FILE_NAME})",
+    )
+    parser.add_argument(
+        "--top",
+        type=positive_int,
+        default=5,
+        metavar="K",
+        help="number of books to recommend (default: 5)",
+    )
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="rank the whole inventory instead of the top K books",
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default="grid",
+        help="output format of the ranking (default: grid)",
+    )
+    parser.add_argument(
+        "--output",
+        metavar="FILE",
+        help="write the ranking to FILE instead of the screen",
+    )
+    parser.add_argument(
+        "--workers",
+        type=positive_int,
+        metavar="N",
+        help="grade the inventory with N worker processes sharing "
+        "the catalog in shared memory",
+    )
+    parser.add_argument(
+        "--vectorized",
+        action="store_true",
+        help="grade the whole inventory with the NumPy grading engine",
+    )
+    parser.add_argument(
+        "--phrases",
+        action="store_true",
+        help="match multi-word keywords such as \"time travel\" as one "
+        "keyword instead of word by word",
+    )
+    parser.add_argument(
+        "--delta",
+        action="append",
+        default=[],
+        metavar="FILE",
+        help="apply the added, updated and removed books of a delta file "
+        "to the inventory (can be repeated)",
+    )
+    parser.add_argument(
+        "--metrics",
+        metavar="FILE",
+        help="time the stages of the search and count the work done, and "
+        "write the measurements to FILE (Prometheus text if it ends with "
+        ".prom, JSON otherwise)",
+    )
+    parser.add_argument(
+        "--startup-profile",
+        action="store_true",
+        help="report the import time of every module loaded before the "
+        "first prompt and the time to the first prompt, then exit",
+    )
+    args = parser.parse_args(argv)
+    if args.delta and args.stream:
+        parser.error("--delta cannot be combined with --stream")
+    if args.all:
+        # Every book of the inventory, however large
+        args.top = sys.maxsize
+    return args
+
+
+def main(argv=None):
     """Main function to run the bookstore application."""
-    my_bookstore = Bookstore()
-    book_collection = my_bookstore.load_books()
-    user_criteria = get_user_preferences()
-
-    for book in book_collection:
-        book.calculate_grade(user_criteria)
-
-    # Sort the books by grade in descending order
-    sort_books(book_collection)
-
-    # Converting books to dictionaries to easily display them in a tabular form
-    books_data = [{
-        "No.": index,
-        "Title": book.title,
-        "Author": book.author,
-        "Year": book.year,
-        "Genre": book.get_genre(),
-        "Price": f"${book.price:.2f}",
-        "ISBN": book.isbn,
-        "Grade": f"{book.grade}/100"
-    } for index, book in enumerate(book_collection[:5], 1)]
-
-    print("\nThe five most suitable books for you are:\n")
-    print(tabulate(books_data, headers="keys", tablefmt="grid"))
+    args = parse_args(argv)
+    if args.startup_profile:
+        from startup_profile import report
+
+        argv = sys.argv[1:] if argv is None else argv
+        met = report([arg for arg in argv if arg != "--startup-profile"])
+        sys.exit(0 if met else 1)
+    if args.metrics:
+        metrics.enable()
+    # Every path first asks the follow-up questions the query needs and
+    # then grades, reading the answers from the query's context
+    if args.vectorized or args.workers:
+        from grading_engine import needed_questions
+
+        if args.delta:
+            from catalog import Catalog
+
+            catalog = Catalog.from_books(load_bookstore(args).books)
+        else:
+            catalog = Bookstore.load_catalog()
+        user_criteria = get_user_preferences()
+        context = ScoringContext(user_criteria, args.phrases)
+        ask_questions(needed_questions(catalog, context), context)
+        if args.vectorized:
+            from grading_engine import grade_catalog, top_rows
+
+            grades = grade_catalog(catalog, user_criteria, context)
+            book_collection = [
+                catalog.book(row) for row in top_rows(grades, args.top)
+            ]
+        else:
+            from parallel_grading import grade_parallel
+
+            book_collection = grade_parallel(
+                catalog, user_criteria, args.workers, args.top, context
+            )
+    elif args.stream:
+        user_criteria = get_user_preferences()
+        context = ScoringContext(user_criteria, args.phrases)
+        # The questions are asked while the inventory is streamed
+        book_collection = Bookstore.stream_top_books(
+            user_criteria, args.top, context, ask=ask_questions
+        )
+    else:
+        my_bookstore = load_bookstore(args)
+        user_criteria = get_user_preferences()
+
+        # The keywords are matched once for every genre, and only the
+        # books that can reach the top are graded
+        context = ScoringContext(user_criteria, args.phrases)
+        ask_questions(my_bookstore.follow_up_questions(context), context)
+        if args.all:
+            # One page holding every book grades each of them only once
+            ranked, _, _ = my_bookstore.rank_page(
+                user_criteria, context, limit=max(len(my_bookstore.books), 1)
+            )
+        else:
+            ranked = my_bookstore.rank_books(user_criteria, context, args.top)
+
+        # Keep the grades on the books for the table below
+        book_collection = []
+        for book, grade in ranked:
+            book.grade = grade
+            book_collection.append(book)
+
+    ranked = ((book, book.grade) for book in book_collection[:args.top])
+    # JSON lines and CSV written to the screen are left free of messages
+    if args.format == "grid" or args.output:
+        print_mood_recommendations(book_collection, context)
+    if args.format == "grid" and not args.output:
+        if args.all:
+            print("\nAll books, from the most suitable for you:\n")
+        else:
+            count = "five" if args.top == 5 else args.top
+            print(f"\nThe {count} most suitable books for you are:\n")
+    with metrics.span("render"), contextlib.ExitStack() as stack:
+        outfile = sys.stdout
+        if args.output:
+            outfile = stack.enter_context(
+                open(args.output, "w", newline="")
+            )
+        write_ranking(ranked, outfile, args.format)
+    if args.metrics:
+        metrics.write(args.metrics)
 
 
 if __name__ == "__main__":
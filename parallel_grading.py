@@ -0,0 +1,226 @@
+"""
+File: parallel_grading.py
+Author: Lyuboslav Gigov
+Purpose: This module grades large catalogs with a pool of worker
+processes. The numeric columns of the Catalog are copied once into a
+multiprocessing.shared_memory block; every worker maps that block,
+grades a disjoint slice of rows through the genres' score methods,
+writes the grades back into the shared grade column and returns the
+best rows of its slice. The per-worker results are merged into the
+overall top k, with ties in catalog order as in the sequential path.
+When instrumentation is enabled, every worker also returns the counters
+and spans it recorded for its slice, which are merged into the parent's.
+"""
+
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from book import ScoringContext
+from catalog import Catalog, StringPool
+from instrumentation import metrics
+
+# Column offsets are aligned for the widest type code ('d')
+_ALIGNMENT = 8
+
+# The catalog mapped by the current worker process
+_worker_catalog = None
+_worker_memory = None
+
+
+def _aligned(offset):
+    """Rounds an offset up to the column alignment."""
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def _map_columns(memory, layout):
+    """
+    Returns memoryviews of the columns of a shared block, typed with
+    the columns' array type codes.
+    """
+    return {
+        name: memory.buf[offset: offset + size].cast(typecode)
+        for name, (offset, size, typecode) in layout.items()
+    }
+
+
+def _attach(memory_name, layout, titles, authors, isbns):
+    """
+    Worker initializer: maps the shared block and rebuilds a Catalog
+    whose numeric columns live in it.
+    """
+    global _worker_catalog, _worker_memory
+    _worker_memory = shared_memory.SharedMemory(name=memory_name)
+    catalog = Catalog()
+    for name, column in _map_columns(_worker_memory, layout).items():
+        setattr(catalog, name, column)
+    catalog.title_pool = StringPool.from_strings(titles)
+    catalog.author_pool = StringPool.from_strings(authors)
+    catalog.isbns = isbns
+    _worker_catalog = catalog
+
+
+def _grade_slice(start, end, context, k, record_metrics=False):
+    """
+    Worker task: grades the rows [start, end) of the shared catalog.
+
+    Args:
+        start (int): The first row of the slice.
+        end (int): The row after the last row of the slice.
+        context (ScoringContext): The per-query state of the query,
+        holding the criteria and the answers to the follow-up questions.
+        k (int): The number of rows to return.
+        record_metrics (bool): If True, the work done is recorded and
+        returned, since the parent cannot see the worker's counters.
+
+    Returns:
+        tuple: The k best rows of the slice, ties in row order, and the
+        snapshot of the slice's measurements, or None.
+    """
+    if record_metrics:
+        metrics.reset()
+        metrics.enable()
+    catalog = _worker_catalog
+    grades = catalog.grades
+    book_criteria = context.book_criteria
+    for row in range(start, end):
+        grades[row] = catalog.book(row).score(book_criteria, context)
+    best = heapq.nlargest(k, range(start, end), key=grades.__getitem__)
+    if not record_metrics:
+        return best, None
+    metrics.disable()
+    return best, metrics.snapshot()
+
+
+class ParallelGrader:
+    """
+    Keeps a catalog in shared memory and a pool of worker processes
+    attached to it, so several queries can be graded without copying
+    the catalog again.
+
+    Use it as a context manager, or call close() when done.
+
+    Attributes:
+        catalog (Catalog): The catalog being graded; its grade column is
+        updated after every query.
+        workers (int): The number of worker processes.
+    """
+
+    def __init__(self, catalog, workers=None):
+        """
+        Copies the numeric columns of the catalog into shared memory and
+        starts the workers.
+
+        Args:
+            catalog (Catalog): The catalog to grade.
+            workers (int): The number of worker processes, defaults to
+            the number of CPUs.
+        """
+        self.catalog = catalog
+        self.workers = workers or os.cpu_count() or 1
+        self._layout = {}
+        offset = 0
+        for name, typecode in Catalog.NUMERIC_COLUMNS:
+            column = getattr(catalog, name)
+            size = len(column) * column.itemsize
+            self._layout[name] = (offset, size, typecode)
+            offset = _aligned(offset + size)
+        self._memory = shared_memory.SharedMemory(
+            create=True, size=max(offset, 1)
+        )
+        for name, (start, size, _) in self._layout.items():
+            with memoryview(getattr(catalog, name)).cast("B") as column:
+                self._memory.buf[start: start + size] = column
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_attach,
+            initargs=(
+                self._memory.name,
+                self._layout,
+                catalog.title_pool.strings,
+                catalog.author_pool.strings,
+                catalog.isbns,
+            ),
+        )
+
+    def __enter__(self):
+        """Returns the grader itself."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Stops the workers and frees the shared memory."""
+        self.close()
+
+    def close(self):
+        """Stops the workers and frees the shared memory."""
+        self._pool.shutdown()
+        self._memory.close()
+        self._memory.unlink()
+
+    def grade(self, book_criteria, k=5, context=None):
+        """
+        Grades the catalog for a query across the workers.
+
+        The follow-up questions must already be answered in the context
+        (see grading_engine.needed_questions); the context is sent to
+        every worker with its slice.
+
+        Args:
+            book_criteria (BookCriteria): The criteria to grade against.
+            k (int): The number of books to return.
+            context (ScoringContext): Optional per-query state holding
+            the answers to the follow-up questions.
+
+        Returns:
+            list: The k best books, highest grade first.
+        """
+        if context is None:
+            context = ScoringContext(book_criteria)
+
+        row_count = len(self.catalog)
+        slice_size = max(1, -(-row_count // self.workers))
+        with metrics.span("grade", genre="parallel"):
+            futures = [
+                self._pool.submit(
+                    _grade_slice,
+                    start,
+                    min(start + slice_size, row_count),
+                    context,
+                    k,
+                    metrics.enabled,
+                )
+                for start in range(0, row_count, slice_size)
+            ]
+            # Slices are merged in row order, so ties keep catalog order
+            candidates = []
+            for future in futures:
+                rows, snapshot = future.result()
+                candidates += rows
+                if snapshot is not None:
+                    metrics.merge(snapshot)
+
+        offset, size, _ = self._layout["grades"]
+        with memoryview(self.catalog.grades).cast("B") as local:
+            local[:] = self._memory.buf[offset: offset + size]
+        grades = self.catalog.grades
+        best = heapq.nlargest(k, candidates, key=grades.__getitem__)
+        return [self.catalog.book(row) for row in best]
+
+
+def grade_parallel(catalog, book_criteria, workers=None, k=5, context=None):
+    """
+    Grades a catalog for one query with a temporary pool of workers.
+
+    Args:
+        catalog (Catalog): The catalog to grade.
+        book_criteria (BookCriteria): The criteria to grade against.
+        workers (int): The number of worker processes.
+        k (int): The number of books to return.
+        context (ScoringContext): Optional per-query state holding
+        the answers to the follow-up questions.
+
+    Returns:
+        list: The k best books, highest grade first.
+    """
+    with ParallelGrader(catalog, workers) as grader:
+        return grader.grade(book_criteria, k, context)
@@ -0,0 +1,77 @@
+"""
+File: questions.py
+Author: Lyuboslav Gigov
+Purpose: The pre-scoring phase of a query. Some genres need a follow-up
+question answered before their books can be graded (the user's mood for
+romances, the level of education for encyclopedias). This module finds
+out which questions a query needs, asks them interactively or fills in
+answers given up front, and stores the answers in the query's
+ScoringContext, so the grading phase itself never prompts and never
+touches shared state.
+"""
+
+from encyclopedia import EDUCATION_QUESTION, Encyclopedia
+from romance import MOOD_QUESTION, Romance
+
+# How every follow-up question is asked interactively
+ASK = {
+    MOOD_QUESTION: Romance.ask_mood,
+    EDUCATION_QUESTION: Encyclopedia.ask_education_level,
+}
+
+
+def needed_questions(books, context):
+    """
+    Finds the follow-up questions a query needs, in the order the books
+    needing them appear. Books over budget need no question.
+
+    Args:
+        books (iterable): The books that will be graded.
+        context (ScoringContext): The per-query state of the query.
+
+    Returns:
+        list: The names of the questions to ask.
+    """
+    max_price = context.book_criteria.max_price
+    questions = []
+    for book in books:
+        if book.price > max_price:
+            continue
+        question = book.follow_up_question(context)
+        if question is not None and question not in questions:
+            questions.append(question)
+            if len(questions) == len(ASK):
+                break
+    return questions
+
+
+def ask_questions(questions, context):
+    """
+    Asks the user the follow-up questions and stores the answers.
+
+    Args:
+        questions (list): The names of the questions to ask.
+        context (ScoringContext): The per-query state of the query.
+    """
+    for question in questions:
+        ASK[question](context)
+
+
+def answer_questions(context, mood=None, needs_encyclopedia=False,
+                     education_level=""):
+    """
+    Stores answers given in advance, e.g. in a batch or service request.
+    An answer is only kept if the user's input would have made the
+    question be asked, as it is in the interactive session.
+
+    Args:
+        context (ScoringContext): The per-query state of the query.
+        mood (str): The user's mood, or None if not given.
+        needs_encyclopedia (bool): Whether the user needs an encyclopedia.
+        education_level (str): The level the encyclopedia is needed for.
+    """
+    if Romance.follow_up_question(context) is not None:
+        context.mood = mood
+    if Encyclopedia.follow_up_question(context) is not None:
+        context.needs_encyclopedia = bool(needs_encyclopedia)
+        context.education_level = education_level if needs_encyclopedia else ""
@@ -0,0 +1,261 @@
+"""
+File: result_cache.py
+Author: Lyuboslav Gigov
+Purpose: This module defines a bounded LRU cache of recommendation
+results. Many customers enter near-identical criteria, so a ranking is
+cached under a canonical key: the age and gender reduced to the values
+the genre formulas actually use, the set of affordable books, the user's
+keywords regardless of order, and the answers to the follow-up
+questions. Two queries with the same key get the same grades, so a
+cached ranking is always the ranking grading would produce. The whole
+cache is dropped when the inventory, a keyword file or the title rules
+change on disk, and when books are added, updated or removed in memory.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+import biography
+import romance
+import science_fiction
+from bookstore import FILE_NAME, KEYWORD_FILE_NAMES
+from rules import RULES_FILE_NAME
+
+# The number of rankings kept by default
+DEFAULT_MAX_ENTRIES = 1024
+
+
+def criteria_key(context, affordable_count, k):
+    """
+    Builds the canonical cache key of a query.
+
+    Args:
+        context (ScoringContext): The per-query state of the query,
+        holding its criteria and the answers to its follow-up questions.
+        affordable_count (int): The number of books within the budget.
+        Books are affordable in price order, so equal counts mean the
+        same affordable books.
+        k (int): The number of books ranked.
+
+    Returns:
+        tuple: The key; equal keys give equal rankings.
+    """
+    criteria = context.book_criteria
+    age, gender = criteria.age, criteria.gender
+    keywords = context.user_keywords
+    if not context.phrase_matching:
+        # Word-by-word matching does not depend on the keyword order
+        keywords = sorted(keywords)
+    return (
+        science_fiction.age_relevance(age),
+        romance.age_relevance(age),
+        biography.age_increment(age),
+        age >= 10,  # Younger readers get no encyclopedia
+        science_fiction.gender_relevance(gender),
+        romance.gender_relevance(gender),
+        affordable_count,
+        context.phrase_matching,
+        tuple(keywords),
+        context.mood,
+        context.needs_encyclopedia,
+        context.education_level if context.needs_encyclopedia else "",
+        k,
+    )
+
+
+class ResultCache:
+    """
+    Keeps the rankings of the most recently used keys, evicting the least
+    recently used one when full. Safe to share between threads.
+
+    Attributes:
+        max_entries (int): The number of rankings kept.
+        hits (int): Number of lookups answered from the cache.
+        misses (int): Number of lookups not found in the cache.
+        evictions (int): Number of rankings dropped to make room.
+        invalidations (int): Number of times the cache was dropped
+        because a watched file or the in-memory inventory changed.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES,
+                 file_names=(FILE_NAME, RULES_FILE_NAME)
+                 + KEYWORD_FILE_NAMES):
+        """
+        Initializes an empty cache with zeroed counters.
+
+        Args:
+            max_entries (int): The number of rankings kept.
+            file_names (tuple): The files whose changes invalidate the
+            cache, by default the inventory, the title rules and the
+            keyword files.
+        """
+        self.max_entries = max_entries
+        self._file_names = tuple(file_names)
+        self._entries = OrderedDict()
+        self._signature = self._files_signature()
+        self._inventory_version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _files_signature(self):
+        """
+        Returns the (modification time, size) pairs of the watched files;
+        a missing file has the signature None.
+        """
+        signature = []
+        for file_name in self._file_names:
+            try:
+                stat = os.stat(file_name)
+            except OSError:
+                signature.append(None)
+            else:
+                signature.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def _check_files(self):
+        """Drops every ranking if a watched file has changed."""
+        signature = self._files_signature()
+        if signature != self._signature:
+            self._signature = signature
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+
+    def check_inventory(self, version):
+        """
+        Drops every ranking if the in-memory inventory has changed since
+        the previous lookup.
+
+        Args:
+            version (int): The current version of the inventory, see
+            Bookstore.version.
+        """
+        with self._lock:
+            if version != self._inventory_version:
+                self._inventory_version = version
+                if self._entries:
+                    self._entries.clear()
+                    self.invalidations += 1
+
+    def get(self, key):
+        """
+        Returns the cached ranking of a key and marks it as recently used.
+
+        Args:
+            key (tuple): The key built by criteria_key.
+
+        Returns:
+            list: The cached ranking, or None if there is none.
+        """
+        with self._lock:
+            self._check_files()
+            ranking = self._entries.get(key)
+            if ranking is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return ranking
+
+    def put(self, key, ranking):
+        """
+        Stores the ranking of a key, evicting the least recently used
+        rankings beyond max_entries.
+
+        Args:
+            key (tuple): The key built by criteria_key.
+            ranking (list): The ranking to store.
+        """
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = ranking
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drops every cached ranking and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.invalidations = 0
+
+    def rank_books(self, bookstore, context, k=5):
+        """
+        Returns the ranking of a query from the cache, ranking the
+        bookstore's books and caching the result on a miss.
+
+        Args:
+            bookstore (Bookstore): The books to rank.
+            context (ScoringContext): The per-query state of the query.
+            k (int): The number of books to rank.
+
+        Returns:
+            list: (book, grade) pairs of the k best books.
+        """
+        self.check_inventory(bookstore.version)
+        criteria = context.book_criteria
+        key = criteria_key(
+            context, bookstore.count_within_budget(criteria.max_price), k
+        )
+        ranking = self.get(key)
+        if ranking is None:
+            ranking = bookstore.rank_books(criteria, context, k)
+            self.put(key, ranking)
+        return ranking
+
+    def rank_catalog(self, catalog, context, k=5):
+        """
+        Returns the ranking of a query from the cache, grading the
+        catalog with the NumPy grading engine on a miss. The catalog's
+        grade column is left untouched.
+
+        Args:
+            catalog (Catalog): The books to rank.
+            context (ScoringContext): The per-query state of the query.
+            k (int): The number of books to rank.
+
+        Returns:
+            list: (book, grade) pairs of the k best books.
+        """
+        from grading_engine import grade_catalog, top_rows
+
+        criteria = context.book_criteria
+        affordable = catalog.column("prices") <= criteria.max_price
+        key = criteria_key(context, int(affordable.sum()), k)
+        ranking = self.get(key)
+        if ranking is None:
+            grades = grade_catalog(catalog, criteria, context, store=False)
+            ranking = [
+                (catalog.book(row), float(grades[row]))
+                for row in top_rows(grades, k)
+            ]
+            self.put(key, ranking)
+        return ranking
+
+    def stats(self):
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: The number of hits, misses, evictions, invalidations
+            and cached rankings, and the hit rate.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
@@ -6,10 +6,46 @@ incorporating elements like emotional depth and realism
 to align book recommendations with user mood preferences.
 """
 
-from book import Fiction, match_keywords
+from book import Fiction, clamp_grade
+from rules import MOOD_TRIGGER, get_rule_table
 
 KEYWORD_FILE_NAME = "Romance_Keywords.txt"
 
+# The follow-up question asked when romance keywords are found
+MOOD_QUESTION = "mood"
+
+# Weights of the base grade formula
+AGE_WEIGHT = 0.1
+EMOTIONAL_DEPTH_WEIGHT = 0.1
+REALISM_WEIGHT = 0.1
+GENDER_WEIGHT = 0.1
+
+
+def age_relevance(age):
+    """
+    Returns how relevant romance books are to readers of an age.
+
+    Args:
+        age (int): The user's age.
+
+    Returns:
+        int: The relevance, from 0 to 100.
+    """
+    return 100 if 10 <= age <= 20 else 80 if 20 < age <= 30 else 60
+
+
+def gender_relevance(gender):
+    """
+    Returns how relevant romance books are to readers of a gender.
+
+    Args:
+        gender (str): The user's gender.
+
+    Returns:
+        int: The relevance, from 0 to 100.
+    """
+    return 100 if gender == "woman" else 80 if gender == "man" else 60
+
 
 def validate_mood(mood):
     """
@@ -49,12 +85,6 @@ class Romance(Fiction):
     related to emotional depth and realism.
 
     Attributes:
-        prompted (bool): Class variable to check if the user
-        has been prompted about their mood.
-        user_wants_romance (bool): Class variable to check if the user
-        wants a romance book recommendation.
-        user_mood (str): Class variable to store the user's mood
-        for recommending a romance book.
         emotional_depth (int): Represents the emotional depth of
         the romance narrative, from 0 to 100.
         realism (int): Represents the level of realism
@@ -65,10 +95,7 @@ class Romance(Fiction):
         year (int): The publication year of the biography.
         isbn (str): The ISBN of the biography.
     """
-    # Static class variable to signify whether user has been prompted or not
-    prompted = False
-    user_wants_romance = False
-    user_mood = "need a laugh"  # Default value
+    __slots__ = ("_emotional_depth", "_realism")
 
     def __init__(
         self, title, author, price, year, isbn, emotional_depth, realism
@@ -147,7 +174,8 @@ class Romance(Fiction):
 
     def matches_mood_to_book(self, mood):
         """
-        Matches the user's mood to a specific romance book.
+        Matches the user's mood to a specific romance book through the
+        mood rules of the rules file.
 
         Args:
             mood (str): The user's mood.
@@ -155,13 +183,10 @@ class Romance(Fiction):
         Returns:
             bool: True if the book matches the user's mood, False otherwise.
         """
-        mood_map = {
-            "happy": "Me Before You",
-            "sad": "The Fault in Our Stars",
-            "adventurous": "Outlander",
-            "need a laugh": "Can You Keep a Secret?",
-        }
-        return self.title == mood_map.get(mood, "")
+        return any(
+            rule.targets(self)
+            for rule in get_rule_table().triggered(MOOD_TRIGGER, mood)
+        )
 
     def base_grade(self, book_criteria):
         """
@@ -175,57 +200,58 @@ class Romance(Fiction):
         Returns:
             float: The computed base grade for the book.
         """
-        age_weight, emotional_depth_weight, realism_weight, gender_weight = (
-            0.1,
-            0.1,
-            0.1,
-            0.1,
-        )
-        age_relevance = (
-            100
-            if 10 <= book_criteria.age <= 20
-            else 80 if 20 < book_criteria.age <= 30 else 60
-        )
-        gender_relevance = (
-            100
-            if book_criteria.gender == "woman"
-            else 80 if book_criteria.gender == "man" else 60
-        )
         return (
-            age_weight * age_relevance
-            + emotional_depth_weight * self.emotional_depth
-            + realism_weight * self.realism
-            + gender_weight * gender_relevance
+            AGE_WEIGHT * age_relevance(book_criteria.age)
+            + EMOTIONAL_DEPTH_WEIGHT * self.emotional_depth
+            + REALISM_WEIGHT * self.realism
+            + GENDER_WEIGHT * gender_relevance(book_criteria.gender)
         )
 
-    def calculate_grade(self, book_criteria):
+    @staticmethod
+    def follow_up_question(context):
         """
-        Calculates and updates the grade of the book
-        based on the user's criteria and mood.
+        Romances need the user's mood when romance keywords are found
+        in the user's input.
+
+        Args:
+            context (ScoringContext): The per-query state of the query.
+
+        Returns:
+            str: MOOD_QUESTION, or None if no romance keyword was found.
+        """
+        _, keyword_count = context.match_keywords(KEYWORD_FILE_NAME)
+        return MOOD_QUESTION if keyword_count else None
+
+    @staticmethod
+    def ask_mood(context):
+        """
+        Asks the user for their mood and stores it in the query's
+        context.
+
+        Args:
+            context (ScoringContext): The per-query state of the query.
+        """
+        context.mood = get_mood()
+
+    def score(self, book_criteria, context=None):
+        """
+        Computes the grade of the book based on the user's criteria and
+        the mood stored in the query's context; the romance recommended
+        for the mood gets a bonus through the rules file.
 
         Args:
             book_criteria (BookCriteria): The criteria
             against which to evaluate the book.
+            context (ScoringContext): Optional per-query state holding
+            the user's mood.
 
         Returns:
-            None: The method directly modifies the grade property of the book.
-        """
-        if super().calculate_grade(book_criteria):
-            user_keywords = [word.lower() for word in book_criteria.info]
-            initial_grade = self.base_grade(book_criteria)
-            self.grade += initial_grade
-
-            _, keyword_count = match_keywords(KEYWORD_FILE_NAME, user_keywords)
-
-            if keyword_count and not Romance.prompted:
-                Romance.prompted = True
-                Romance.user_wants_romance = True
-                Romance.user_mood = get_mood()
-
-            if Romance.user_wants_romance:
-                if self.matches_mood_to_book(Romance.user_mood):
-                    self.grade += 40
-                    print(
-                        f"\nBased on your mood, we recommend "
-                        f"{self.title} by {self.author}.\n"
-                    )
+            float: The grade of the book, from 0 to 100.
+        """
+        grade = super().score(book_criteria, context)
+        if not grade:
+            return grade  # Over budget
+        grade = clamp_grade(grade + self.base_grade(book_criteria))
+        if context is not None:
+            grade = self.apply_title_rules(grade, context)
+        return grade
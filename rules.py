@@ -0,0 +1,324 @@
+"""
+File: rules.py
+Author: Lyuboslav Gigov
+Purpose: This module compiles the title rules of the genres, the
+special cases that single out a book for a query (a sci-fi theme, a
+sport, a mood, a level of education), from the declarative rules file
+Title_Rules.txt. Every line names a genre, a trigger, the trigger's
+values, the targeted title or ISBN and the effect on the grade:
+
+    Romance; mood; happy; title: Me Before You; + 40
+
+The file is compiled once into an index from (trigger, value) to rules
+and reloaded only when it changes. A query looks up the rules its
+keywords and answers fire and gets a lookup of their targets, so a book
+costs two dictionary lookups instead of a scan of every rule.
+"""
+
+import os
+from book import clamp_grade
+
+RULES_FILE_NAME = "Title_Rules.txt"
+
+# The genres a rule can name, as in the inventory file
+GENRE_NAMES = ("Science Fiction", "Romance", "Biography", "Encyclopedia")
+
+# What the values of a rule are compared with
+KEYWORD_TRIGGER = "keyword"
+MOOD_TRIGGER = "mood"
+EDUCATION_TRIGGER = "education level"
+TRIGGERS = (KEYWORD_TRIGGER, MOOD_TRIGGER, EDUCATION_TRIGGER)
+
+# The genre whose follow-up question gives the answer a trigger reads;
+# only that genre's books may depend on the answer, so the questions can
+# be asked when the first such book is reached (see stream_top_books)
+ANSWER_GENRES = {MOOD_TRIGGER: "Romance", EDUCATION_TRIGGER: "Encyclopedia"}
+
+# How a rule names its book
+TARGET_KINDS = ("title", "isbn")
+
+
+class TitleRule:
+    """
+    A single compiled rule.
+
+    Attributes:
+        order (int): The position of the rule in the file; rules
+        targeting the same book apply in this order.
+        genre (str): The genre of the targeted book.
+        trigger (str): What the values are compared with.
+        values (tuple): The values that fire the rule.
+        target_kind (str): "title" or "isbn".
+        target (str): The targeted title or ISBN.
+        operator (str): "=" to set the grade, "+" to add to it.
+        amount (float): The grade set or added.
+    """
+
+    __slots__ = (
+        "order",
+        "genre",
+        "trigger",
+        "values",
+        "target_kind",
+        "target",
+        "operator",
+        "amount",
+    )
+
+    def __init__(self, order, genre, trigger, values, target_kind, target,
+                 operator, amount):
+        """Initializes a rule from its parsed fields."""
+        self.order = order
+        self.genre = genre
+        self.trigger = trigger
+        self.values = tuple(values)
+        self.target_kind = target_kind
+        self.target = target
+        self.operator = operator
+        self.amount = amount
+
+    def apply(self, grade):
+        """
+        Applies the rule's effect to a grade.
+
+        Args:
+            grade (float): The grade of the targeted book.
+
+        Returns:
+            float: The new grade, from 0 to 100.
+        """
+        if self.operator == "=":
+            return self.amount
+        return clamp_grade(grade + self.amount)
+
+    def targets(self, book):
+        """Checks whether the rule names a book."""
+        if book.get_genre() != self.genre:
+            return False
+        if self.target_kind == "title":
+            return book.title == self.target
+        return book.isbn == self.target
+
+
+def parse_rule(line, order=0):
+    """
+    Creates a rule from one line of the rules file.
+
+    Args:
+        line (str): A semicolon-separated rule line.
+        order (int): The position of the rule in the file.
+
+    Raises:
+        ValueError: If the line does not contain the expected number of
+        fields, or if one of them is invalid.
+
+    Returns:
+        TitleRule: The rule described by the line.
+    """
+    parts = [part.strip() for part in line.strip().split(";")]
+    if len(parts) != 5:
+        raise ValueError(
+            f"Incorrect number of fields. "
+            f"Expected 5, got {len(parts)}. Line: {line}"
+        )
+    genre, trigger, values, target, effect = parts
+    if genre not in GENRE_NAMES:
+        raise ValueError(f"Invalid genre: {genre}. Line: {line}")
+    trigger = trigger.lower()
+    if trigger not in TRIGGERS:
+        raise ValueError(
+            f"Invalid trigger: {trigger}. Expected one of "
+            f"{', '.join(TRIGGERS)}. Line: {line}"
+        )
+    if ANSWER_GENRES.get(trigger, genre) != genre:
+        raise ValueError(
+            f"The {trigger} trigger is only available to "
+            f"{ANSWER_GENRES[trigger]} rules. Line: {line}"
+        )
+    values = [value.strip().lower() for value in values.split(",")]
+    if not all(values):
+        raise ValueError(f"Empty trigger value. Line: {line}")
+    target_kind, _, target = target.partition(":")
+    target_kind, target = target_kind.strip().lower(), target.strip()
+    if target_kind not in TARGET_KINDS or not target:
+        raise ValueError(
+            f"Invalid target: expected 'title: <title>' or "
+            f"'isbn: <ISBN>'. Line: {line}"
+        )
+    operator, amount = effect[:1], effect[1:].strip()
+    if operator not in ("=", "+"):
+        raise ValueError(
+            f"Invalid effect: expected '= N' or '+ N'. Line: {line}"
+        )
+    amount = float(amount)
+    if amount.is_integer():
+        amount = int(amount)
+    return TitleRule(
+        order, genre, trigger, values, target_kind, target, operator, amount
+    )
+
+
+class FiredRules:
+    """
+    The rules fired by one query, looked up by their targets.
+
+    Attributes:
+        targets (dict): The fired rules of every (genre, target kind,
+        target), in file order.
+    """
+
+    def __init__(self, rules=()):
+        """
+        Builds the lookup of the fired rules.
+
+        Args:
+            rules (iterable): The fired rules.
+        """
+        self.targets = {}
+        for rule in sorted(set(rules), key=lambda rule: rule.order):
+            key = (rule.genre, rule.target_kind, rule.target)
+            self.targets.setdefault(key, []).append(rule)
+
+    def rules_for(self, book):
+        """
+        Returns the fired rules naming a book, in file order.
+
+        Args:
+            book (Book): The book being graded.
+
+        Returns:
+            list: The rules to apply to the book's grade.
+        """
+        if not self.targets:
+            return []
+        genre = book.get_genre()
+        by_title = self.targets.get((genre, "title", book.title), [])
+        by_isbn = self.targets.get((genre, "isbn", book.isbn), [])
+        if not by_isbn:
+            return by_title
+        return sorted(by_title + by_isbn, key=lambda rule: rule.order)
+
+    def __bool__(self):
+        """Returns True if any rule fired."""
+        return bool(self.targets)
+
+
+class RuleTable:
+    """
+    The compiled rules file.
+
+    Attributes:
+        rules (tuple): The rules in file order.
+        signature (tuple): The (modification time, size) of the file at
+        the moment it was compiled, or None.
+    """
+
+    def __init__(self, rules=(), signature=None):
+        """
+        Compiles the trigger index of the rules.
+
+        Args:
+            rules (iterable): The rules in file order.
+            signature (tuple): The (modification time, size) of the file.
+        """
+        self.rules = tuple(rules)
+        self.signature = signature
+        self._triggers = {}
+        for rule in self.rules:
+            for value in rule.values:
+                self._triggers.setdefault((rule.trigger, value), []).append(
+                    rule
+                )
+
+    @classmethod
+    def load(cls, file_name=RULES_FILE_NAME):
+        """
+        Reads and compiles a rules file. Blank lines and lines starting
+        with '#' are skipped.
+
+        Args:
+            file_name (str): The rules file to read.
+
+        Raises:
+            FileNotFoundError: If the specified file cannot be found.
+            ValueError: If a line cannot be parsed into a rule.
+
+        Returns:
+            RuleTable: The compiled rules.
+        """
+        stat = os.stat(file_name)
+        rules = []
+        with open(file_name, "r") as readfile:
+            for line in readfile:
+                if line.strip() and not line.lstrip().startswith("#"):
+                    rules.append(parse_rule(line, len(rules)))
+        return cls(rules, (stat.st_mtime_ns, stat.st_size))
+
+    def triggered(self, trigger, value):
+        """
+        Returns the rules a single trigger value fires.
+
+        Args:
+            trigger (str): What the value is compared with.
+            value (str): The value given by the query.
+
+        Returns:
+            list: The fired rules.
+        """
+        return self._triggers.get((trigger, value), [])
+
+    def fired(self, context):
+        """
+        Finds the rules a query fires through the trigger index.
+
+        Args:
+            context (ScoringContext): The per-query state of the query.
+
+        Returns:
+            FiredRules: The fired rules by target.
+        """
+        rules = []
+        for keyword in set(context.user_keywords):
+            rules += self.triggered(KEYWORD_TRIGGER, keyword)
+        if context.mood is not None:
+            rules += self.triggered(MOOD_TRIGGER, context.mood)
+        if context.needs_encyclopedia:
+            rules += self.triggered(
+                EDUCATION_TRIGGER, context.education_level
+            )
+        return FiredRules(rules)
+
+
+# Compiled once per process and reloaded only when the file changes
+_tables = {}
+
+
+def get_rule_table(file_name=RULES_FILE_NAME):
+    """
+    Returns the compiled rules file, compiling it again only when it has
+    changed on disk. A missing file means no rules.
+
+    Args:
+        file_name (str): The rules file to read.
+
+    Raises:
+        ValueError: If a line cannot be parsed into a rule.
+
+    Returns:
+        RuleTable: The compiled rules.
+    """
+    try:
+        stat = os.stat(file_name)
+    except FileNotFoundError:
+        table = _tables.get(file_name)
+        if table is None or table.signature is not None:
+            print(
+                f"No file with title rules found at {file_name}!"
+                f"Continuing without title rules."
+            )
+            _tables[file_name] = RuleTable()
+        return _tables[file_name]
+    table = _tables.get(file_name)
+    if table is None or table.signature != (stat.st_mtime_ns, stat.st_size):
+        table = _tables[file_name] = RuleTable.load(file_name)
+    return table
@@ -7,10 +7,42 @@ and methods specific to science fiction books,
 such as handling scientific accuracy and action levels.
 """
 
-from book import Fiction, match_keywords
+from book import Fiction, ScoringContext, clamp_grade
 
 KEYWORD_FILE_NAME = "Science_Fiction_Keywords.txt"
 
+# Weights of the grade formula
+AGE_WEIGHT = 0.1
+GENDER_WEIGHT = 0.1
+SCIENTIFIC_ACCURACY_WEIGHT = 0.1
+ACTION_LEVEL_WEIGHT = 0.1
+
+
+def age_relevance(age):
+    """
+    Returns how relevant science fiction is to readers of an age.
+
+    Args:
+        age (int): The user's age.
+
+    Returns:
+        int: The relevance, from 0 to 100.
+    """
+    return 80 if age <= 18 else 100 if 18 < age < 35 else 60
+
+
+def gender_relevance(gender):
+    """
+    Returns how relevant science fiction is to readers of a gender.
+
+    Args:
+        gender (str): The user's gender.
+
+    Returns:
+        int: The relevance, from 0 to 100.
+    """
+    return 100 if gender == "man" else 80 if gender == "woman" else 70
+
 
 class ScienceFiction(Fiction):
     """
@@ -29,6 +61,8 @@ class ScienceFiction(Fiction):
         action content in the book, scaled 0-100.
     """
 
+    __slots__ = ("_scientific_accuracy", "_action_level")
+
     def __init__(
         self,
         title,
@@ -116,56 +150,40 @@ class ScienceFiction(Fiction):
         """
         return "Science Fiction"
 
-    def calculate_grade(self, book_criteria):
+    def score(self, book_criteria, context=None):
         """
-        Calculates and updates the grade of the book based on
+        Computes the grade of the book based on
         the specified book criteria and inherent book properties.
 
         Args:
             book_criteria (BookCriteria): An object
             containing criteria to grade the book.
+            context (ScoringContext): Optional per-query state holding
+            the keyword matches shared by every book of the query.
 
         Returns:
-            None: The method directly modifies
-            the grade property of the book.
+            float: The grade of the book, from 0 to 100.
         """
-        if super().calculate_grade(book_criteria):
-            user_keywords = [word.lower() for word in book_criteria.info]
-
-            # Sci-fi enthusiasts might be looking for specific themes
-            if any(
-                k in user_keywords
-                for k in ["space", "ai", "robotics", "future"]
-            ) and self.title in ["Neuromancer", "Dune"]:
-                self.grade = 100
-                return
-
-            # Grade calculation based on multiple factors
-            # grade = weight1 * relevance1 + weight2 * relevance2 + ...
-            (
-                weight_age,
-                weight_gender,
-                weight_sc_accuracy,
-                weight_action_level,
-            ) = (0.1, 0.1, 0.1, 0.1)
-            age_relevance = (
-                80
-                if book_criteria.age <= 18
-                else 100 if 18 < book_criteria.age < 35 else 60
-            )
-            gender_relevance = (
-                100
-                if book_criteria.gender == "man"
-                else 80 if book_criteria.gender == "woman" else 70
-            )
-
-            keyword_increment, keyword_count = match_keywords(
-                KEYWORD_FILE_NAME, user_keywords
-            )
-            self.grade += (
-                weight_age * age_relevance
-                + weight_gender * gender_relevance
-                + weight_sc_accuracy * self.scientific_accuracy
-                + weight_action_level * self.action_level
+        grade = super().score(book_criteria, context)
+        if not grade:
+            return grade  # Over budget
+        if context is None:
+            context = ScoringContext(book_criteria)
+
+        # Grade calculation based on multiple factors
+        # grade = weight1 * relevance1 + weight2 * relevance2 + ...
+        keyword_increment, _ = context.match_keywords(KEYWORD_FILE_NAME)
+        grade = clamp_grade(
+            grade
+            + (
+                AGE_WEIGHT * age_relevance(book_criteria.age)
+                + GENDER_WEIGHT * gender_relevance(book_criteria.gender)
+                + SCIENTIFIC_ACCURACY_WEIGHT * self.scientific_accuracy
+                + ACTION_LEVEL_WEIGHT * self.action_level
                 + keyword_increment
             )
+        )
+
+        # Sci-fi enthusiasts might be looking for specific themes, see
+        # the rules file
+        return self.apply_title_rules(grade, context)
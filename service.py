@@ -0,0 +1,427 @@
+"""
+File: service.py
+Author: Lyuboslav Gigov
+Purpose: Long-lived local HTTP service for the store terminals. The
+inventory and the keyword lexicons are loaded once and stay resident,
+requests are accepted by an asyncio server, and the CPU-bound grading
+runs in an executor so the event loop keeps accepting connections.
+
+Endpoints:
+    POST /recommend  Body: a criteria record as in batch.py (age,
+                     max_price, gender, info and optional mood,
+                     needs_encyclopedia, education_level), plus an
+                     optional "top". Returns the ranked books.
+    POST /ranking    Body: a criteria record, plus an optional "limit"
+                     (default 50, at most 1000) and the "cursor" of the
+                     previous page. Returns one page of the full
+                     ranking and the cursor of the next page.
+    GET /stats       Request count, latency percentiles in ms and
+                     result cache counters.
+    GET /health      Liveness check.
+    GET /metrics     The stage timings and work counters, in the
+                     Prometheus text format (with --metrics).
+
+Usage: python service.py [--host HOST] [--port PORT] [--vectorized]
+                         [--cache-size N] [--metrics] [--phrases]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from batch import book_summary, parse_record
+from book import ScoringContext
+from bookstore import KEYWORD_FILE_NAMES, Bookstore
+from export import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    page_catalog,
+    positive_int,
+)
+from instrumentation import metrics
+from lexicon import get_lexicon
+from questions import answer_questions
+from result_cache import DEFAULT_MAX_ENTRIES, ResultCache
+
+# The number of most recent requests the latency percentiles cover
+LATENCY_WINDOW = 10000
+
+# The largest request body accepted, in bytes
+MAX_BODY_SIZE = 64 * 1024
+
+
+def percentile(values, fraction):
+    """
+    Returns the nearest-rank percentile of a sequence of values.
+
+    Args:
+        values (list): The values, in any order.
+        fraction (float): The percentile as a fraction, e.g. 0.99.
+
+    Returns:
+        float: The percentile, or 0.0 if there are no values.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class LatencyRecorder:
+    """
+    Keeps the latencies of the most recent requests.
+
+    Attributes:
+        count (int): The number of requests recorded since startup.
+    """
+
+    def __init__(self, window=LATENCY_WINDOW):
+        """
+        Args:
+            window (int): The number of recent latencies kept.
+        """
+        self.count = 0
+        self._latencies = deque(maxlen=window)
+
+    def record(self, seconds):
+        """Records the latency of one request."""
+        self.count += 1
+        self._latencies.append(seconds)
+
+    def summary(self):
+        """
+        Returns the request count and the p50, p90, p99 and maximum
+        latencies of the recent requests, in milliseconds.
+        """
+        latencies = list(self._latencies)
+        summary = {"requests": self.count, "window": len(latencies)}
+        for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+            summary[f"{name}_ms"] = round(
+                percentile(latencies, fraction) * 1000, 3
+            )
+        summary["max_ms"] = round(max(latencies, default=0.0) * 1000, 3)
+        return summary
+
+
+class RecommendationService:
+    """
+    Grades recommendation requests against a resident inventory.
+
+    Every request gets its own ScoringContext and grading leaves the
+    inventory untouched, so requests are graded concurrently by a pool
+    of executor threads; the event loop never blocks on grading.
+
+    Attributes:
+        k (int): The default number of books per response.
+        vectorized (bool): If True, the NumPy grading engine is used.
+        phrase_matching (bool): If True, multi-word keywords are matched
+        as phrases, see ScoringContext.
+        latencies (LatencyRecorder): The latencies of the requests.
+        cache (ResultCache): The rankings of recent criteria.
+    """
+
+    def __init__(self, k=5, vectorized=False,
+                 cache_size=DEFAULT_MAX_ENTRIES, phrase_matching=False):
+        """
+        Loads the inventory and the keyword lexicons.
+
+        Args:
+            k (int): The default number of books per response.
+            vectorized (bool): If True, the NumPy grading engine is used.
+            cache_size (int): The number of rankings cached, 0 to
+            disable the cache.
+            phrase_matching (bool): If True, multi-word keywords are
+            matched as phrases.
+        """
+        self.k = k
+        self.vectorized = vectorized
+        self.phrase_matching = phrase_matching
+        if vectorized:
+            self._catalog = Bookstore.load_catalog()
+        else:
+            self._bookstore = Bookstore()
+        for file_name in KEYWORD_FILE_NAMES:
+            get_lexicon(file_name)
+        self.latencies = LatencyRecorder()
+        self.cache = ResultCache(cache_size)
+        self._executor = ThreadPoolExecutor()
+
+    def close(self):
+        """Stops the grading executor."""
+        self._executor.shutdown()
+
+    def recommend(self, record):
+        """
+        Grades the inventory for one criteria record.
+
+        Args:
+            record (dict): The criteria record of the request.
+
+        Raises:
+            ValueError: If the record is invalid.
+
+        Returns:
+            list: The summaries of the best books, highest grade first.
+        """
+        k = int(record.get("top", self.k))
+        if k <= 0:
+            raise ValueError("top must be positive.")
+        criteria, answers = parse_record(record)
+        context = ScoringContext(criteria, self.phrase_matching)
+        answer_questions(context, **answers)
+        if self.vectorized:
+            ranked = self.cache.rank_catalog(self._catalog, context, k)
+        else:
+            ranked = self.cache.rank_books(self._bookstore, context, k)
+        return [book_summary(book, grade) for book, grade in ranked]
+
+    def rank_page(self, record):
+        """
+        Selects one page of the full ranking for one criteria record.
+
+        Args:
+            record (dict): The criteria record of the request, with an
+            optional "limit" and the "cursor" of the previous page.
+
+        Raises:
+            ValueError: If the record, the limit or the cursor is
+            invalid.
+
+        Returns:
+            dict: The summaries of the books of the page with their
+            rank, and the cursor of the next page (None after the last
+            page).
+        """
+        limit = int(record.get("limit", DEFAULT_PAGE_SIZE))
+        if not 0 < limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}.")
+        cursor = record.get("cursor")
+        if cursor is not None and not isinstance(cursor, str):
+            raise ValueError("Invalid cursor.")
+        criteria, answers = parse_record(record)
+        context = ScoringContext(criteria, self.phrase_matching)
+        answer_questions(context, **answers)
+        if self.vectorized:
+            ranked, next_cursor, start = page_catalog(
+                self._catalog, context, cursor, limit
+            )
+        else:
+            ranked, next_cursor, start = self._bookstore.rank_page(
+                criteria, context, cursor, limit
+            )
+        books = [
+            {"rank": rank, **book_summary(book, grade)}
+            for rank, (book, grade) in enumerate(ranked, start)
+        ]
+        return {"books": books, "next_cursor": next_cursor}
+
+    async def handle_request(self, method, path, body):
+        """
+        Routes one HTTP request.
+
+        Args:
+            method (str): The request method.
+            path (str): The request path.
+            body (bytes): The request body.
+
+        Returns:
+            tuple: The HTTP status and the JSON-serializable response,
+            or the text of a plain-text response.
+        """
+        if path == "/health":
+            return HTTPStatus.OK, {"status": "ok"}
+        if path == "/metrics":
+            if not metrics.enabled:
+                return HTTPStatus.NOT_FOUND, {
+                    "error": "Start the service with --metrics."
+                }
+            return HTTPStatus.OK, metrics.to_prometheus()
+        if path == "/stats":
+            return HTTPStatus.OK, {
+                **self.latencies.summary(),
+                "cache": self.cache.stats(),
+            }
+        handlers = {"/recommend": self.recommend, "/ranking": self.rank_page}
+        if path not in handlers:
+            return HTTPStatus.NOT_FOUND, {"error": "Unknown path."}
+        if method != "POST":
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "Use POST."}
+
+        start = time.perf_counter()
+        try:
+            record = json.loads(body or b"null")
+            if not isinstance(record, dict):
+                raise ValueError("The body must be a JSON object.")
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                self._executor, handlers[path], record
+            )
+        except (ValueError, TypeError, OverflowError) as error:
+            return HTTPStatus.BAD_REQUEST, {"error": str(error)}
+        finally:
+            self.latencies.record(time.perf_counter() - start)
+        if path == "/ranking":
+            return HTTPStatus.OK, result
+        return HTTPStatus.OK, {"books": result}
+
+    async def handle_connection(self, reader, writer):
+        """
+        Serves the HTTP/1.1 requests of one connection until the client
+        closes it or asks for it to be closed.
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, path, _ = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(
+                        writer,
+                        HTTPStatus.BAD_REQUEST,
+                        {"error": "Malformed request line."},
+                        False,
+                    )
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = headers.get("content-length", "") or "0"
+                if not (length.isascii() and length.isdigit()):
+                    await self._respond(
+                        writer,
+                        HTTPStatus.BAD_REQUEST,
+                        {"error": "Invalid Content-Length."},
+                        False,
+                    )
+                    break
+                length = int(length)
+                if length > MAX_BODY_SIZE:
+                    await self._respond(
+                        writer,
+                        HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                        {"error": "Request body too large."},
+                        False,
+                    )
+                    break
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await self.handle_request(
+                    method.upper(), path.split("?", 1)[0], body
+                )
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status, payload, keep_alive):
+        """Writes a JSON response, or a plain-text one for a string."""
+        if isinstance(payload, str):
+            body = payload.encode()
+            content_type = "text/plain; version=0.0.4"
+        else:
+            body = json.dumps(payload).encode()
+            content_type = "application/json"
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def serve(self, host="127.0.0.1", port=8080):
+        """Accepts connections until the task is cancelled."""
+        server = await asyncio.start_server(
+            self.handle_connection, host, port
+        )
+        async with server:
+            print(f"Serving recommendations on http://{host}:{port}")
+            await server.serve_forever()
+
+
+def parse_args(argv=None):
+    """Parse the command-line options of the service.
+
+    Args:
+        argv (list): The arguments to parse, defaults to sys.argv[1:].
+
+    Returns:
+        argparse.Namespace: The parsed options.
+    """
+    parser = argparse.ArgumentParser(
+        description="Serve book recommendations over HTTP"
+    )
+    parser.add_argument(
+        "--host", default="127.0.0.1", help="address to listen on"
+    )
+    parser.add_argument(
+        "--port", type=int, default=8080, help="port to listen on"
+    )
+    parser.add_argument(
+        "--top",
+        type=positive_int,
+        default=5,
+        metavar="K",
+        help="default number of books per response (default: 5)",
+    )
+    parser.add_argument(
+        "--vectorized",
+        action="store_true",
+        help="grade with the NumPy grading engine",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_MAX_ENTRIES,
+        metavar="N",
+        help="number of rankings to cache, 0 to disable "
+        f"(default: {DEFAULT_MAX_ENTRIES})",
+    )
+    parser.add_argument(
+        "--phrases",
+        action="store_true",
+        help="match multi-word keywords such as \"time travel\" as one "
+        "keyword instead of word by word",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="time the stages of every request and count the work done, "
+        "served at GET /metrics",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Starts the recommendation service."""
+    args = parse_args(argv)
+    if args.metrics:
+        metrics.enable()
+    service = RecommendationService(
+        args.top, args.vectorized, args.cache_size, args.phrases
+    )
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
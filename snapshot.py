@@ -0,0 +1,278 @@
+"""
+File: snapshot.py
+Author: Lyuboslav Gigov
+Purpose: This module reads and writes compiled snapshots of the bookstore
+inventory. A snapshot stores the already-validated books in a compact
+binary layout (a string pool followed by fixed-size records), together
+with the modification time, size and SHA-256 hash of the text file it
+was built from, so it can be loaded without re-parsing the text or
+re-running the property setters and is ignored once the source changes.
+A CRC-32 of the payload detects a damaged snapshot, which is ignored as
+well.
+Run as a script to (re)build the snapshot of the inventory:
+python snapshot.py [inventory file] [snapshot file]
+"""
+
+import os
+import struct
+import sys
+import zlib
+from science_fiction import ScienceFiction
+from romance import Romance
+from biography import Biography
+from encyclopedia import Encyclopedia
+
+SNAPSHOT_FILE_NAME = "Bookstore_Inventory.snapshot"
+
+MAGIC = b"BRSS"
+VERSION = 2
+# Magic, version, source mtime (ns), source size, source SHA-256,
+# number of pooled strings, number of books, CRC-32 of the payload
+HEADER = struct.Struct("<4sHqq32sIII")
+# Genre code, price, year, two genre characteristics and the pool
+# indexes of the title, author and ISBN
+RECORD = struct.Struct("<BdiiiIII")
+
+GENRES = (ScienceFiction, Romance, Biography, Encyclopedia)
+# Private attributes behind the two genre characteristics
+CHARACTERISTIC_ATTRIBUTES = {
+    ScienceFiction: ("_scientific_accuracy", "_action_level"),
+    Romance: ("_emotional_depth", "_realism"),
+}
+
+
+def file_hash(file_name):
+    """
+    Computes the SHA-256 digest of a file, reading it in blocks.
+
+    Args:
+        file_name (str): The file to hash.
+
+    Returns:
+        bytes: The 32-byte digest.
+    """
+    import hashlib
+
+    digest = hashlib.sha256()
+    with open(file_name, "rb") as infile:
+        for block in iter(lambda: infile.read(1 << 20), b""):
+            digest.update(block)
+    return digest.digest()
+
+
+def restore_book(genre, title, author, price, year, isbn, first, second):
+    """
+    Recreates a book from values that were already validated, bypassing
+    the property setters.
+
+    Args:
+        genre (type): The class of the book.
+        title (str): The title of the book.
+        author (str): The author of the book.
+        price (float): The price of the book.
+        year (int): The publication year of the book.
+        isbn (str): The ISBN of the book.
+        first (int): The first genre characteristic, if the genre has any.
+        second (int): The second genre characteristic.
+
+    Returns:
+        Book: The recreated book.
+    """
+    book = object.__new__(genre)
+    book._title = title
+    book._author = author
+    book._price = price
+    book._year = year
+    book._isbn = isbn
+    characteristics = CHARACTERISTIC_ATTRIBUTES.get(genre)
+    if characteristics:
+        setattr(book, characteristics[0], first)
+        setattr(book, characteristics[1], second)
+    return book
+
+
+def write_snapshot(books, source_name, snapshot_name=SNAPSHOT_FILE_NAME):
+    """
+    Writes a snapshot of the books parsed from a source file.
+
+    The snapshot is written to a temporary file first and then renamed,
+    so a reader never sees a half-written snapshot.
+
+    Args:
+        books (list): The books parsed from the source file.
+        source_name (str): The inventory text file the books came from.
+        snapshot_name (str): The snapshot file to write.
+    """
+    stat = os.stat(source_name)
+    pool = {}
+    records = bytearray()
+    for book in books:
+        genre = type(book)
+        characteristics = [
+            getattr(book, attribute)
+            for attribute in CHARACTERISTIC_ATTRIBUTES.get(genre, ())
+        ] or [0, 0]
+        records += RECORD.pack(
+            GENRES.index(genre),
+            book.price,
+            book.year,
+            *characteristics,
+            *(
+                pool.setdefault(text, len(pool))
+                for text in (book.title, book.author, book.isbn)
+            ),
+        )
+
+    strings = "\0".join(pool).encode("utf-8")
+    payload = struct.pack("<I", len(strings)) + strings + records
+    temporary_name = snapshot_name + ".tmp"
+    with open(temporary_name, "wb") as outfile:
+        outfile.write(
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                stat.st_mtime_ns,
+                stat.st_size,
+                file_hash(source_name),
+                len(pool),
+                len(books),
+                zlib.crc32(payload),
+            )
+        )
+        outfile.write(payload)
+    os.replace(temporary_name, snapshot_name)
+
+
+def read_snapshot(source_name, snapshot_name=SNAPSHOT_FILE_NAME):
+    """
+    Loads the books of a snapshot if it still describes the source file.
+
+    The snapshot is current if the source's modification time and size
+    are unchanged or, failing that, if the source's hash is unchanged;
+    in that case the new modification time is written to the snapshot.
+    A snapshot whose payload does not match its checksum or does not
+    decode is treated as unreadable.
+
+    Args:
+        source_name (str): The inventory text file.
+        snapshot_name (str): The snapshot file to read.
+
+    Returns:
+        list: The books of the snapshot, or None if the snapshot is
+        missing, stale or unreadable.
+    """
+    try:
+        with open(snapshot_name, "rb") as infile:
+            data = infile.read()
+        stat = os.stat(source_name)
+    except OSError:
+        return None
+    if len(data) < HEADER.size:
+        return None
+
+    magic, version = struct.unpack_from("<4sH", data)
+    if magic != MAGIC or version != VERSION:
+        return None
+    (_, _, mtime, size, digest, string_count, book_count, checksum) = (
+        HEADER.unpack_from(data)
+    )
+    touched = (mtime, size) != (stat.st_mtime_ns, stat.st_size)
+    if touched and (
+        size != stat.st_size or digest != file_hash(source_name)
+    ):
+        return None
+    if zlib.crc32(memoryview(data)[HEADER.size:]) != checksum:
+        return None
+    try:
+        books = _decode_books(data, string_count, book_count)
+    except (IndexError, UnicodeDecodeError, struct.error, ValueError):
+        return None
+    if books is not None and touched:
+        _update_mtime(snapshot_name, data, stat.st_mtime_ns)
+    return books
+
+
+def _update_mtime(snapshot_name, data, mtime):
+    """
+    Records a new source modification time in a snapshot, so a source
+    that was only touched is not hashed again on every later load. A
+    snapshot that cannot be rewritten is left as it is.
+
+    Args:
+        snapshot_name (str): The snapshot file.
+        data (bytes): The whole snapshot file.
+        mtime (int): The source's modification time in nanoseconds.
+    """
+    fields = list(HEADER.unpack_from(data))
+    fields[2] = mtime
+    temporary_name = snapshot_name + ".tmp"
+    try:
+        with open(temporary_name, "wb") as outfile:
+            outfile.write(HEADER.pack(*fields))
+            outfile.write(memoryview(data)[HEADER.size:])
+        os.replace(temporary_name, snapshot_name)
+    except OSError:
+        pass
+
+
+def _decode_books(data, string_count, book_count):
+    """
+    Decodes the string pool and the records of a snapshot.
+
+    Args:
+        data (bytes): The whole snapshot file.
+        string_count (int): The number of pooled strings in the header.
+        book_count (int): The number of books in the header.
+
+    Raises:
+        IndexError: If a genre code or a pool index is out of range.
+        UnicodeDecodeError: If the string pool is not UTF-8.
+        struct.error: If the payload is truncated.
+
+    Returns:
+        list: The books, or None if the counts do not match the header.
+    """
+    offset = HEADER.size
+    (strings_length,) = struct.unpack_from("<I", data, offset)
+    offset += 4
+    strings = data[offset: offset + strings_length].decode("utf-8")
+    offset += strings_length
+    pool = strings.split("\0") if string_count else []
+    if (
+        len(pool) != string_count
+        or len(data) - offset != book_count * RECORD.size
+    ):
+        return None
+
+    books = []
+    for genre_code, price, year, first, second, title, author, isbn in (
+        RECORD.iter_unpack(data[offset:])
+    ):
+        books.append(
+            restore_book(
+                GENRES[genre_code],
+                pool[title],
+                pool[author],
+                price,
+                year,
+                pool[isbn],
+                first,
+                second,
+            )
+        )
+    return books
+
+
+def main(argv=None):
+    """Builds the snapshot of the inventory file given on the command line."""
+    from bookstore import Bookstore, FILE_NAME
+
+    argv = sys.argv[1:] if argv is None else argv
+    source_name = argv[0] if argv else FILE_NAME
+    snapshot_name = argv[1] if len(argv) > 1 else SNAPSHOT_FILE_NAME
+    Bookstore.write_snapshot(source_name, snapshot_name)
+    print(f"Snapshot of {source_name} written to {snapshot_name}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+File: startup_profile.py
+Author: Lyuboslav Gigov
+Purpose: Measures the cold start of main.py, which is launched once per
+customer: the import time of the modules loaded before the first
+prompt, read from `python -X importtime`, and the time from launching
+the interpreter to the first prompt. Used by `python main.py
+--startup-profile`.
+"""
+
+import os
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+MAIN_SCRIPT = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "main.py"
+)
+
+# The first prompt main.py shows a customer
+FIRST_PROMPT = b"Enter age: "
+
+# The time to the first prompt a kiosk should not exceed, in milliseconds
+TIME_TO_FIRST_PROMPT_TARGET_MS = 100
+
+# A line of `python -X importtime`: self and cumulative time in
+# microseconds, then the module name indented by its import depth
+IMPORT_TIME_LINE = re.compile(
+    r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$"
+)
+
+
+def parse_import_times(text):
+    """
+    Parses the output of `python -X importtime`.
+
+    Args:
+        text (str): The standard error of the interpreter.
+
+    Returns:
+        list: (module, depth, self seconds, cumulative seconds) tuples,
+        in the order the imports finished.
+    """
+    imports = []
+    for line in text.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            own, cumulative, indent, module = match.groups()
+            imports.append(
+                (
+                    module,
+                    len(indent) // 2,
+                    int(own) / 1e6,
+                    int(cumulative) / 1e6,
+                )
+            )
+    return imports
+
+
+def import_times(module="main"):
+    """
+    Imports a module in a fresh interpreter and returns the import time
+    of every module it loads, leaving out the modules the interpreter
+    loads at startup.
+
+    Args:
+        module (str): The module to import.
+
+    Returns:
+        list: The parsed imports, see parse_import_times; the module
+        itself comes last.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(MAIN_SCRIPT),
+    )
+    imports = parse_import_times(result.stderr)
+    # A module is reported after the modules it imports
+    end = next(
+        (i for i, item in enumerate(imports) if item[:2] == (module, 0)),
+        None,
+    )
+    if end is None:
+        return []
+    start = end
+    while start > 0 and imports[start - 1][1] > 0:
+        start -= 1
+    return imports[start:end + 1]
+
+
+def time_to_first_prompt(args=(), timeout=30):
+    """
+    Launches main.py and measures the time until it shows its first
+    prompt. The process is stopped at the prompt.
+
+    Args:
+        args (iterable): The command-line options of main.py.
+        timeout (float): The seconds to wait for the prompt.
+
+    Returns:
+        float: The seconds to the first prompt, or None if main.py ended
+        or timed out without showing it.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, MAIN_SCRIPT, *args],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    # Killing the process ends the read below if no prompt comes
+    timer = threading.Timer(timeout, process.kill)
+    timer.start()
+    output = b""
+    try:
+        while FIRST_PROMPT not in output:
+            chunk = os.read(process.stdout.fileno(), 4096)
+            if not chunk:
+                return None
+            output += chunk
+        return time.perf_counter() - start
+    finally:
+        timer.cancel()
+        process.kill()
+        process.wait()
+        process.stdin.close()
+        process.stdout.close()
+
+
+def report(args=(), runs=5, top=12):
+    """
+    Prints the import-time breakdown of main.py and its median time to
+    the first prompt against TIME_TO_FIRST_PROMPT_TARGET_MS.
+
+    Args:
+        args (iterable): The command-line options of main.py.
+        runs (int): The number of launches the median is taken over.
+        top (int): The number of slowest imports listed.
+
+    Returns:
+        bool: True if the target was met.
+    """
+    imports = import_times()
+    total = imports[-1][3] if imports else 0.0
+    direct = sorted(
+        (item for item in imports if item[1] == 1),
+        key=lambda item: item[3],
+        reverse=True,
+    )
+    print("Imports of main.py (cumulative ms, own ms):")
+    for module, _, own, cumulative in direct[:top]:
+        print(f"  {module:<24} {cumulative * 1000:>8.1f} {own * 1000:>8.1f}")
+    print(f"  {'total':<24} {total * 1000:>8.1f}")
+    slowest = sorted(imports, key=lambda item: item[2], reverse=True)
+    print("Slowest modules by own time (ms):")
+    for module, _, own, _ in slowest[:top]:
+        print(f"  {module:<24} {own * 1000:>8.1f}")
+
+    times = [time_to_first_prompt(args) for _ in range(runs)]
+    if None in times:
+        print("main.py ended without showing its first prompt.")
+        return False
+    median = statistics.median(times) * 1000
+    met = median <= TIME_TO_FIRST_PROMPT_TARGET_MS
+    print(
+        f"Time to first prompt: {median:.1f} ms (median of {runs}), "
+        f"target {TIME_TO_FIRST_PROMPT_TARGET_MS} ms: "
+        f"{'met' if met else 'missed'}"
+    )
+    return met
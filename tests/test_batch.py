@@ -0,0 +1,312 @@
+"""
+File: test_batch.py
+Author: Lyuboslav Gigov
+Purpose: This module contains unit tests for the batch recommendation
+mode. It checks the validation of query records, the JSONL and CSV
+readers, that answered follow-up questions never prompt the user, and
+that every query gets the books of the interactive grading.
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from io import StringIO
+from unittest.mock import patch
+from batch import main, parse_record, read_records, recommend_all
+from batch import parse_args as batch_parse_args
+from book import ScoringContext
+from book_criteria import BookCriteria
+from bookstore import Bookstore
+from questions import ask_questions
+from romance import MOOD_QUESTION
+
+try:
+    import numpy  # noqa: F401
+
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+RECORDS = [
+    {
+        "id": "love",
+        "age": 25,
+        "max_price": 20,
+        "gender": "woman",
+        "info": "a love story about passion",
+        "mood": "happy",
+    },
+    {
+        "id": "studies",
+        "age": 19,
+        "max_price": 40,
+        "gender": "man",
+        "info": "encyclopedia for my studies at the university",
+        "needs_encyclopedia": "yes",
+        "education_level": "graduate",
+    },
+    {
+        "id": "declined",
+        "age": 40,
+        "max_price": 40,
+        "gender": "other",
+        "info": "a love story and a dictionary",
+    },
+]
+
+
+def answer(prompt):
+    if "feeling" in prompt:
+        return "happy"
+    if "correct" in prompt:
+        return "yes"
+    return "graduate"
+
+
+def no_input(prompt):
+    raise AssertionError(f"Unexpected prompt: {prompt}")
+
+
+class TestParseRecord(unittest.TestCase):
+    def test_csv_strings_are_converted(self):
+        criteria, answers = parse_record(
+            {
+                "age": "19",
+                "max_price": "40.5",
+                "gender": " Man ",
+                "info": "space robots",
+                "needs_encyclopedia": "no",
+                "education_level": "graduate",
+            }
+        )
+        self.assertEqual(criteria.age, 19)
+        self.assertEqual(criteria.max_price, 40.5)
+        self.assertEqual(criteria.gender, "man")
+        self.assertEqual(criteria.info, ["space", "robots"])
+        self.assertFalse(answers["needs_encyclopedia"])
+        self.assertIsNone(answers["mood"])
+
+    def test_education_level_implies_encyclopedia(self):
+        _, answers = parse_record(
+            {
+                "age": 19,
+                "max_price": 40,
+                "gender": "man",
+                "education_level": "high school",
+            }
+        )
+        self.assertTrue(answers["needs_encyclopedia"])
+
+    def test_invalid_records(self):
+        valid = {"age": 19, "max_price": 40, "gender": "man", "info": ""}
+        for field, value in [
+            ("age", 0),
+            ("max_price", -1),
+            ("gender", "robot"),
+            ("mood", "grumpy"),
+            ("education_level", "kindergarten"),
+        ]:
+            with self.subTest(field=field), patch("sys.stdout", StringIO()):
+                with self.assertRaises(ValueError):
+                    parse_record({**valid, field: value})
+        with self.assertRaises(ValueError):
+            parse_record({"age": 19, "gender": "man"})
+
+    def test_malformed_records(self):
+        valid = {"age": 19, "max_price": 40, "gender": "man", "info": ""}
+        for field, value in [
+            ("age", None),
+            ("age", 1e400),
+            ("age", float("nan")),
+            ("age", "Infinity"),
+            ("max_price", [40]),
+            ("max_price", float("nan")),
+            ("max_price", float("inf")),
+            ("max_price", "NaN"),
+            ("info", 7),
+            ("info", [1, 2]),
+            ("education_level", 5),
+        ]:
+            with self.subTest(field=field, value=value):
+                with self.assertRaises(ValueError):
+                    parse_record({**valid, field: value})
+        for record in (
+            '{"age": 19',
+            "[19, 40]",
+            "null",
+            ["age", 19],
+            '{"age": 1e400, "max_price": 40, "gender": "man"}',
+            '{"age": 19, "max_price": NaN, "gender": "man"}',
+        ):
+            with self.subTest(record=record):
+                with self.assertRaises(ValueError):
+                    parse_record(record)
+
+
+class TestParseArgs(unittest.TestCase):
+    def test_top_must_be_positive(self):
+        import main as interactive
+        import service
+
+        for parse_args, arguments in (
+            (batch_parse_args, ["queries.jsonl"]),
+            (interactive.parse_args, []),
+            (service.parse_args, []),
+        ):
+            for top in ("0", "-2", "five"):
+                with self.subTest(parse_args=parse_args.__module__, top=top):
+                    with patch("sys.stderr", StringIO()):
+                        with self.assertRaises(SystemExit):
+                            parse_args(arguments + ["--top", top])
+            self.assertEqual(parse_args(arguments + ["--top", "3"]).top, 3)
+
+
+class TestReadRecords(unittest.TestCase):
+    def write(self, suffix, text):
+        handle, name = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(handle, "w") as outfile:
+            outfile.write(text)
+        self.addCleanup(os.remove, name)
+        return name
+
+    def test_jsonl_and_csv_give_the_same_criteria(self):
+        jsonl = self.write(
+            ".jsonl",
+            '{"age": 25, "max_price": 20, "gender": "woman", '
+            '"info": "love story"}\n\n',
+        )
+        csv_file = self.write(
+            ".csv", "age,max_price,gender,info\n25,20,woman,love story\n"
+        )
+        from_jsonl = [parse_record(r)[0] for r in read_records(jsonl)]
+        from_csv = [parse_record(r)[0] for r in read_records(csv_file)]
+        self.assertEqual(len(from_jsonl), 1)
+        self.assertEqual(vars(from_jsonl[0]), vars(from_csv[0]))
+
+
+class TestRecommendAll(unittest.TestCase):
+    def recommend(self, records, vectorized=False):
+        output = StringIO()
+        with patch("builtins.input", side_effect=no_input), patch(
+            "sys.stdout", StringIO()
+        ):
+            counts = recommend_all(records, output, 5, vectorized)
+        lines = [json.loads(line) for line in output.getvalue().splitlines()]
+        return counts, lines
+
+    def expected(self, record, prompt_answers, declines_mood=False):
+        criteria = BookCriteria(
+            record["age"],
+            record["max_price"],
+            record["gender"],
+            record["info"].split(),
+        )
+        context = ScoringContext(criteria)
+        bookstore = Bookstore()
+        questions = bookstore.follow_up_questions(context)
+        # The interactive session always asks for a mood; a record
+        # without one grades like a session that never asked it
+        if declines_mood:
+            questions.remove(MOOD_QUESTION)
+        with patch("builtins.input", side_effect=prompt_answers), patch(
+            "sys.stdout", StringIO()
+        ):
+            ask_questions(questions, context)
+        books = Bookstore.top_books(bookstore.grade_books(criteria, context))
+        return [(book.isbn, book.grade) for book in books]
+
+    def test_matches_interactive_grading(self):
+        counts, lines = self.recommend(RECORDS)
+        self.assertEqual(counts, (3, 0))
+        self.assertEqual([line["id"] for line in lines], [
+            "love", "studies", "declined"
+        ])
+        for record, line in zip(RECORDS, lines):
+            declined = record["id"] == "declined"
+            with self.subTest(query=record["id"]):
+                self.assertEqual(
+                    [(b["isbn"], b["grade"]) for b in line["books"]],
+                    self.expected(
+                        record, ["no"] if declined else answer, declined
+                    ),
+                )
+
+    @unittest.skipUnless(HAS_NUMPY, "NumPy is not installed")
+    def test_vectorized_gives_the_same_books(self):
+        _, lines = self.recommend(RECORDS)
+        _, vectorized = self.recommend(RECORDS, vectorized=True)
+        for line, vector_line in zip(lines, vectorized):
+            self.assertEqual(
+                [b["isbn"] for b in line["books"]],
+                [b["isbn"] for b in vector_line["books"]],
+            )
+
+    def test_phrase_matching(self):
+        record = {
+            **RECORDS[2],
+            "info": "a story about time travel and artificial intelligence",
+        }
+        output = StringIO()
+        with patch("sys.stdout", StringIO()):
+            recommend_all([record], output, 5, phrase_matching=True)
+        (line,) = [json.loads(line) for line in output.getvalue().splitlines()]
+        criteria, _ = parse_record(record)
+        ranked = Bookstore().rank_books(
+            criteria, ScoringContext(criteria, phrase_matching=True)
+        )
+        self.assertEqual(
+            [(b["isbn"], b["grade"]) for b in line["books"]],
+            [(book.isbn, grade) for book, grade in ranked],
+        )
+        self.assertTrue(batch_parse_args(["q.jsonl", "--phrases"]).phrases)
+
+    def test_invalid_record_is_reported_and_skipped(self):
+        counts, lines = self.recommend(
+            [{"id": 7, "age": 25, "gender": "woman"}, RECORDS[0]]
+        )
+        self.assertEqual(counts, (1, 1))
+        self.assertEqual(lines[0]["id"], 7)
+        self.assertIn("error", lines[0])
+        self.assertEqual(len(lines[1]["books"]), 5)
+
+    def test_malformed_lines_are_reported_and_skipped(self):
+        records = [
+            "not json\n",
+            '["an", "array"]\n',
+            json.dumps({**RECORDS[0], "id": "null age", "age": None}),
+            json.dumps({**RECORDS[0], "education_level": 5}),
+            '{"id": "huge age", "age": 1e400, "max_price": 40, '
+            '"gender": "man"}\n',
+            json.dumps(RECORDS[0]),
+        ]
+        counts, lines = self.recommend(records)
+        self.assertEqual(counts, (1, 5))
+        self.assertEqual(
+            [line["id"] for line in lines],
+            [1, 2, "null age", "love", "huge age", "love"],
+        )
+        for line in lines[:5]:
+            self.assertEqual(set(line), {"id", "error"})
+        self.assertEqual(len(lines[5]["books"]), 5)
+
+    def test_main_writes_output_file(self):
+        handle, queries = tempfile.mkstemp(suffix=".jsonl")
+        with os.fdopen(handle, "w") as outfile:
+            outfile.write("\n".join(json.dumps(r) for r in RECORDS))
+        self.addCleanup(os.remove, queries)
+        output = queries + ".out"
+        self.addCleanup(os.remove, output)
+        stderr = StringIO()
+        with patch("builtins.input", side_effect=no_input), patch(
+            "sys.stderr", stderr
+        ):
+            main([queries, "--output", output, "--top", "2"])
+        with open(output) as infile:
+            lines = [json.loads(line) for line in infile]
+        self.assertEqual([len(line["books"]) for line in lines], [2, 2, 2])
+        self.assertIn("3 queries answered, 0 rejected", stderr.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,7 +6,7 @@ and its subclasses Fiction and NonFiction.
 It tests basic initialization, getter and setter methods,
 boundary conditions for price and year,
 grade calculations based on criteria, comparison operations,
-and string representation.
+and string representation, and that every book class is slotted.
 The tests ensure that the Book class functions correctly
 across a range of typical and edge case scenarios.
 """
@@ -16,6 +16,11 @@ from io import StringIO
 from unittest.mock import patch
 from book import Book, Fiction, NonFiction
 from book_criteria import BookCriteria
+from biography import Biography
+from bookstore import Bookstore
+from encyclopedia import Encyclopedia
+from romance import Romance
+from science_fiction import ScienceFiction
 
 
 class TestBook(unittest.TestCase):
@@ -132,6 +137,28 @@ class TestBook(unittest.TestCase):
         self.assertTrue(isinstance(nonfiction_book, NonFiction))
         self.assertTrue(isinstance(nonfiction_book, Book))
 
+    def test_books_are_slotted(self):
+        books = [
+            self.book,
+            ScienceFiction("Dune", "Frank Herbert", 9, 1965, "DUNE-1965",
+                           92, 60),
+            Romance("Outlander", "Diana Gabaldon", 9, 1991, "OUTL-1991",
+                    70, 83),
+            Biography("Open", "Andre Agassi", 15, 2009, "OPEN-2009"),
+            Encyclopedia("World", "DK", 25, 2019, "WRLD-2019"),
+        ]
+        for book in books:
+            with self.subTest(genre=type(book).__name__):
+                self.assertFalse(hasattr(book, "__dict__"))
+                with self.assertRaises(AttributeError):
+                    book.subtitle = "Not an attribute of a book"
+
+    def test_authors_are_interned(self):
+        books = Bookstore.load_books()
+        authors = [book.author for book in books if book.author == "DK"]
+        self.assertGreater(len(authors), 1)
+        self.assertTrue(all(author is authors[0] for author in authors))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,421 @@
+"""
+File: test_bookstore.py
+Author: Lyuboslav Gigov
+Purpose: This module contains unit tests for the Bookstore class.
+It verifies that the streaming parser yields the same books as
+load_books, that malformed lines are rejected, that the price index
+only grades the books within budget, and that the bounded top-k
+selection, the streaming recommendation and rank_books return the same
+books, in the same order, as grading and sorting the whole collection,
+with rank_books serving concurrent sessions without touching the books.
+It also checks that books added, updated and removed one by one or
+through a delta file leave the bookstore as if it had been rebuilt, that
+books are found by ISBN, and that duplicate ISBNs are reported together.
+"""
+
+import os
+import random
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from unittest.mock import patch
+from book import Book, ScoringContext
+from book_criteria import BookCriteria
+from bookstore import Bookstore
+from biography import Biography
+from encyclopedia import Encyclopedia
+from questions import ask_questions, needed_questions
+from romance import Romance
+from science_fiction import ScienceFiction
+
+
+def answer(prompt):
+    return "happy" if "feeling" in prompt else "no"
+
+
+class TestBookstore(unittest.TestCase):
+    def setUp(self):
+        self.criteria = BookCriteria(
+            age=25,
+            max_price=20,
+            gender="woman",
+            info="I love history and a good romance story".split(),
+        )
+        self.context = ScoringContext(self.criteria)
+        with patch("builtins.input", side_effect=answer), patch(
+            "sys.stdout", new_callable=StringIO
+        ):
+            ask_questions(
+                needed_questions(Bookstore.load_books(), self.context),
+                self.context,
+            )
+
+    def test_iter_books_equals_load_books(self):
+        loaded = Bookstore.load_books()
+        streamed = list(Bookstore.iter_books())
+        self.assertEqual(
+            [(b.isbn, b.get_genre()) for b in streamed],
+            [(b.isbn, b.get_genre()) for b in loaded],
+        )
+        self.assertEqual(len(loaded), 14)
+
+    def test_parse_book_rejects_bad_lines(self):
+        with self.assertRaises(ValueError):
+            Bookstore.parse_book("Dune; Frank Herbert; Romance; 9; 1965")
+        with self.assertRaises(ValueError):
+            Bookstore.parse_book("Dune; Frank Herbert; Poetry; 9; 1965; AB")
+
+    def test_blank_lines_are_skipped(self):
+        handle, file_name = tempfile.mkstemp(suffix=".txt")
+        with os.fdopen(handle, "w") as outfile:
+            outfile.write(
+                "\nOpen: An Autobiography; Andre Agassi; Biography;"
+                " 15; 2009; OPEN-2009\n\n"
+            )
+        try:
+            books = list(Bookstore.iter_books(file_name))
+        finally:
+            os.remove(file_name)
+        self.assertEqual([book.isbn for book in books], ["OPEN-2009"])
+
+    def grade_all(self):
+        books = Bookstore.load_books()
+        for book in books:
+            book.calculate_grade(self.criteria, self.context)
+        books.sort(reverse=True)
+        return books
+
+    def test_top_books_equals_full_sort(self):
+        rng = random.Random(5)
+        books = Bookstore.load_books() * 20
+        for k in (0, 1, 5, 50, 1000):
+            for book in books:
+                book.grade = rng.choice([0, 10, 37.5, 50, 100])
+            expected = sorted(books, reverse=True)[:k]
+            with self.subTest(k=k), patch.object(
+                Book, "__lt__", side_effect=AssertionError
+            ):
+                self.assertEqual(Bookstore.top_books(books, k), expected)
+                self.assertEqual(
+                    Bookstore.top_books(iter(books), k), expected
+                )
+
+    def test_books_within_budget(self):
+        bookstore = Bookstore()
+        for max_price in (0, 8.99, 12.5, 20, 1000):
+            with self.subTest(max_price=max_price):
+                self.assertEqual(
+                    bookstore.books_within_budget(max_price),
+                    [b for b in bookstore.books if b.price <= max_price],
+                )
+
+    def test_grade_books_skips_books_over_budget(self):
+        graded = []
+
+        def counting(genre):
+            original = genre.calculate_grade
+
+            def calculate_grade(book, *args):
+                graded.append(book)
+                return original(book, *args)
+
+            return patch.object(genre, "calculate_grade", calculate_grade)
+
+        bookstore = Bookstore()
+        with counting(ScienceFiction), counting(Romance), counting(
+            Biography
+        ), counting(Encyclopedia):
+            books = bookstore.grade_books(self.criteria, self.context)
+        self.assertEqual(
+            graded, [b for b in books if b.price <= self.criteria.max_price]
+        )
+        expected = self.grade_all()
+        self.assertEqual(
+            [(b.isbn, b.grade) for b in sorted(books, reverse=True)],
+            [(b.isbn, b.grade) for b in expected],
+        )
+
+    def test_stream_top_books_equals_full_sort(self):
+        for k in (1, 5, 14, 20):
+            with self.subTest(k=k):
+                expected = self.grade_all()[:k]
+                streamed = Bookstore.stream_top_books(
+                    self.criteria, k, self.context
+                )
+                self.assertEqual(
+                    [(b.isbn, b.grade) for b in streamed],
+                    [(b.isbn, b.grade) for b in expected],
+                )
+
+    def test_follow_up_questions(self):
+        bookstore = Bookstore()
+        context = ScoringContext(self.criteria)
+        self.assertEqual(
+            bookstore.follow_up_questions(context),
+            needed_questions(bookstore.books, context),
+        )
+
+    def test_stream_asks_questions_in_one_pass(self):
+        def ask(questions, context):
+            asked.extend(questions)
+            with patch("builtins.input", side_effect=answer), patch(
+                "sys.stdout", new_callable=StringIO
+            ):
+                ask_questions(questions, context)
+
+        for info in (
+            self.criteria.info,
+            "a love story and an encyclopedia for my studies".split(),
+        ):
+            criteria = BookCriteria(30, 40, "woman", info)
+            expected_context = ScoringContext(criteria)
+            expected = needed_questions(
+                Bookstore.load_books(), expected_context
+            )
+            with patch("builtins.input", side_effect=answer), patch(
+                "sys.stdout", new_callable=StringIO
+            ):
+                ask_questions(expected, expected_context)
+            graded = Bookstore.load_books()
+            for book in graded:
+                book.calculate_grade(criteria, expected_context)
+            graded.sort(reverse=True)
+
+            asked = []
+            with self.subTest(info=info), patch.object(
+                Bookstore, "iter_books", wraps=Bookstore.iter_books
+            ) as iter_books:
+                streamed = Bookstore.stream_top_books(
+                    criteria, 14, ScoringContext(criteria), ask=ask
+                )
+                self.assertEqual(iter_books.call_count, 1)
+                self.assertTrue(asked)
+                self.assertEqual(asked, expected)
+                self.assertEqual(
+                    [(b.isbn, b.grade) for b in streamed],
+                    [(b.isbn, b.grade) for b in graded],
+                )
+
+    def test_rank_books_equals_graded_top_books(self):
+        bookstore = Bookstore()
+        for book in bookstore.books:
+            book.grade = 0
+        for k in (1, 5, 20):
+            with self.subTest(k=k):
+                ranked = bookstore.rank_books(self.criteria, self.context, k)
+                self.assertEqual(
+                    {book.grade for book in bookstore.books}, {0}
+                )
+                self.assertEqual(
+                    [(b.isbn, grade) for b, grade in ranked],
+                    [(b.isbn, b.grade) for b in self.grade_all()[:k]],
+                )
+
+    def test_rank_books_for_concurrent_sessions(self):
+        bookstore = Bookstore()
+        contexts = []
+        for mood in ("happy", "sad", "adventurous", "need a laugh") * 4:
+            context = ScoringContext(self.criteria)
+            context.mood = mood
+            contexts.append(context)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(
+                executor.map(
+                    lambda c: bookstore.rank_books(self.criteria, c, 3),
+                    contexts,
+                )
+            )
+        for context, ranked in zip(contexts, results):
+            self.assertEqual(
+                ranked, bookstore.rank_books(self.criteria, context, 3)
+            )
+        self.assertEqual(len({ranked[0][0].title for ranked in results}), 4)
+
+
+class TestInventoryChanges(unittest.TestCase):
+    def setUp(self):
+        self.criteria = BookCriteria(25, 14, "woman", ["love", "space"])
+
+    def write_delta(self, text):
+        handle, file_name = tempfile.mkstemp(suffix=".txt")
+        with os.fdopen(handle, "w") as outfile:
+            outfile.write(text)
+        self.addCleanup(os.remove, file_name)
+        return file_name
+
+    def assert_rebuilt(self, bookstore):
+        rebuilt = Bookstore(bookstore.books)
+        for max_price in (0, 8.99, 12.99, 14, 20, 1000):
+            with self.subTest(max_price=max_price):
+                self.assertEqual(
+                    bookstore.books_within_budget(max_price),
+                    rebuilt.books_within_budget(max_price),
+                )
+                self.assertEqual(
+                    bookstore.count_within_budget(max_price),
+                    rebuilt.count_within_budget(max_price),
+                )
+        context = ScoringContext(self.criteria)
+        self.assertEqual(
+            bookstore.rank_books(self.criteria, context, 14),
+            rebuilt.rank_books(self.criteria, context, 14),
+        )
+
+    def test_random_changes_equal_a_rebuild(self):
+        rng = random.Random(18)
+        bookstore = Bookstore()
+        spare = [
+            Biography(f"Biography {n}", "Author", n % 20 + 5, 2000,
+                      f"ZZZZ-{n:04d}")
+            for n in range(40)
+        ]
+        for _ in range(60):
+            action = rng.choice(["add", "update", "remove"])
+            if action == "add" and spare:
+                bookstore.add_book(spare.pop())
+            elif action == "update" and bookstore.books:
+                book = rng.choice(bookstore.books)
+                bookstore.update_book(
+                    Biography(book.title, book.author,
+                              rng.choice([8.99, 12.99, 30]), book.year,
+                              book.isbn)
+                )
+            elif bookstore.books:
+                bookstore.remove_book(rng.choice(bookstore.books).isbn)
+        self.assertGreater(bookstore.version, 0)
+        self.assert_rebuilt(bookstore)
+
+    def test_update_keeps_the_inventory_order(self):
+        bookstore = Bookstore()
+        isbns = [book.isbn for book in bookstore.books]
+        bookstore.update_book(
+            Romance("Outlander", "Diana Gabaldon", 4.99, 1991, "OOOO-4444",
+                    70, 83)
+        )
+        self.assertEqual([book.isbn for book in bookstore.books], isbns)
+        self.assertEqual(bookstore.books[3].price, 4.99)
+        self.assert_rebuilt(bookstore)
+
+    def test_invalid_changes_are_rejected(self):
+        bookstore = Bookstore()
+        with self.assertRaises(ValueError):
+            bookstore.add_book(bookstore.books[0])
+        with self.assertRaises(ValueError):
+            bookstore.remove_book("NONE-0000")
+        with self.assertRaises(ValueError):
+            bookstore.update_book(
+                Biography("Unknown", "Nobody", 10, 2000, "NONE-0000")
+            )
+        self.assertEqual(bookstore.version, 0)
+
+    def test_apply_delta(self):
+        bookstore = Bookstore()
+        file_name = self.write_delta(
+            "add; Becoming; Michelle Obama; Biography; 13.5; 2018;"
+            " BECO-2018\n\n"
+            "update; Dune; Frank Herbert; Science Fiction; 9.99; 1965;"
+            " BBBC-2424; 92; 60\n"
+            "REMOVE; KKKO-1313\n"
+        )
+        self.assertEqual(bookstore.apply_delta(file_name), 3)
+        isbns = [book.isbn for book in bookstore.books]
+        self.assertEqual(isbns[-1], "BECO-2018")
+        self.assertNotIn("KKKO-1313", isbns)
+        self.assertEqual(bookstore.books[1].price, 9.99)
+        self.assertEqual(bookstore.version, 3)
+        self.assert_rebuilt(bookstore)
+
+    def test_malformed_delta_changes_nothing(self):
+        bookstore = Bookstore()
+        file_name = self.write_delta(
+            "remove; KKKO-1313\nrename; KKKO-1313; Rafa\n"
+        )
+        with self.assertRaises(ValueError):
+            bookstore.apply_delta(file_name)
+        self.assertEqual(len(bookstore.books), 14)
+        with self.assertRaises(ValueError):
+            Bookstore.parse_change("remove; KKKO-1313; JJJK-0202")
+
+    def test_impossible_delta_changes_nothing(self):
+        add = "add; Becoming; Michelle Obama; Biography; 13.5; 2018; BECO-2018"
+        for text in (
+            f"{add}\nremove; KKKO-1313\nremove; NONE-0000\n",
+            f"{add}\nremove; KKKO-1313\n{add}\n",
+            "remove; KKKO-1313\nremove; KKKO-1313\n",
+            "remove; KKKO-1313\nupdate; Rafa: My Story; Rafael Nadal;"
+            " Biography; 12.99; 2011; KKKO-1313\n",
+        ):
+            with self.subTest(text=text):
+                bookstore = Bookstore()
+                isbns = [book.isbn for book in bookstore.books]
+                with self.assertRaises(ValueError):
+                    bookstore.apply_delta(self.write_delta(text))
+                self.assertEqual(
+                    [book.isbn for book in bookstore.books], isbns
+                )
+                self.assertEqual(bookstore.version, 0)
+        # A removed ISBN can be added again by a later change
+        bookstore = Bookstore()
+        file_name = self.write_delta(
+            "remove; KKKO-1313\nadd; Rafa: My Story; Rafael Nadal;"
+            " Biography; 12.99; 2011; KKKO-1313\n"
+        )
+        self.assertEqual(bookstore.apply_delta(file_name), 2)
+        self.assertEqual(bookstore.books[-1].isbn, "KKKO-1313")
+        self.assert_rebuilt(bookstore)
+
+
+class TestIsbnIndex(unittest.TestCase):
+    def test_get_by_isbn_and_contains(self):
+        bookstore = Bookstore()
+        for book in bookstore.books:
+            with self.subTest(isbn=book.isbn):
+                self.assertIs(bookstore.get_by_isbn(book.isbn), book)
+                self.assertTrue(bookstore.contains(book.isbn))
+        self.assertIsNone(bookstore.get_by_isbn("NONE-0000"))
+        self.assertFalse(bookstore.contains("NONE-0000"))
+
+    def test_index_follows_changes(self):
+        bookstore = Bookstore()
+        book = Biography("Becoming", "Michelle Obama", 13.5, 2018,
+                         "BECO-2018")
+        bookstore.add_book(book)
+        self.assertIs(bookstore.get_by_isbn("BECO-2018"), book)
+        cheaper = Biography("Becoming", "Michelle Obama", 9, 2018,
+                            "BECO-2018")
+        bookstore.update_book(cheaper)
+        self.assertIs(bookstore.get_by_isbn("BECO-2018"), cheaper)
+        bookstore.remove_book("BECO-2018")
+        self.assertFalse(bookstore.contains("BECO-2018"))
+
+    def test_duplicates_are_reported_together(self):
+        books = Bookstore.load_books()
+        with self.assertRaises(ValueError) as raised:
+            Bookstore(books + books[:2] + books[:1])
+        message = str(raised.exception)
+        self.assertIn("AAAA-1234 (books 1, 15, 17)", message)
+        self.assertIn("BBBC-2424 (books 2, 16)", message)
+
+    def test_load_books_rejects_duplicates(self):
+        handle, file_name = tempfile.mkstemp(suffix=".txt")
+        with os.fdopen(handle, "w") as outfile:
+            outfile.write(
+                "Rafa: My Story; Rafael Nadal; Biography; 12.99; 2011;"
+                " KKKO-1313\n"
+                "Open: An Autobiography; Andre Agassi; Biography; 15.99;"
+                " 2009; KKKO-1313\n"
+            )
+        self.addCleanup(os.remove, file_name)
+        with patch("sys.stdout", new_callable=StringIO) as output:
+            with self.assertRaises(SystemExit):
+                Bookstore.load_books(file_name)
+            with self.assertRaises(SystemExit):
+                Bookstore.load_catalog(file_name)
+        self.assertEqual(
+            output.getvalue().count("KKKO-1313 (books 1, 2)"), 2
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
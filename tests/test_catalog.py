@@ -0,0 +1,90 @@
+"""
+File: test_catalog.py
+Author: Lyuboslav Gigov
+Purpose: This module contains unit tests for the columnar Catalog.
+It verifies that books survive the trip through the typed columns,
+that repeated authors are pooled, that the price and year scans select
+the right rows, and that grading through the catalog stores the same
+grades as grading the book objects directly.
+"""
+
+import unittest
+from book import ScoringContext
+from book_criteria import BookCriteria
+from bookstore import Bookstore
+from catalog import StringPool
+
+
+def slot_values(book):
+    return {
+        name: getattr(book, name, None)
+        for cls in type(book).__mro__
+        for name in getattr(cls, "__slots__", ())
+    }
+
+
+def describe(book):
+    return (book.get_genre(), book.title, book.author, book.price,
+            book.year, book.isbn, str(book))
+
+
+class TestCatalog(unittest.TestCase):
+    def setUp(self):
+        self.books = Bookstore.load_books()
+        for book in self.books:
+            book.grade = 0
+        self.catalog = Bookstore.load_catalog()
+
+    def test_books_round_trip(self):
+        self.assertEqual(len(self.catalog), len(self.books))
+        self.assertEqual(
+            [describe(book) for book in self.catalog],
+            [describe(book) for book in self.books],
+        )
+        self.assertEqual(
+            slot_values(self.catalog.book(3)), slot_values(self.books[3])
+        )
+
+    def test_string_pool_interns(self):
+        pool = StringPool()
+        self.assertEqual(pool.add("DK"), 0)
+        self.assertEqual(pool.add("Tim"), 1)
+        self.assertEqual(pool.add("DK"), 0)
+        self.assertEqual(len(pool), 2)
+        authors = {book.author for book in self.books}
+        self.assertEqual(len(self.catalog.author_pool), len(authors))
+
+    def test_scans(self):
+        self.assertEqual(
+            self.catalog.indexes_within_budget(12),
+            [i for i, book in enumerate(self.books) if book.price <= 12],
+        )
+        self.assertEqual(
+            self.catalog.indexes_published_between(1990, 2010),
+            [
+                i for i, book in enumerate(self.books)
+                if 1990 <= book.year <= 2010
+            ],
+        )
+
+    def test_grade_books_equals_object_grading(self):
+        criteria = BookCriteria(
+            age=16, max_price=30, gender="other",
+            info="dune robots and football".split(),
+        )
+        context = ScoringContext(criteria)
+        context.mood = "adventurous"
+        for book in self.books:
+            book.calculate_grade(criteria, context)
+        self.catalog.grade_books(criteria, context)
+        self.assertEqual(
+            list(self.catalog.grades), [book.grade for book in self.books]
+        )
+        self.assertEqual(
+            [book.grade for book in self.catalog],
+            [book.grade for book in self.books],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,187 @@
+"""
+File: test_export.py
+Author: Lyuboslav Gigov
+Purpose: This module contains unit tests for the output layer. It
+verifies that rankings are written as JSON lines, CSV and the grid
+table, that cursors round-trip and invalid ones are rejected, and that
+paging through a ranking returns every book exactly once in the order
+of rank_books, also while other books are removed between pages.
+"""
+
+import csv
+import itertools
+import json
+import unittest
+from io import StringIO
+from book import ScoringContext
+from book_criteria import BookCriteria
+from bookstore import Bookstore
+from export import (
+    FIELDS,
+    decode_cursor,
+    encode_cursor,
+    render_grid,
+    select_page,
+    write_csv,
+    write_jsonl,
+    write_ranking,
+)
+
+try:
+    import numpy  # noqa: F401
+
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+CRITERIA = BookCriteria(25, 40, "man", "robots in space and tennis".split())
+
+
+def all_pages(rank_page, limit):
+    """Follows the cursors of a ranking and returns every page."""
+    pages, cursor = [], None
+    while True:
+        ranked, cursor, start = rank_page(cursor, limit)
+        pages.append((ranked, start))
+        if cursor is None:
+            return pages
+
+
+class TestRenderers(unittest.TestCase):
+    def setUp(self):
+        self.ranked = Bookstore().rank_books(CRITERIA, k=3)
+
+    def test_jsonl(self):
+        outfile = StringIO()
+        self.assertEqual(write_jsonl(iter(self.ranked), outfile, 4), 3)
+        rows = [json.loads(line) for line in outfile.getvalue().splitlines()]
+        self.assertEqual([row["rank"] for row in rows], [4, 5, 6])
+        self.assertEqual(list(rows[0]), list(FIELDS))
+        book, grade = self.ranked[0]
+        self.assertEqual(
+            (rows[0]["isbn"], rows[0]["genre"], rows[0]["grade"]),
+            (book.isbn, book.get_genre(), grade),
+        )
+
+    def test_csv(self):
+        outfile = StringIO()
+        self.assertEqual(write_csv(iter(self.ranked), outfile), 3)
+        rows = list(csv.DictReader(StringIO(outfile.getvalue())))
+        self.assertEqual(
+            [row["isbn"] for row in rows],
+            [book.isbn for book, _ in self.ranked],
+        )
+        self.assertEqual(rows[2]["rank"], "3")
+
+    def test_grid(self):
+        table = render_grid(self.ranked)
+        book, grade = self.ranked[0]
+        self.assertIn("|   No. | Title", table)
+        self.assertIn(f"${book.price:.2f}", table)
+        self.assertIn(f"{grade}/100", table)
+        outfile = StringIO()
+        write_ranking(self.ranked, outfile, "grid")
+        self.assertEqual(outfile.getvalue(), table + "\n")
+        with self.assertRaises(ValueError):
+            write_ranking(self.ranked, outfile, "xml")
+
+
+class TestCursors(unittest.TestCase):
+    def test_round_trip(self):
+        for grade, sequence in ((100, 0), (71.3, 12), (0.1 + 0.2, 7)):
+            cursor = encode_cursor(grade, sequence)
+            self.assertNotIn("=", cursor)
+            self.assertEqual(decode_cursor(cursor), (grade, sequence))
+
+    def test_invalid_cursors(self):
+        for cursor in ("", "bad", "e30", encode_cursor(1, "2"), "!!!!"):
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor)
+        with self.assertRaises(ValueError):
+            select_page([], "bad")
+        with self.assertRaises(ValueError):
+            select_page([], limit=0)
+
+
+class TestRankPage(unittest.TestCase):
+    def setUp(self):
+        self.bookstore = Bookstore()
+
+    def rank_page(self, criteria):
+        def rank_page(cursor, limit):
+            context = ScoringContext(criteria)
+            return self.bookstore.rank_page(criteria, context, cursor, limit)
+
+        return rank_page
+
+    def test_pages_follow_rank_books(self):
+        combinations = itertools.product(
+            [9, 18, 30], ["man", "woman"], [10, 40]
+        )
+        for age, gender, max_price in combinations:
+            criteria = BookCriteria(
+                age, max_price, gender, "love story about tennis".split()
+            )
+            expected = self.bookstore.rank_books(criteria, k=14)
+            for limit in (1, 3, 5, 14, 50):
+                with self.subTest(age=age, gender=gender, limit=limit):
+                    pages = all_pages(self.rank_page(criteria), limit)
+                    ranked = [pair for page, _ in pages for pair in page]
+                    self.assertEqual(ranked, expected)
+                    self.assertEqual(
+                        [start for _, start in pages],
+                        list(range(1, len(expected) + 1, limit)),
+                    )
+
+    def test_pages_survive_removed_books(self):
+        rank_page = self.rank_page(CRITERIA)
+        expected = [book.isbn for book, _ in rank_page(None, 14)[0]]
+        first, cursor, _ = rank_page(None, 4)
+        # One book already shown and one not shown yet are removed
+        self.bookstore.remove_book(first[1][0].isbn)
+        self.bookstore.remove_book(expected[9])
+        seen = [book.isbn for book, _ in first]
+        while cursor is not None:
+            ranked, cursor, _ = rank_page(cursor, 4)
+            seen += [book.isbn for book, _ in ranked]
+        self.assertEqual(
+            seen, [isbn for isbn in expected if isbn != expected[9]]
+        )
+
+    @unittest.skipUnless(HAS_NUMPY, "NumPy is not installed")
+    def test_catalog_pages_match(self):
+        from export import page_catalog
+
+        catalog = Bookstore.load_catalog()
+
+        def catalog_page(cursor, limit):
+            return page_catalog(
+                catalog, ScoringContext(CRITERIA), cursor, limit
+            )
+
+        for limit in (1, 4, 14):
+            with self.subTest(limit=limit):
+                pages = all_pages(catalog_page, limit)
+                expected = all_pages(self.rank_page(CRITERIA), limit)
+                self.assertEqual(
+                    [
+                        [(book.isbn, grade) for book, grade in page]
+                        for page, _ in pages
+                    ],
+                    [
+                        [(book.isbn, grade) for book, grade in page]
+                        for page, _ in expected
+                    ],
+                )
+        # A cursor of one engine pages the other
+        _, cursor, _ = self.rank_page(CRITERIA)(None, 5)
+        ranked, _, start = catalog_page(cursor, 5)
+        self.assertEqual(start, 6)
+        self.assertEqual(
+            [book.isbn for book, _ in ranked],
+            [book.isbn for book, _ in self.rank_page(CRITERIA)(cursor, 5)[0]],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
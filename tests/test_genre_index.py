@@ -0,0 +1,134 @@
+"""
+File: test_genre_index.py
+Author: Lyuboslav Gigov
+Purpose: This module contains unit tests for the genre index. It
+verifies that ranking through the index, which skips the genres that
+cannot reach the top k, returns exactly the books and grades of grading
+every book, for many criteria, answers and inventories, and after books
+are added, updated and removed.
+"""
+
+import heapq
+import itertools
+import random
+import unittest
+from operator import itemgetter
+from unittest.mock import patch
+from biography import Biography
+from book import ScoringContext
+from book_criteria import BookCriteria
+from bookstore import Bookstore
+from encyclopedia import Encyclopedia
+from genre_index import PROBE_ISBN
+from romance import Romance
+from science_fiction import ScienceFiction
+
+
+def exhaustive(books, criteria, context, k):
+    return heapq.nlargest(
+        k,
+        ((book, book.score(criteria, context)) for book in books),
+        key=itemgetter(1),
+    )
+
+
+def random_inventory(rng, book_count):
+    books = []
+    for number in range(book_count):
+        book = rng.choice(Bookstore.load_books())
+        price = rng.choice([5, 8.99, 9.99, 12.99, 15, 20, 30, 35])
+        isbn = f"RAND-{number:04d}"
+        if isinstance(book, (ScienceFiction, Romance)):
+            book = type(book)(
+                book.title, book.author, price, book.year, isbn,
+                rng.randint(0, 100), rng.randint(0, 100),
+            )
+        else:
+            book = type(book)(book.title, book.author, price, book.year, isbn)
+        books.append(book)
+    return books
+
+
+class TestGenreIndex(unittest.TestCase):
+    def assert_ranks_exhaustively(self, bookstore, criteria, context, k):
+        ranked = bookstore.rank_books(criteria, context, k)
+        expected = exhaustive(bookstore.books, criteria, context, k)
+        self.assertEqual(
+            [(b.isbn, g) for b, g in ranked],
+            [(b.isbn, g) for b, g in expected],
+        )
+
+    def test_rank_equals_exhaustive_grading(self):
+        rng = random.Random(19)
+        bookstores = [Bookstore(), Bookstore(random_inventory(rng, 300))]
+        combinations = itertools.product(
+            [7, 15, 25, 40],
+            ["man", "woman", "other"],
+            [4, 9.99, 14, 40],
+            [
+                ["space", "robots"],
+                ["i", "love", "tennis", "and", "history"],
+                ["encyclopedia", "for", "university"],
+                ["cooking"],
+            ],
+            [None, "happy", "sad"],
+            [(False, ""), (True, "graduate"), (True, "high school")],
+        )
+        for combination in combinations:
+            age, gender, max_price, info, mood, (needs, level) = combination
+            criteria = BookCriteria(age, max_price, gender, info)
+            context = ScoringContext(criteria)
+            context.mood = mood
+            context.needs_encyclopedia = needs
+            context.education_level = level
+            for bookstore, k in itertools.product(bookstores, (1, 5, 20)):
+                with self.subTest(combination=combination, k=k):
+                    self.assert_ranks_exhaustively(
+                        bookstore, criteria, context, k
+                    )
+
+    def test_genres_without_signal_are_skipped(self):
+        bookstore = Bookstore(random_inventory(random.Random(3), 300))
+        criteria = BookCriteria(25, 40, "man", ["robots", "aliens"])
+        context = ScoringContext(criteria)
+        graded = []
+
+        def counting(genre):
+            original = genre.score
+
+            def score(book, *args):
+                if book.isbn != PROBE_ISBN:
+                    graded.append(book)
+                return original(book, *args)
+
+            return patch.object(genre, "score", score)
+
+        with counting(ScienceFiction), counting(Romance), counting(
+            Biography
+        ), counting(Encyclopedia):
+            bookstore.rank_books(criteria, context, 5)
+        self.assertEqual({type(book) for book in graded}, {ScienceFiction})
+
+    def test_rank_after_inventory_changes(self):
+        rng = random.Random(7)
+        bookstore = Bookstore(random_inventory(rng, 100))
+        criteria = BookCriteria(25, 20, "woman", ["love", "story"])
+        context = ScoringContext(criteria)
+        context.mood = "happy"
+        mood_books = [
+            b for b in bookstore.books if b.title == "Me Before You"
+        ]
+        for book in mood_books[:-1]:
+            bookstore.remove_book(book.isbn)
+        for book in rng.sample(bookstore.books, 20):
+            bookstore.update_book(
+                Romance("Me Before You", "Jojo Moyes", rng.choice([9, 25]),
+                        2012, book.isbn, 100, 100)
+            )
+        for k in (1, 5, 30):
+            with self.subTest(k=k):
+                self.assert_ranks_exhaustively(bookstore, criteria, context, k)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+File: test_grading_engine.py
+Author: Lyuboslav Gigov
+Purpose: This module contains unit tests for the NumPy grading engine.
+It grades the inventory with grade_catalog and with calculate_grade
+book by book, for a grid of ages, genders, budgets, keywords and
+answers to the follow-up questions, and checks that the grades, the
+questions asked and the resulting ranking are identical.
+"""
+
+import itertools
+import unittest
+from io import StringIO
+from unittest.mock import patch
+from book import ScoringContext
+from book_criteria import BookCriteria
+from bookstore import Bookstore
+from questions import ask_questions, needed_questions
+
+try:
+    import numpy  # noqa: F401
+
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+KEYWORDS = [
+    "i want something to read",
+    "space robots and the future",
+    "a love story about passion",
+    "football tennis and sports biography",
+    "encyclopedia for my studies at the university",
+    "romance love science dictionary space memoir",
+]
+
+
+def make_input(mood, needs_encyclopedia, level, asked):
+    def answer(prompt):
+        asked.append(prompt)
+        if "feeling" in prompt:
+            return mood
+        if "correct" in prompt:
+            return "yes" if needs_encyclopedia else "no"
+        return level
+
+    return answer
+
+
+@unittest.skipUnless(HAS_NUMPY, "NumPy is not installed")
+class TestGradingEngine(unittest.TestCase):
+    def setUp(self):
+        import grading_engine
+
+        self.engine = grading_engine
+
+    def grade_objects(self, criteria, answers):
+        asked = []
+        books = Bookstore.load_books()
+        context = ScoringContext(criteria)
+        with patch("builtins.input", side_effect=make_input(*answers, asked)):
+            ask_questions(needed_questions(books, context), context)
+        for book in books:
+            book.calculate_grade(criteria, context)
+        return [book.grade for book in books], asked, books
+
+    def grade_vectorized(self, criteria, answers):
+        asked = []
+        catalog = Bookstore.load_catalog()
+        context = ScoringContext(criteria)
+        with patch("builtins.input", side_effect=make_input(*answers, asked)):
+            ask_questions(
+                self.engine.needed_questions(catalog, context), context
+            )
+        grades = self.engine.grade_catalog(catalog, criteria, context)
+        return list(grades), asked, catalog, grades
+
+    def test_grades_equal_object_path(self):
+        combinations = itertools.product(
+            [8, 15, 25, 60],
+            ["man", "woman", "other"],
+            [13, 100],
+            KEYWORDS,
+            [("sad", True, "graduate"), ("happy", False, "")],
+        )
+        for age, gender, max_price, info, answers in combinations:
+            criteria = BookCriteria(age, max_price, gender, info.split())
+            with self.subTest(criteria=str(criteria), answers=answers), patch(
+                "sys.stdout", new_callable=StringIO
+            ):
+                expected, expected_asked, books = self.grade_objects(
+                    criteria, answers
+                )
+                actual, asked, catalog, grades = self.grade_vectorized(
+                    criteria, answers
+                )
+                self.assertEqual(actual, expected)
+                self.assertEqual(asked, expected_asked)
+                self.assertEqual(list(catalog.grades), expected)
+
+                books.sort(reverse=True)
+                self.assertEqual(
+                    [
+                        catalog.isbns[row]
+                        for row in self.engine.top_rows(grades)
+                    ],
+                    [book.isbn for book in books[:5]],
+                )
+
+    def test_grading_without_storing_leaves_catalog_untouched(self):
+        catalog = Bookstore.load_catalog()
+        criteria = BookCriteria(25, 100, "woman", ["love", "story"])
+        context = ScoringContext(criteria)
+        context.mood = "happy"
+        grades = self.engine.grade_catalog(
+            catalog, criteria, context, store=False
+        )
+        self.assertEqual(set(catalog.grades), {0})
+        self.assertEqual(
+            list(grades),
+            list(self.engine.grade_catalog(catalog, criteria, context)),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,211 @@
+"""
+File: test_instrumentation.py
+Author: Lyuboslav Gigov
+Purpose: This module contains unit tests for the opt-in instrumentation.
+It verifies that nothing is recorded while it is disabled, that loading
+and ranking the inventory record their stages and counters once it is
+enabled, that the vectorized engine and the worker processes count the
+same graded books, and that the measurements export as JSON and
+Prometheus text.
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from io import StringIO
+from unittest.mock import patch
+from book import ScoringContext
+from book_criteria import BookCriteria
+from bookstore import Bookstore
+from instrumentation import NO_SPAN, Instrumentation, metrics
+from lexicon import registry
+
+try:
+    import numpy  # noqa: F401
+
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+CRITERIA = BookCriteria(25, 40, "man", "robots in space and tennis".split())
+
+
+def counters(instrumentation):
+    return {
+        (counter["name"], tuple(counter["labels"].values())): counter["value"]
+        for counter in instrumentation.to_dict()["counters"]
+    }
+
+
+def stages(instrumentation):
+    return {span["name"] for span in instrumentation.to_dict()["spans"]}
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_disabled_records_nothing(self):
+        instrumentation = Instrumentation()
+        self.assertIs(instrumentation.span("grade"), NO_SPAN)
+        with instrumentation.span("grade"):
+            instrumentation.increment("books_graded", genre="Romance")
+        self.assertEqual(
+            instrumentation.to_dict(), {"spans": [], "counters": []}
+        )
+        self.assertEqual(instrumentation.to_prometheus(), "")
+
+    def test_spans_and_counters_add_up(self):
+        instrumentation = Instrumentation(enabled=True)
+        for _ in range(3):
+            with instrumentation.span("grade", genre="Romance"):
+                instrumentation.increment("books_graded", genre="Romance")
+        instrumentation.increment("books_parsed", 14)
+        (span,) = instrumentation.to_dict()["spans"]
+        self.assertEqual(span["name"], "grade")
+        self.assertEqual(span["labels"], {"genre": "Romance"})
+        self.assertEqual(span["count"], 3)
+        self.assertGreaterEqual(span["total_s"], span["max_s"])
+        self.assertEqual(
+            counters(instrumentation),
+            {("books_graded", ("Romance",)): 3, ("books_parsed", ()): 14},
+        )
+
+    def test_prometheus_text(self):
+        instrumentation = Instrumentation(enabled=True)
+        with instrumentation.span("read_keywords", file='a "b".txt'):
+            pass
+        instrumentation.increment("fuzz_ratio_calls", 7)
+        lines = instrumentation.to_prometheus().splitlines()
+        self.assertIn("# TYPE bookstore_stage_seconds_total counter", lines)
+        self.assertIn(
+            'bookstore_stage_runs_total{stage="read_keywords",'
+            'file="a \\"b\\".txt"} 1',
+            lines,
+        )
+        self.assertIn("# TYPE bookstore_fuzz_ratio_calls_total counter", lines)
+        self.assertIn("bookstore_fuzz_ratio_calls_total 7", lines)
+
+    def test_write_picks_the_format(self):
+        instrumentation = Instrumentation(enabled=True)
+        instrumentation.increment("books_parsed", 2)
+        with tempfile.TemporaryDirectory() as directory:
+            json_name = os.path.join(directory, "metrics.json")
+            prom_name = os.path.join(directory, "metrics.prom")
+            instrumentation.write(json_name)
+            instrumentation.write(prom_name)
+            with open(json_name) as infile:
+                self.assertEqual(json.load(infile)["counters"][0]["value"], 2)
+            with open(prom_name) as infile:
+                self.assertIn(
+                    "bookstore_books_parsed_total 2", infile.read()
+                )
+
+    def test_snapshot_and_merge(self):
+        worker = Instrumentation(enabled=True)
+        with worker.span("grade", genre="Romance"):
+            worker.increment("books_graded", 3, genre="Romance")
+        parent = Instrumentation(enabled=True)
+        parent.increment("books_graded", 2, genre="Romance")
+        parent.merge(worker.snapshot())
+        parent.merge(worker.snapshot())
+        self.assertEqual(
+            counters(parent), {("books_graded", ("Romance",)): 8}
+        )
+        (span,) = parent.to_dict()["spans"]
+        self.assertEqual(span["count"], 2)
+
+
+class TestPipelineInstrumentation(unittest.TestCase):
+    def setUp(self):
+        metrics.reset()
+        metrics.enable()
+        self.addCleanup(metrics.reset)
+        self.addCleanup(metrics.disable)
+        registry.clear()
+
+    def test_load_and_rank_are_recorded(self):
+        bookstore = Bookstore()
+        bookstore.rank_books(CRITERIA, ScoringContext(CRITERIA))
+        recorded = counters(metrics)
+        self.assertEqual(recorded[("books_parsed", ())], 14)
+        self.assertGreater(recorded[("fuzz_ratio_calls", ())], 0)
+        reads = [
+            value
+            for (name, _), value in recorded.items()
+            if name == "keyword_file_reads"
+        ]
+        self.assertEqual(reads, [1, 1, 1, 1])
+        self.assertIn(("books_graded", ("Science Fiction",)), recorded)
+        self.assertLessEqual(
+            {"parse_inventory", "read_keywords", "match_keywords", "grade"},
+            stages(metrics),
+        )
+
+    @unittest.skipUnless(HAS_NUMPY, "NumPy is not installed")
+    def test_engine_counts_every_book(self):
+        from grading_engine import grade_catalog
+
+        catalog = Bookstore.load_catalog()
+        metrics.reset()
+        grade_catalog(catalog, CRITERIA, store=False)
+        recorded = counters(metrics)
+        graded = {
+            labels[0]: value
+            for (name, labels), value in recorded.items()
+            if name == "books_graded"
+        }
+        self.assertEqual(
+            graded,
+            {
+                "Science Fiction": 3,
+                "Romance": 4,
+                "Biography": 3,
+                "Encyclopedia": 4,
+            },
+        )
+        self.assertIn("grade", stages(metrics))
+
+    @unittest.skipUnless(HAS_NUMPY, "NumPy is not installed")
+    def test_workers_send_their_counts_back(self):
+        from parallel_grading import ParallelGrader
+
+        catalog = Bookstore.load_catalog()
+        with ParallelGrader(catalog, workers=2) as grader:
+            for query in range(2):
+                metrics.reset()
+                grader.grade(CRITERIA, 5, ScoringContext(CRITERIA))
+                with self.subTest(query=query):
+                    recorded = counters(metrics)
+                    graded = {
+                        labels[0]: value
+                        for (name, labels), value in recorded.items()
+                        if name == "books_graded"
+                    }
+                    self.assertEqual(sum(graded.values()), 14)
+                    self.assertEqual(graded["Romance"], 4)
+                    self.assertIn("grade", stages(metrics))
+            metrics.disable()
+            metrics.reset()
+            grader.grade(CRITERIA, 5, ScoringContext(CRITERIA))
+            self.assertEqual(metrics.to_dict()["counters"], [])
+
+    def test_service_serves_prometheus_text(self):
+        from service import RecommendationService
+
+        with patch("sys.stdout", StringIO()):
+            service = RecommendationService()
+        self.addCleanup(service.close)
+        status, text = asyncio.run(
+            service.handle_request("GET", "/metrics", b"")
+        )
+        self.assertEqual(status, 200)
+        self.assertIn("bookstore_books_parsed_total 14", text)
+        metrics.disable()
+        status, _ = asyncio.run(
+            service.handle_request("GET", "/metrics", b"")
+        )
+        self.assertEqual(status, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+File: test_keyword_automaton.py
+Author: Lyuboslav Gigov
+Purpose: This module contains unit tests for the phrase-aware keyword
+matching. It verifies that multi-word lexicon entries are kept whole,
+that the Aho-Corasick automaton finds exactly the occurrences a naive
+scan finds, that match_phrases counts phrases once and falls back to
+fuzzy matching for the remaining words, and that a missing keyword file
+scores nothing with either matcher.
+"""
+
+import random
+import unittest
+from unittest.mock import patch
+from book import ScoringContext, match_keywords, match_phrases
+from book_criteria import BookCriteria
+from lexicon import KeywordAutomaton, get_lexicon, tokenize
+
+
+def naive_find_all(phrases, tokens):
+    occurrences = []
+    for end in range(1, len(tokens) + 1):
+        for phrase in phrases:
+            words = tuple(phrase.split())
+            start = end - len(words)
+            if start >= 0 and tuple(tokens[start:end]) == words:
+                occurrences.append((start, end))
+    return sorted(occurrences)
+
+
+class TestKeywordAutomaton(unittest.TestCase):
+    def test_lexicon_keeps_phrases(self):
+        lexicon = get_lexicon("Science_Fiction_Keywords.txt")
+        self.assertIn("time travel", lexicon.phrases)
+        self.assertIn("artificial intelligence", lexicon.phrases)
+        self.assertIn("travel", lexicon.terms)
+
+    def test_tokenize_strips_punctuation(self):
+        self.assertEqual(
+            tokenize("Time-travel, SPACE! and ..."),
+            ["time-travel", "space", "and"],
+        )
+        self.assertEqual(tokenize(["Love,", "?"]), ["love"])
+
+    def test_find_all_equals_naive_scan(self):
+        rng = random.Random(11)
+        vocabulary = ["a", "b", "c", "d"]
+        phrases = [
+            " ".join(rng.choice(vocabulary) for _ in range(rng.randint(1, 4)))
+            for _ in range(15)
+        ]
+        automaton = KeywordAutomaton(phrases)
+        for _ in range(50):
+            tokens = [rng.choice(vocabulary) for _ in range(30)]
+            self.assertEqual(
+                sorted(automaton.find_all(tokens)),
+                naive_find_all(set(phrases), tokens),
+            )
+
+    def test_find_prefers_longest_phrase(self):
+        automaton = KeywordAutomaton(["time", "time travel", "travel"])
+        tokens = tokenize("i love time travel and travel")
+        self.assertEqual(automaton.find(tokens), [(2, 4), (5, 6)])
+
+    def test_match_phrases_counts_phrase_once(self):
+        self.assertEqual(
+            match_phrases(
+                "Science_Fiction_Keywords.txt",
+                "A book about time travel",
+                fuzzy=False,
+            ),
+            (15, 1),
+        )
+
+    def test_fuzzy_fallback_for_uncovered_words(self):
+        text = "Parallel universe stories with robts"
+        file_name = "Science_Fiction_Keywords.txt"
+        self.assertEqual(match_phrases(file_name, text, fuzzy=False)[1], 1)
+        self.assertEqual(match_phrases(file_name, text)[1], 2)
+
+    def test_missing_file(self):
+        with patch("sys.stdout"):
+            self.assertEqual(match_phrases("Missing.txt", "love"), (0, 0))
+            self.assertEqual(match_keywords("Missing.txt", ["love"]), (0, 0))
+            for phrase_matching in (False, True):
+                context = ScoringContext(
+                    BookCriteria(20, 40, "man", ["love"]), phrase_matching
+                )
+                self.assertEqual(context.match_keywords("Missing.txt"), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+"""
+File: test_lexicon.py
+Author: Lyuboslav Gigov
+Purpose: This module contains unit tests for the lexicon registry.
+It verifies that keyword files are lower-cased and cached after the
+first read, that edits to a file are picked up through the
+modification time/size check, and that the hit and reload counters
+reflect the work done. It also checks that the deletion index finds
+exactly the same matches as comparing against every lexicon term, and
+that the keyword index matches every file as match_keywords does.
+"""
+
+import os
+import random
+import tempfile
+import unittest
+from fuzzywuzzy import fuzz
+from book import match_keywords
+from lexicon import (
+    DeletionIndex,
+    LexiconRegistry,
+    get_keyword_index,
+    get_lexicon,
+    registry,
+)
+
+KEYWORD_FILES = [
+    "Romance_Keywords.txt",
+    "Science_Fiction_Keywords.txt",
+    "Biography_Keywords.txt",
+    "Encyclopedia_Keywords.txt",
+]
+
+
+def brute_force_match(terms, user_keywords):
+    grade_increment, keyword_count = 0, 0
+    for user_keyword in user_keywords:
+        for term in terms:
+            if fuzz.ratio(user_keyword, term) >= 65:
+                grade_increment += 15
+                keyword_count += 1
+                break
+    return grade_increment, keyword_count
+
+
+def mutate(word, rng):
+    chars = list(word)
+    for _ in range(rng.randint(1, 3)):
+        position = rng.randrange(len(chars) + 1)
+        operation = rng.choice(["insert", "delete", "replace"])
+        if operation == "insert" or not chars:
+            chars.insert(position, rng.choice("abcdefghijklmnopqrstuvwxyz"))
+        elif position < len(chars):
+            if operation == "delete":
+                del chars[position]
+            else:
+                chars[position] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+    return "".join(chars) or word
+
+
+class TestLexiconRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = LexiconRegistry()
+        handle, self.file_name = tempfile.mkstemp(suffix=".txt")
+        with os.fdopen(handle, "w") as outfile:
+            outfile.write("Love\nHeart\nPassion")
+
+    def tearDown(self):
+        os.remove(self.file_name)
+
+    def test_terms_are_lower_cased(self):
+        lexicon = self.registry.get(self.file_name)
+        self.assertEqual(lexicon.terms, ("love", "heart", "passion"))
+        self.assertIn("heart", lexicon.term_set)
+        self.assertEqual(len(lexicon), 3)
+
+    def test_file_is_read_once(self):
+        first = self.registry.get(self.file_name)
+        second = self.registry.get(self.file_name)
+        self.assertIs(first, second)
+        self.assertEqual(self.registry.reloads, 1)
+        self.assertEqual(self.registry.hits, 1)
+
+    def test_changed_file_is_reloaded(self):
+        self.registry.get(self.file_name)
+        with open(self.file_name, "w") as outfile:
+            outfile.write("Love\nHeart\nPassion\nKiss")
+        stat = os.stat(self.file_name)
+        os.utime(
+            self.file_name, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9)
+        )
+
+        lexicon = self.registry.get(self.file_name)
+        self.assertIn("kiss", lexicon.term_set)
+        self.assertEqual(self.registry.reloads, 2)
+
+    def test_missing_file_raises(self):
+        with self.assertRaises(FileNotFoundError):
+            self.registry.get(self.file_name + ".missing")
+
+    def test_clear_resets_counters(self):
+        self.registry.get(self.file_name)
+        self.registry.clear()
+        self.assertEqual(
+            self.registry.stats(),
+            {"hits": 0, "reloads": 0, "cached_files": 0},
+        )
+
+    def test_match_keywords_uses_shared_registry(self):
+        match_keywords(self.file_name, ["love"])
+        reloads = registry.reloads
+        self.assertEqual(match_keywords(self.file_name, ["lve"]), (15, 1))
+        self.assertEqual(registry.reloads, reloads)
+
+
+class TestDeletionIndex(unittest.TestCase):
+    def test_candidates_never_miss_a_match(self):
+        rng = random.Random(2024)
+        for file_name in KEYWORD_FILES:
+            terms = get_lexicon(file_name).terms
+            index = DeletionIndex(terms)
+            words = [mutate(rng.choice(terms), rng) for _ in range(300)]
+            words += ["sci-fi", "a", "leisure", "interesting", "x" * 20]
+            for word in words:
+                with self.subTest(file_name=file_name, word=word):
+                    expected = {
+                        term for term in terms if fuzz.ratio(word, term) >= 65
+                    }
+                    self.assertLessEqual(expected, index.candidates(word))
+
+    def test_match_keywords_equals_brute_force(self):
+        rng = random.Random(7)
+        for file_name in KEYWORD_FILES:
+            terms = get_lexicon(file_name).terms
+            user_keywords = [
+                mutate(rng.choice(terms), rng) for _ in range(50)
+            ] + "I want a book about space and love".lower().split()
+            with self.subTest(file_name=file_name):
+                self.assertEqual(
+                    match_keywords(file_name, user_keywords),
+                    brute_force_match(terms, user_keywords),
+                )
+
+    def test_exact_term_matches(self):
+        index = DeletionIndex(["biography", "memoir"])
+        self.assertTrue(index.matches("memoir"))
+        self.assertFalse(index.matches("zzzz"))
+
+
+class TestKeywordIndex(unittest.TestCase):
+    def test_match_equals_match_keywords(self):
+        rng = random.Random(19)
+        terms = [t for f in KEYWORD_FILES for t in get_lexicon(f).terms]
+        user_keywords = [mutate(rng.choice(terms), rng) for _ in range(200)]
+        user_keywords += "I want a book about space and love".lower().split()
+        matches = get_keyword_index(KEYWORD_FILES).match(user_keywords)
+        for file_name in KEYWORD_FILES:
+            with self.subTest(file_name=file_name):
+                self.assertEqual(
+                    matches[file_name],
+                    match_keywords(file_name, user_keywords),
+                )
+
+    def test_index_is_rebuilt_after_a_reload(self):
+        handle, file_name = tempfile.mkstemp(suffix=".txt")
+        with os.fdopen(handle, "w") as outfile:
+            outfile.write("dragon\n")
+        self.addCleanup(os.remove, file_name)
+        local = LexiconRegistry()
+        index = local.keyword_index((file_name,))
+        self.assertIs(local.keyword_index((file_name,)), index)
+        with open(file_name, "w") as outfile:
+            outfile.write("wizard castle\n")
+        rebuilt = local.keyword_index((file_name,))
+        self.assertIsNot(rebuilt, index)
+        self.assertEqual(rebuilt.match(["wizzard"])[file_name], (15, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
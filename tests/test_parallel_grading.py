@@ -0,0 +1,81 @@
+"""
+File: test_parallel_grading.py
+Author: Lyuboslav Gigov
+Purpose: This module contains unit tests for the process-pool grading.
+It verifies that grading the shared-memory catalog across workers
+stores the same grades as grading every book in the parent process,
+that the merged top-k matches a full sort, and that one grader can
+serve several queries.
+"""
+
+import unittest
+from io import StringIO
+from unittest.mock import patch
+from book import ScoringContext
+from book_criteria import BookCriteria
+from bookstore import Bookstore
+from catalog import Catalog
+from questions import ask_questions, needed_questions
+
+try:
+    import numpy  # noqa: F401
+
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+
+def answer(prompt):
+    if "feeling" in prompt:
+        return "happy"
+    return "yes" if "correct" in prompt else "graduate"
+
+
+@unittest.skipUnless(HAS_NUMPY, "NumPy is not installed")
+class TestParallelGrading(unittest.TestCase):
+    def setUp(self):
+        self.books = Bookstore.load_books() * 3
+        self.queries = [
+            BookCriteria(25, 20, "woman", "a love story".split()),
+            BookCriteria(19, 40, "man", "space encyclopedia".split()),
+            BookCriteria(40, 12, "other", "tennis memoir".split()),
+        ]
+
+    def answered_context(self, criteria):
+        context = ScoringContext(criteria)
+        with patch("builtins.input", side_effect=answer), patch(
+            "sys.stdout", new_callable=StringIO
+        ):
+            ask_questions(needed_questions(self.books, context), context)
+        return context
+
+    def expected(self, criteria, context):
+        for book in self.books:
+            book.calculate_grade(criteria, context)
+        return [book.grade for book in self.books], [
+            book.isbn for book in sorted(self.books, reverse=True)
+        ]
+
+    def test_grades_equal_sequential_grading(self):
+        from parallel_grading import ParallelGrader
+
+        catalog = Catalog.from_books(self.books)
+        with ParallelGrader(catalog, workers=2) as grader:
+            for criteria in self.queries:
+                context = self.answered_context(criteria)
+                with self.subTest(criteria=str(criteria)):
+                    grades, ranking = self.expected(criteria, context)
+                    best = grader.grade(criteria, k=7, context=context)
+                self.assertEqual(list(catalog.grades), grades)
+                self.assertEqual([book.isbn for book in best], ranking[:7])
+
+    def test_more_workers_than_books(self):
+        from parallel_grading import grade_parallel
+
+        catalog = Catalog.from_books(self.books[:3])
+        best = grade_parallel(catalog, self.queries[0], workers=4, k=10)
+        self.assertEqual(len(best), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+File: test_questions.py
+Author: Lyuboslav Gigov
+Purpose: This module contains unit tests for the pre-scoring phase.
+It verifies that the follow-up questions a query needs are found in
+the order of the books needing them, that they are asked once and their
+answers stored in the query's context, and that answers given in
+advance are only kept for questions the query would have asked.
+"""
+
+import unittest
+from io import StringIO
+from unittest.mock import patch
+from book import ScoringContext
+from book_criteria import BookCriteria
+from encyclopedia import EDUCATION_QUESTION, Encyclopedia
+from questions import answer_questions, ask_questions, needed_questions
+from romance import MOOD_QUESTION, Romance
+from science_fiction import ScienceFiction
+
+BOOKS = [
+    ScienceFiction("Dune", "Frank Herbert", 14.99, 1965, "BBBC-2424", 60, 70),
+    Encyclopedia("Graduate Encyclopedia", "Various", 35.0, 2019, "DDDS-6789"),
+    Romance("Outlander", "Diana Gabaldon", 12.0, 1991, "OUTL-1991", 70, 40),
+    Romance("Me Before You", "Jojo Moyes", 9.99, 2012, "IIIA-9191", 80, 70),
+]
+
+
+def context_for(age=25, max_price=40, info="a love story for university"):
+    return ScoringContext(BookCriteria(age, max_price, "woman", info.split()))
+
+
+class TestQuestions(unittest.TestCase):
+    def test_questions_follow_book_order(self):
+        self.assertEqual(
+            needed_questions(BOOKS, context_for()),
+            [EDUCATION_QUESTION, MOOD_QUESTION],
+        )
+        self.assertEqual(
+            needed_questions(BOOKS, context_for(max_price=20)),
+            [MOOD_QUESTION],
+        )
+        self.assertEqual(
+            needed_questions(BOOKS, context_for(age=8)), [MOOD_QUESTION]
+        )
+        self.assertEqual(
+            needed_questions(BOOKS, context_for(info="space robots")), []
+        )
+
+    def test_answers_are_stored_in_the_context(self):
+        context = context_for()
+        replies = iter(["yes", "graduate", "sad"])
+        with patch("builtins.input", side_effect=lambda _: next(replies)), \
+                patch("sys.stdout", new_callable=StringIO):
+            ask_questions(needed_questions(BOOKS, context), context)
+        self.assertEqual(context.mood, "sad")
+        self.assertTrue(context.needs_encyclopedia)
+        self.assertEqual(context.education_level, "graduate")
+        self.assertEqual(context_for().mood, None)
+
+    def test_answers_in_advance_need_matching_keywords(self):
+        context = context_for(info="space robots")
+        answer_questions(context, "happy", True, "graduate")
+        self.assertIsNone(context.mood)
+        self.assertFalse(context.needs_encyclopedia)
+
+        context = context_for()
+        answer_questions(context, "happy", False, "graduate")
+        self.assertEqual(context.mood, "happy")
+        self.assertFalse(context.needs_encyclopedia)
+        self.assertEqual(context.education_level, "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+"""
+File: test_result_cache.py
+Author: Lyuboslav Gigov
+Purpose: This module contains unit tests for the result cache. It
+verifies that criteria sharing a canonical key always get the same
+ranking, that the least recently used rankings are evicted first, that
+the counters add up, and that a change to a watched file or to the
+in-memory inventory drops the cache.
+"""
+
+import itertools
+import os
+import tempfile
+import unittest
+from book import ScoringContext
+from book_criteria import BookCriteria
+from bookstore import Bookstore
+from questions import answer_questions
+from result_cache import ResultCache, criteria_key
+
+try:
+    import numpy  # noqa: F401
+
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+
+def make_context(age, gender, max_price, info, mood=None):
+    context = ScoringContext(BookCriteria(age, max_price, gender, info))
+    answer_questions(context, mood, True, "high school")
+    return context
+
+
+class TestCriteriaKey(unittest.TestCase):
+    def test_equal_keys_give_equal_rankings(self):
+        bookstore = Bookstore()
+        rankings = {}
+        combinations = itertools.product(
+            [5, 9, 10, 17, 18, 19, 30, 31, 34, 35, 60],
+            ["man", "woman", "other", "robot"],
+            [9, 9.5, 12, 40],
+            [
+                ["love", "story", "space"],
+                ["space", "story", "love"],
+                ["school", "tennis"],
+            ],
+            [None, "happy"],
+        )
+        for age, gender, max_price, info, mood in combinations:
+            context = make_context(age, gender, max_price, info, mood)
+            key = criteria_key(
+                context, bookstore.count_within_budget(max_price), 5
+            )
+            ranking = [
+                (book.isbn, grade)
+                for book, grade in bookstore.rank_books(
+                    context.book_criteria, context
+                )
+            ]
+            with self.subTest(age=age, gender=gender, max_price=max_price):
+                self.assertEqual(rankings.setdefault(key, ranking), ranking)
+        # Near-identical criteria really do share keys
+        self.assertLess(len(rankings), 11 * 4 * 4 * 3 * 2 // 4)
+
+    def test_keyword_order_matters_for_phrases(self):
+        words = ["love", "story"]
+        context = make_context(25, "man", 20, words)
+        reordered = make_context(25, "man", 20, words[::-1])
+        self.assertEqual(
+            criteria_key(context, 3, 5), criteria_key(reordered, 3, 5)
+        )
+        context.phrase_matching = reordered.phrase_matching = True
+        self.assertNotEqual(
+            criteria_key(context, 3, 5), criteria_key(reordered, 3, 5)
+        )
+
+
+class TestResultCache(unittest.TestCase):
+    def test_least_recently_used_is_evicted(self):
+        cache = ResultCache(max_entries=2, file_names=())
+        cache.put("a", [1])
+        cache.put("b", [2])
+        self.assertEqual(cache.get("a"), [1])
+        cache.put("c", [3])
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), [3])
+        self.assertEqual(
+            cache.stats(),
+            {
+                "hits": 2,
+                "misses": 1,
+                "hit_rate": 2 / 3,
+                "evictions": 1,
+                "invalidations": 0,
+                "entries": 2,
+                "max_entries": 2,
+            },
+        )
+
+    def test_zero_size_disables_the_cache(self):
+        cache = ResultCache(max_entries=0, file_names=())
+        cache.put("a", [1])
+        self.assertIsNone(cache.get("a"))
+
+    def test_file_change_drops_the_cache(self):
+        handle, file_name = tempfile.mkstemp(suffix=".txt")
+        os.close(handle)
+        self.addCleanup(os.remove, file_name)
+        cache = ResultCache(file_names=(file_name,))
+        cache.put("a", [1])
+        self.assertEqual(cache.get("a"), [1])
+        with open(file_name, "w") as outfile:
+            outfile.write("romance\n")
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["invalidations"], 1)
+
+    def test_rank_books_reuses_rankings(self):
+        bookstore = Bookstore()
+        cache = ResultCache()
+        first = make_context(25, "woman", 20, ["love", "story"], "happy")
+        second = make_context(26, "woman", 20.5, ["story", "love"], "happy")
+        ranking = cache.rank_books(bookstore, first)
+        self.assertIs(cache.rank_books(bookstore, second), ranking)
+        self.assertEqual(
+            ranking, bookstore.rank_books(second.book_criteria, second)
+        )
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_inventory_change_drops_the_cache(self):
+        bookstore = Bookstore()
+        cache = ResultCache()
+        context = make_context(25, "woman", 20, ["love", "story"], "happy")
+        ranking = cache.rank_books(bookstore, context)
+        bookstore.remove_book(ranking[0][0].isbn)
+        reranked = cache.rank_books(bookstore, context)
+        self.assertEqual(
+            reranked, bookstore.rank_books(context.book_criteria, context)
+        )
+        self.assertNotEqual(reranked[0][0], ranking[0][0])
+        self.assertEqual(cache.stats()["invalidations"], 1)
+
+    @unittest.skipUnless(HAS_NUMPY, "NumPy is not installed")
+    def test_rank_catalog_equals_rank_books(self):
+        bookstore, catalog = Bookstore(), Bookstore.load_catalog()
+        cache = ResultCache()
+        context = make_context(19, "man", 40, ["school", "space"], "sad")
+        self.assertEqual(
+            [(b.isbn, g) for b, g in cache.rank_catalog(catalog, context)],
+            [(b.isbn, g) for b, g in cache.rank_books(bookstore, context)],
+        )
+        self.assertEqual(set(catalog.grades), {0})
+
+
+if __name__ == "__main__":
+    unittest.main()
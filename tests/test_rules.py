@@ -0,0 +1,191 @@
+"""
+File: test_rules.py
+Author: Lyuboslav Gigov
+Purpose: This module contains unit tests for the title rules. It
+verifies that rule lines are parsed or rejected, that the keywords and
+answers of a query fire exactly the rules they name, that rules can
+target a book by ISBN, that an edited rules file is compiled again, and
+that the object path, the genre index and the NumPy grading engine all
+apply the same custom rules.
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from book import ScoringContext
+from book_criteria import BookCriteria
+from bookstore import Bookstore
+from questions import answer_questions
+from romance import Romance
+from rules import RuleTable, get_rule_table, parse_rule
+
+try:
+    import numpy  # noqa: F401
+
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+CUSTOM_RULES = [
+    "Science Fiction; keyword; dystopia; isbn: AAAA-1234; = 100",
+    "Romance; keyword; dystopia; title: Outlander; + 15",
+    "Romance; mood; sad; title: Outlander; + 30",
+    "Romance; mood; sad; isbn: OOOO-4444; = 50",
+]
+
+# Keywords and moods firing some or none of the custom rules
+QUERIES = [(["dystopia", "love"], "sad"), (["dystopia"], None)]
+
+
+def make_context(info, mood=None, needs_encyclopedia=False, level=""):
+    context = ScoringContext(BookCriteria(25, 30, "woman", info))
+    answer_questions(context, mood, needs_encyclopedia, level)
+    return context
+
+
+class TestParseRule(unittest.TestCase):
+    def test_parses_a_rule(self):
+        rule = parse_rule(
+            "Romance; Mood; happy, Sad ; title: Me Before You; + 40", 3
+        )
+        self.assertEqual(rule.order, 3)
+        self.assertEqual(rule.genre, "Romance")
+        self.assertEqual(rule.trigger, "mood")
+        self.assertEqual(rule.values, ("happy", "sad"))
+        self.assertEqual(
+            (rule.target_kind, rule.target), ("title", "Me Before You")
+        )
+        self.assertEqual((rule.operator, rule.amount), ("+", 40))
+        self.assertEqual(rule.apply(80), 100)
+
+    def test_rejects_invalid_lines(self):
+        for line in [
+            "Romance; mood; happy; title: Me Before You",
+            "Poetry; mood; happy; title: Me Before You; + 40",
+            "Romance; weather; rain; title: Me Before You; + 40",
+            "Romance; mood; happy,; title: Me Before You; + 40",
+            "Romance; mood; happy; author: Jojo Moyes; + 40",
+            "Romance; mood; happy; title: ; + 40",
+            "Romance; mood; happy; title: Me Before You; * 2",
+            "Romance; mood; happy; title: Me Before You; + lots",
+            "Science Fiction; mood; happy; title: Dune; + 40",
+            "Biography; education level; graduate; title: Open; + 40",
+        ]:
+            with self.subTest(line=line):
+                with self.assertRaises(ValueError):
+                    parse_rule(line)
+
+
+class TestRuleTable(unittest.TestCase):
+    def test_default_rules_fire_on_keywords_and_answers(self):
+        table = get_rule_table()
+        fired = table.fired(
+            make_context(["space", "tennis", "love"], "happy")
+        )
+        self.assertEqual(
+            sorted(target for _, _, target in fired.targets),
+            [
+                "Dune",
+                "Me Before You",
+                "Neuromancer",
+                "Open: An Autobiography",
+            ],
+        )
+        self.assertFalse(table.fired(make_context(["a", "story"])))
+        fired = table.fired(
+            make_context(["my", "studies"], None, True, "graduate")
+        )
+        self.assertEqual(
+            list(fired.targets),
+            [
+                (
+                    "Encyclopedia",
+                    "title",
+                    "Graduate Encyclopedia of Cosmology and Astrophysics",
+                )
+            ],
+        )
+
+    def test_rules_apply_in_file_order(self):
+        table = RuleTable(parse_rule(line, order)
+                          for order, line in enumerate(CUSTOM_RULES))
+        book = Romance("Outlander", "Diana Gabaldon", 9.99, 1991,
+                       "OOOO-4444", 80, 60)
+        fired = table.fired(make_context(["dystopia", "love"], "sad"))
+        self.assertEqual(
+            [rule.order for rule in fired.rules_for(book)], [1, 2, 3]
+        )
+        self.assertEqual(
+            [rule.order for rule in table.triggered("mood", "sad")], [2, 3]
+        )
+
+    def test_edited_file_is_compiled_again(self):
+        handle, file_name = tempfile.mkstemp(suffix=".txt")
+        os.close(handle)
+        self.addCleanup(os.remove, file_name)
+        with open(file_name, "w") as outfile:
+            outfile.write("# No rules yet\n\n")
+        self.assertEqual(get_rule_table(file_name).rules, ())
+        self.assertIs(get_rule_table(file_name), get_rule_table(file_name))
+        with open(file_name, "w") as outfile:
+            outfile.write(CUSTOM_RULES[0] + "\n")
+        self.assertEqual(len(get_rule_table(file_name).rules), 1)
+
+    def test_missing_file_means_no_rules(self):
+        with patch("builtins.print"):
+            table = get_rule_table("No_Such_Rules.txt")
+        self.assertEqual(table.rules, ())
+
+
+class TestCustomRules(unittest.TestCase):
+    def setUp(self):
+        table = RuleTable(parse_rule(line, order)
+                          for order, line in enumerate(CUSTOM_RULES))
+        patcher = patch("rules.get_rule_table", return_value=table)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def grades(self, context):
+        return {
+            book.isbn: book.score(context.book_criteria, context)
+            for book in Bookstore.load_books()
+        }
+
+    def test_custom_rules_change_the_grades(self):
+        grades = self.grades(make_context(["dystopia", "love"], "sad"))
+        self.assertEqual(grades["AAAA-1234"], 100)
+        self.assertEqual(grades["OOOO-4444"], 50)
+
+    def test_rank_books_equals_exhaustive_grading(self):
+        bookstore = Bookstore()
+        for info, mood in QUERIES:
+            context = make_context(info, mood)
+            grades = self.grades(context)
+            expected = sorted(grades.values(), reverse=True)[:5]
+            ranked = bookstore.rank_books(context.book_criteria, context)
+            with self.subTest(info=info, mood=mood):
+                self.assertEqual([grade for _, grade in ranked], expected)
+                for book, grade in ranked:
+                    self.assertEqual(grades[book.isbn], grade)
+
+    @unittest.skipUnless(HAS_NUMPY, "NumPy is not installed")
+    def test_grading_engine_equals_object_path(self):
+        from grading_engine import grade_catalog
+
+        catalog = Bookstore.load_catalog()
+        for info, mood in QUERIES:
+            context = make_context(info, mood)
+            grades = self.grades(context)
+            engine_grades = grade_catalog(
+                catalog, context.book_criteria, context, store=False
+            )
+            with self.subTest(info=info, mood=mood):
+                self.assertEqual(
+                    [grades[isbn] for isbn in catalog.isbns],
+                    list(engine_grades),
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
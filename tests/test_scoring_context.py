@@ -0,0 +1,87 @@
+"""
+File: test_scoring_context.py
+Author: Lyuboslav Gigov
+Purpose: This module contains unit tests for the ScoringContext class.
+It verifies that answering the follow-up questions and grading a whole
+catalog with one context matches each genre's keyword file only once,
+that the resulting grades are the same as grading every book on its
+own, and that scoring leaves the books and other sessions untouched.
+"""
+
+import unittest
+from io import StringIO
+from unittest.mock import patch
+import book
+from book import ScoringContext
+from book_criteria import BookCriteria
+from bookstore import Bookstore
+from questions import ask_questions, needed_questions
+from romance import Romance
+
+
+def answer(prompt):
+    return "happy" if "feeling" in prompt else "no"
+
+
+class TestScoringContext(unittest.TestCase):
+    def setUp(self):
+        self.criteria = BookCriteria(
+            age=25,
+            max_price=40,
+            gender="man",
+            info="I love space robots and the history of sports".split(),
+        )
+        self.books = Bookstore.load_books()
+
+    def grade_all(self, use_context):
+        context = ScoringContext(self.criteria)
+        with patch("builtins.input", side_effect=answer), patch(
+            "sys.stdout", new_callable=StringIO
+        ):
+            ask_questions(needed_questions(self.books, context), context)
+        for item in self.books:
+            book_context = context
+            if not use_context:
+                # A fresh context per book, with the same answers
+                book_context = ScoringContext(self.criteria)
+                book_context.mood = context.mood
+                book_context.needs_encyclopedia = context.needs_encyclopedia
+                book_context.education_level = context.education_level
+            item.calculate_grade(self.criteria, book_context)
+        return [item.grade for item in self.books]
+
+    def test_user_keywords_are_lower_cased(self):
+        context = ScoringContext(BookCriteria(info=["Space", "AI"]))
+        self.assertEqual(context.user_keywords, ["space", "ai"])
+
+    def test_each_keyword_file_is_matched_once(self):
+        with patch(
+            "book.match_keywords", wraps=book.match_keywords
+        ) as matcher:
+            self.grade_all(use_context=True)
+        self.assertEqual(matcher.call_count, 4)
+
+    def test_grades_match_per_book_grading(self):
+        with_context = self.grade_all(use_context=True)
+        without_context = self.grade_all(use_context=False)
+        self.assertEqual(with_context, without_context)
+
+    def test_scoring_leaves_books_and_sessions_untouched(self):
+        book = Romance(
+            "Me Before You", "Jojo Moyes", 9.99, 2012, "IIIA-9191", 80, 70
+        )
+        book.grade = 42
+        happy, sad = ScoringContext(self.criteria), ScoringContext(
+            self.criteria
+        )
+        happy.mood, sad.mood = "happy", "sad"
+        with patch("builtins.input", side_effect=AssertionError):
+            happy_grade = book.score(self.criteria, happy)
+            sad_grade = book.score(self.criteria, sad)
+        self.assertEqual(happy_grade, sad_grade + 40)
+        self.assertEqual(book.grade, 42)
+        self.assertEqual((happy.mood, sad.mood), ("happy", "sad"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,246 @@
+"""
+File: test_service.py
+Author: Lyuboslav Gigov
+Purpose: This module contains unit tests for the HTTP recommendation
+service. It starts the asyncio server on a free local port and checks
+that /recommend returns the books of the batch mode, that /ranking
+pages through the full ranking, that invalid requests and malformed
+bodies and headers are rejected, that a connection serves several
+requests and that /stats reports the request latencies.
+"""
+
+import asyncio
+import json
+import unittest
+from io import StringIO
+from unittest.mock import patch
+from batch import recommend_all
+from service import LatencyRecorder, RecommendationService, percentile
+
+RECORD = {
+    "age": 19,
+    "max_price": 40,
+    "gender": "man",
+    "info": "encyclopedia for my studies at the university",
+    "education_level": "graduate",
+}
+
+
+def no_input(prompt):
+    raise AssertionError(f"Unexpected prompt: {prompt}")
+
+
+class TestLatencies(unittest.TestCase):
+    def test_percentile_uses_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile([3.0], 0.9), 3.0)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_recorder_keeps_a_window(self):
+        recorder = LatencyRecorder(window=2)
+        for seconds in (1.0, 0.002, 0.004):
+            recorder.record(seconds)
+        summary = recorder.summary()
+        self.assertEqual(summary["requests"], 3)
+        self.assertEqual(summary["window"], 2)
+        self.assertEqual(summary["max_ms"], 4.0)
+
+
+class TestService(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.patches = [
+            patch("builtins.input", side_effect=no_input),
+            patch("sys.stdout", StringIO()),
+        ]
+        for patcher in self.patches:
+            patcher.start()
+        self.service = RecommendationService()
+        self.server = await asyncio.start_server(
+            self.service.handle_connection, "127.0.0.1", 0
+        )
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self.service.close()
+        for patcher in self.patches:
+            patcher.stop()
+
+    async def request(self, reader, writer, method, path, payload=None):
+        body = b"" if payload is None else json.dumps(payload).encode()
+        writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        headers = {}
+        while (line := await reader.readline()) != b"\r\n":
+            name, _, value = line.decode().partition(":")
+            headers[name.lower()] = value.strip()
+        body = await reader.readexactly(int(headers["content-length"]))
+        return status, json.loads(body)
+
+    async def test_requests_on_one_connection(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        try:
+            status, response = await self.request(
+                reader, writer, "POST", "/recommend", {**RECORD, "top": 3}
+            )
+            self.assertEqual(status, 200)
+            expected = StringIO()
+            recommend_all([RECORD], expected, 3)
+            self.assertEqual(
+                response["books"], json.loads(expected.getvalue())["books"]
+            )
+
+            status, response = await self.request(
+                reader, writer, "POST", "/recommend", {"age": 19}
+            )
+            self.assertEqual(status, 400)
+            self.assertIn("error", response)
+
+            status, response = await self.request(
+                reader, writer, "GET", "/stats"
+            )
+            self.assertEqual(status, 200)
+            self.assertEqual(response["requests"], 2)
+            self.assertGreater(response["p99_ms"], 0)
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    async def test_concurrent_requests(self):
+        async def recommend(top):
+            reader, writer = await asyncio.open_connection(
+                "127.0.0.1", self.port
+            )
+            try:
+                payload = {**RECORD, "top": top}
+                return await self.request(
+                    reader, writer, "POST", "/recommend", payload
+                )
+            finally:
+                writer.close()
+                await writer.wait_closed()
+
+        results = await asyncio.gather(*(recommend(k) for k in (1, 2, 3, 4)))
+        self.assertEqual(
+            [len(response["books"]) for _, response in results], [1, 2, 3, 4]
+        )
+
+    async def test_ranking_pages(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        try:
+            isbns, cursor = [], None
+            while True:
+                payload = {**RECORD, "limit": 4}
+                if cursor is not None:
+                    payload["cursor"] = cursor
+                status, response = await self.request(
+                    reader, writer, "POST", "/ranking", payload
+                )
+                self.assertEqual(status, 200)
+                ranks = [book["rank"] for book in response["books"]]
+                self.assertEqual(
+                    ranks, list(range(len(isbns) + 1, len(isbns) + 5))[
+                        :len(ranks)
+                    ]
+                )
+                isbns += [book["isbn"] for book in response["books"]]
+                cursor = response["next_cursor"]
+                if cursor is None:
+                    break
+            self.assertEqual(len(isbns), 14)
+            self.assertEqual(len(set(isbns)), 14)
+
+            status, response = await self.request(
+                reader, writer, "POST", "/ranking", {**RECORD, "top": 3}
+            )
+            self.assertEqual(status, 200)
+            _, expected = await self.request(
+                reader, writer, "POST", "/recommend", {**RECORD, "top": 3}
+            )
+            self.assertEqual(
+                [book["isbn"] for book in response["books"][:3]],
+                [book["isbn"] for book in expected["books"]],
+            )
+
+            for payload in (
+                {**RECORD, "cursor": "not a cursor"},
+                {**RECORD, "limit": 0},
+                {**RECORD, "limit": 100000},
+            ):
+                status, response = await self.request(
+                    reader, writer, "POST", "/ranking", payload
+                )
+                self.assertEqual(status, 400)
+                self.assertIn("error", response)
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    async def test_malformed_bodies(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        try:
+            for payload in (
+                ["not", "an", "object"],
+                {**RECORD, "age": None},
+                {**RECORD, "education_level": 5},
+                {**RECORD, "info": [1, 2]},
+                {**RECORD, "top": None, "limit": None},
+                {**RECORD, "age": 1e400},
+                {**RECORD, "max_price": float("nan")},
+                {**RECORD, "top": float("inf"), "limit": float("inf")},
+            ):
+                for path in ("/recommend", "/ranking"):
+                    with self.subTest(payload=payload, path=path):
+                        status, response = await self.request(
+                            reader, writer, "POST", path, payload
+                        )
+                        self.assertEqual(status, 400)
+                        self.assertIn("error", response)
+            status, _ = await self.request(
+                reader, writer, "POST", "/recommend", RECORD
+            )
+            self.assertEqual(status, 200)
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    async def test_malformed_content_length(self):
+        for length in ("abc", "-1", "+5", "1_0"):
+            reader, writer = await asyncio.open_connection(
+                "127.0.0.1", self.port
+            )
+            try:
+                writer.write(
+                    b"POST /recommend HTTP/1.1\r\nHost: localhost\r\n"
+                    b"Content-Length: " + length.encode() + b"\r\n\r\n"
+                )
+                await writer.drain()
+                with self.subTest(length=length):
+                    status = (await reader.readline()).split()[1]
+                    self.assertEqual(status, b"400")
+                    await reader.read()  # The server closes the connection
+            finally:
+                writer.close()
+                await writer.wait_closed()
+
+    async def test_unknown_path_and_method(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        try:
+            status, _ = await self.request(reader, writer, "GET", "/books")
+            self.assertEqual(status, 404)
+            status, _ = await self.request(reader, writer, "GET", "/recommend")
+            self.assertEqual(status, 405)
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+
+if __name__ == "__main__":
+    unittest.main()
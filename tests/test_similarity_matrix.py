@@ -0,0 +1,83 @@
+"""
+File: test_similarity_matrix.py
+Author: Lyuboslav Gigov
+Purpose: This module contains unit tests for the NumPy-backed batch
+keyword matching. It compares the bit-parallel similarity matrix with
+a straightforward longest-common-subsequence computation, checks that
+it never scores a pair below fuzz.ratio, and verifies that
+match_keywords_batch agrees with match_keywords for every genre lexicon.
+"""
+
+import random
+import unittest
+from fuzzywuzzy import fuzz
+from book import _lcs_length, match_keywords, match_keywords_batch
+from book import similarity_matrix
+
+try:
+    import numpy  # noqa: F401
+
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+KEYWORD_FILES = [
+    "Romance_Keywords.txt",
+    "Science_Fiction_Keywords.txt",
+    "Biography_Keywords.txt",
+    "Encyclopedia_Keywords.txt",
+]
+
+
+@unittest.skipUnless(HAS_NUMPY, "NumPy is not installed")
+class TestSimilarityMatrix(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(42)
+        self.tokens = [
+            "".join(rng.choice("abcde") for _ in range(rng.randint(0, 10)))
+            for _ in range(40)
+        ]
+        self.terms = [
+            "".join(rng.choice("abcde") for _ in range(rng.randint(1, 12)))
+            for _ in range(30)
+        ] + ["ab" * 40]
+
+    def test_matches_lcs_ratio(self):
+        scores = similarity_matrix(self.tokens, self.terms)
+        for i, token in enumerate(self.tokens):
+            for j, term in enumerate(self.terms):
+                total = len(token) + len(term)
+                expected = (
+                    round(100 * (2.0 * _lcs_length(token, term) / total))
+                    if total
+                    else 0
+                )
+                self.assertEqual(scores[i, j], expected, (token, term))
+
+    def test_never_below_fuzz_ratio(self):
+        scores = similarity_matrix(self.tokens, self.terms)
+        for i, token in enumerate(self.tokens):
+            for j, term in enumerate(self.terms):
+                self.assertGreaterEqual(scores[i, j], fuzz.ratio(token, term))
+
+    def test_empty_inputs(self):
+        self.assertEqual(similarity_matrix([], ["love"]).shape, (0, 1))
+        self.assertEqual(similarity_matrix(["love"], []).shape, (1, 0))
+
+    def test_batch_equals_match_keywords(self):
+        user_keywords = (
+            "i want an interesting sci-fi book about spaec travel, "
+            "romanse and the histroy of sports for my univercity studies "
+            "love love"
+        ).split()
+        results = match_keywords_batch(KEYWORD_FILES, user_keywords)
+        for file_name in KEYWORD_FILES:
+            with self.subTest(file_name=file_name):
+                self.assertEqual(
+                    results[file_name],
+                    match_keywords(file_name, user_keywords),
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
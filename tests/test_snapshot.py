@@ -0,0 +1,147 @@
+"""
+File: test_snapshot.py
+Author: Lyuboslav Gigov
+Purpose: This module contains unit tests for the compiled inventory
+snapshot. It verifies that a snapshot restores the same books as the
+text parser, that it survives a touch of the source file but is
+ignored once the source's contents change or the snapshot is damaged,
+corrupt or fails its checksum, and that Bookstore.load_snapshot falls
+back to the text parser and rebuilds a stale snapshot.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import zlib
+from unittest.mock import patch
+from bookstore import FILE_NAME, Bookstore
+from snapshot import HEADER, RECORD, read_snapshot, write_snapshot
+
+
+def slot_values(book):
+    return {
+        name: getattr(book, name, None)
+        for cls in type(book).__mro__
+        for name in getattr(cls, "__slots__", ())
+    }
+
+
+def describe(books):
+    return [
+        (
+            book.get_genre(),
+            book.title,
+            book.author,
+            book.price,
+            book.year,
+            book.isbn,
+            slot_values(book),
+        )
+        for book in books
+    ]
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.source = os.path.join(self.directory, "inventory.txt")
+        self.snapshot = os.path.join(self.directory, "inventory.snapshot")
+        shutil.copy(FILE_NAME, self.source)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def bump_mtime(self):
+        stat = os.stat(self.source)
+        os.utime(self.source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    def test_round_trip(self):
+        books = Bookstore.write_snapshot(self.source, self.snapshot)
+        restored = read_snapshot(self.source, self.snapshot)
+        self.assertEqual(describe(restored), describe(books))
+
+    def test_missing_snapshot(self):
+        self.assertIsNone(read_snapshot(self.source, self.snapshot))
+
+    def test_touched_source_is_still_current(self):
+        Bookstore.write_snapshot(self.source, self.snapshot)
+        self.bump_mtime()
+        self.assertIsNotNone(read_snapshot(self.source, self.snapshot))
+        # The new modification time is recorded, so the source is not
+        # hashed again
+        with patch("snapshot.file_hash", side_effect=AssertionError):
+            self.assertIsNotNone(read_snapshot(self.source, self.snapshot))
+
+    def test_changed_source_is_stale(self):
+        Bookstore.write_snapshot(self.source, self.snapshot)
+        with open(self.source, "r+") as infile:
+            text = infile.read().replace("1984;", "1985;")
+            infile.seek(0)
+            infile.write(text)
+        self.bump_mtime()
+        self.assertIsNone(read_snapshot(self.source, self.snapshot))
+
+    def test_damaged_snapshot_is_ignored(self):
+        Bookstore.write_snapshot(self.source, self.snapshot)
+        with open(self.snapshot, "r+b") as outfile:
+            outfile.truncate(os.path.getsize(self.snapshot) - 1)
+        self.assertIsNone(read_snapshot(self.source, self.snapshot))
+
+    def corrupt(self, change, fix_checksum=True):
+        """Changes the payload of the snapshot, keeping its checksum
+        valid unless told otherwise, so decoding sees the damage."""
+        with open(self.snapshot, "rb") as infile:
+            data = bytearray(infile.read())
+        change(data)
+        if fix_checksum:
+            fields = list(HEADER.unpack_from(data))
+            fields[-1] = zlib.crc32(data[HEADER.size:])
+            HEADER.pack_into(data, 0, *fields)
+        with open(self.snapshot, "wb") as outfile:
+            outfile.write(data)
+
+    def test_corrupt_payload_is_ignored(self):
+        records = -RECORD.size * 14
+
+        def genre_code(data):
+            data[records] = 9
+
+        def pool_index(data):
+            data[-4:] = (10**6).to_bytes(4, "little")
+
+        def utf8(data):
+            data[HEADER.size + 4] = 0xFF
+
+        def flipped_byte(data):
+            data[HEADER.size + 10] ^= 1
+
+        for change, fix_checksum in (
+            (genre_code, True),
+            (pool_index, True),
+            (utf8, True),
+            (flipped_byte, False),
+        ):
+            with self.subTest(change=change.__name__):
+                books = Bookstore.write_snapshot(self.source, self.snapshot)
+                self.corrupt(change, fix_checksum)
+                self.assertIsNone(read_snapshot(self.source, self.snapshot))
+                loaded = Bookstore.load_snapshot(self.source, self.snapshot)
+                self.assertEqual(describe(loaded), describe(books))
+
+    def test_load_snapshot_rebuilds_stale_snapshot(self):
+        write_snapshot([], self.source, self.snapshot)
+        with open(self.source, "a") as outfile:
+            outfile.write(
+                "\nNew Title; Someone; Biography; 5; 2020; NEWT-0001"
+            )
+        self.bump_mtime()
+
+        books = Bookstore.load_snapshot(self.source, self.snapshot)
+        self.assertEqual(books[-1].isbn, "NEWT-0001")
+        restored = read_snapshot(self.source, self.snapshot)
+        self.assertEqual(describe(restored), describe(books))
+
+
+if __name__ == "__main__":
+    unittest.main()
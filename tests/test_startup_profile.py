@@ -0,0 +1,69 @@
+"""
+File: test_startup_profile.py
+Author: Lyuboslav Gigov
+Purpose: This module contains unit tests for the cold start of main.py.
+It verifies that the slow dependencies are not imported before the
+first prompt, that the output of `python -X importtime` is parsed, and
+that the time to the first prompt is measured.
+"""
+
+import subprocess
+import sys
+import unittest
+from startup_profile import (
+    import_times,
+    parse_import_times,
+    time_to_first_prompt,
+)
+
+IMPORT_TIME_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   book_criteria
+import time:       250 |        250 |     lexicon
+import time:      3000 |       3250 |   book
+import time:      1000 |       4370 | main
+"""
+
+
+class TestStartupProfile(unittest.TestCase):
+    def test_slow_dependencies_are_imported_lazily(self):
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, main; print(sorted({'tabulate', 'fuzzywuzzy',"
+                " 'numpy', 'catalog'} & set(sys.modules)))",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        self.assertEqual(result.stdout.strip(), "[]")
+
+    def test_parse_import_times(self):
+        self.assertEqual(
+            parse_import_times(IMPORT_TIME_OUTPUT),
+            [
+                ("book_criteria", 1, 0.00012, 0.00012),
+                ("lexicon", 2, 0.00025, 0.00025),
+                ("book", 1, 0.003, 0.00325),
+                ("main", 0, 0.001, 0.00437),
+            ],
+        )
+
+    def test_import_times_cover_main_only(self):
+        imports = import_times()
+        self.assertEqual(imports[-1][:2], ("main", 0))
+        modules = {module for module, _, _, _ in imports}
+        self.assertIn("bookstore", modules)
+        self.assertNotIn("site", modules)
+
+    def test_time_to_first_prompt(self):
+        seconds = time_to_first_prompt()
+        self.assertIsNotNone(seconds)
+        self.assertGreater(seconds, 0)
+        self.assertIsNone(time_to_first_prompt(["--no-such-option"]))
+
+
+if __name__ == "__main__":
+    unittest.main()